@@ -0,0 +1,172 @@
+import os
+
+# Paths are relative to the working directory the API is launched from.
+DATA_DIR = os.getenv("DATA_DIR", "resources/data")
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "resources/vector_store")
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# Encoder backend: "torch" (sentence-transformers), "onnx" (ONNX Runtime, no
+# torch import) or "onnx-int8" (ONNX with weights quantized to int8 once and
+# kept under EMBEDDING_CACHE_DIR). ONNX backends read EMBEDDING_ONNX_FILE from
+# the model's hub repository or local directory. A store built by another
+# backend is kept if the new one reproduces a sample of its vectors with at
+# least EMBEDDING_PARITY_MIN_COSINE cosine similarity, and re-embedded otherwise.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model.onnx")
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "resources/models")
+EMBEDDING_PARITY_MIN_COSINE = float(os.getenv("EMBEDDING_PARITY_MIN_COSINE", "0.99"))
+
+ROLES = ["engineering", "finance", "hr", "marketing", "general"]
+
+# Role -> collections a user with that role may retrieve from. "general" is
+# always visible. Override with a JSON file of the same shape via ROLE_POLICY_FILE.
+ROLE_POLICY_FILE = os.getenv("ROLE_POLICY_FILE")
+DEFAULT_ROLE_POLICY = {
+    "engineering": ["engineering"],
+    "finance": ["finance", "marketing"],
+    "hr": ["hr"],
+    "marketing": ["marketing"],
+    "general": [],
+    "c-level": list(ROLES),
+}
+
+# FAISS index per role: "flat" (exact), "hnsw" or "ivfpq". VECTOR_INDEX sets the
+# default and VECTOR_INDEX_<ROLE> overrides one role, e.g. VECTOR_INDEX_MARKETING=hnsw.
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "flat")
+INDEX_PARAMS = {
+    "hnsw_m": int(os.getenv("HNSW_M", "32")),
+    "hnsw_ef_construction": int(os.getenv("HNSW_EF_CONSTRUCTION", "80")),
+    "hnsw_ef_search": int(os.getenv("HNSW_EF_SEARCH", "64")),
+    # IVF-PQ stays a flat index until a role holds ivf_min_train vectors. nlist
+    # defaults to ~4*sqrt(n) at training time when IVF_NLIST is unset.
+    "ivf_min_train": int(os.getenv("IVF_MIN_TRAIN", "10000")),
+    "ivf_nlist": int(os.getenv("IVF_NLIST", "0")),
+    "ivf_nprobe": int(os.getenv("IVF_NPROBE", "16")),
+    "pq_m": int(os.getenv("PQ_M", "96")),
+    "pq_nbits": int(os.getenv("PQ_NBITS", "8")),
+}
+
+
+def index_type_for(role: str) -> str:
+    return os.getenv(f"VECTOR_INDEX_{role.upper().replace('-', '_')}", VECTOR_INDEX).lower()
+
+# Ingestion: chunks per encoder call, file reader threads, and how many chunks
+# are embedded between writes of the vector store and manifest (0 = only at the end).
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+INGEST_READERS = int(os.getenv("INGEST_READERS", "4"))
+INGEST_CHECKPOINT_CHUNKS = int(os.getenv("INGEST_CHECKPOINT_CHUNKS", "50000"))
+
+# Query embedding: queries from concurrent requests are encoded together, up to
+# QUERY_BATCH_SIZE per encoder call, waiting at most QUERY_BATCH_WAIT_MS for a
+# batch to fill (1 encodes each query on its own). The embeddings of the last
+# QUERY_CACHE_SIZE distinct queries are kept (0 disables).
+QUERY_BATCH_SIZE = int(os.getenv("QUERY_BATCH_SIZE", "32"))
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "2"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "4096"))
+
+# Startup: the API accepts connections at once and warms up in the background
+# (/readyz turns 200 when done). WARMUP_INGEST=false skips indexing changed
+# documents during warm-up, for deployments that index with app.ingest instead.
+WARMUP_INGEST = os.getenv("WARMUP_INGEST", "true").lower() in ("1", "true", "yes")
+
+# Live reload: POST /admin/reload (users whose role is in ADMIN_ROLES) indexes
+# changed documents in the background and swaps the new indices in. With
+# RELOAD_POLL_SECONDS > 0 every API process also polls the data directory for
+# changes and adopts indices other processes saved (0 = only on request).
+RELOAD_POLL_SECONDS = float(os.getenv("RELOAD_POLL_SECONDS", "0"))
+ADMIN_ROLES = tuple(role.strip() for role in os.getenv("ADMIN_ROLES", "c-level").split(",") if role.strip())
+
+# LLM provider: "groq", or "fake" for the deterministic offline stand-in in
+# app/services/fake_llm.py (latency simulated with the FAKE_LLM_* settings).
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq").lower()
+LLM_MODEL = os.getenv("LLM_MODEL", "Qwen-qwq-32b")
+FAKE_LLM_TTFT_MS = float(os.getenv("FAKE_LLM_TTFT_MS", "300"))
+FAKE_LLM_TOKEN_MS = float(os.getenv("FAKE_LLM_TOKEN_MS", "20"))
+FAKE_LLM_TOKENS = int(os.getenv("FAKE_LLM_TOKENS", "64"))
+# Prompt processing before the first token, per prompt token (0 = TTFT doesn't depend on prompt size).
+FAKE_LLM_PROMPT_TOKEN_MS = float(os.getenv("FAKE_LLM_PROMPT_TOKEN_MS", "0"))
+# Provider-side limits of the fake, answered with 429s like Groq's: concurrent
+# requests and prompt + completion tokens per minute (0 = unlimited).
+FAKE_LLM_MAX_IN_FLIGHT = int(os.getenv("FAKE_LLM_MAX_IN_FLIGHT", "0"))
+FAKE_LLM_TOKENS_PER_MINUTE = int(os.getenv("FAKE_LLM_TOKENS_PER_MINUTE", "0"))
+
+# LLM gateway: at most LLM_MAX_IN_FLIGHT provider calls run at once (the size
+# of the keep-alive connection pool too), and with LLM_TOKENS_PER_MINUTE > 0
+# each call first reserves its prompt tokens plus max_tokens from that budget.
+# Calls wait in one queue for up to LLM_QUEUE_TIMEOUT seconds, then fail with
+# 503. 429s, 5xx, timeouts and connection errors are retried LLM_MAX_RETRIES
+# times with full-jitter exponential backoff from LLM_BACKOFF_BASE up to
+# LLM_BACKOFF_MAX seconds (or the provider's Retry-After). LLM_TIMEOUT bounds
+# each provider request; idle connections close after LLM_KEEPALIVE seconds.
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "16"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_KEEPALIVE = float(os.getenv("LLM_KEEPALIVE", "30"))
+
+# /chat/batch: at most BATCH_MAX_QUERIES messages per request, answered by at
+# most BATCH_CONCURRENCY concurrent LLM calls (a request may ask for fewer).
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "256"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Response cache: entries (0 disables), time-to-live in seconds, and the query
+# embedding cosine similarity above which a cached answer is reused (1 = exact only).
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95"))
+
+# Prompt packing: tokenizer used to budget prompts, the selection strategy
+# ("greedy" by score, or "mmr" to skip near-duplicate chunks), its relevance /
+# diversity trade-off, and the most chunks taken from one source file (0 = no cap).
+TOKENIZER_MODEL = os.getenv("TOKENIZER_MODEL", "gpt-3.5-turbo")
+CONTEXT_STRATEGY = os.getenv("CONTEXT_STRATEGY", "greedy").lower()
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+CONTEXT_MAX_PER_SOURCE = int(os.getenv("CONTEXT_MAX_PER_SOURCE", "0"))
+
+# Reranking: RERANK_BACKEND "cross-encoder" (RERANK_MODEL, a sentence-transformers
+# CrossEncoder) or "lexical" (query-term coverage) re-scores RERANK_CANDIDATES
+# retrieved chunks and only the best RERANK_TOP_N go into the prompt; "off"
+# packs the top 10 by retrieval rank. Pairs are scored RERANK_BATCH_SIZE at a
+# time while the next batch fits in RERANK_BUDGET_MS; the rest keep their
+# retrieval order. Scores of RERANK_CACHE_SIZE (query, chunk) pairs are kept.
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "off").lower()
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "4"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "50"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "4"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "16384"))
+
+# Text chunking, in TOKENIZER_MODEL tokens. The default encoder reads at most
+# 256 word pieces, so larger chunks would be truncated when embedded.
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "224"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+# Retrieval: "hybrid" fuses dense (FAISS) and BM25 results with reciprocal-rank
+# fusion, "dense" uses FAISS alone. Each retriever contributes this many
+# candidates (or n_results, if larger) before fusion; RRF_K damps rank differences.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Authentication: users and roles live in USER_STORE (a JSON file, or SQLite
+# for a .db / .sqlite path), with scrypt password hashes. /login exchanges Basic
+# credentials for a bearer token signed with AUTH_SECRET (or a random key kept
+# in AUTH_SECRET_FILE) that expires after AUTH_TOKEN_TTL seconds. Up to
+# AUTH_CACHE_SIZE verified tokens / Basic credentials are remembered.
+USER_STORE = os.getenv("USER_STORE", "resources/users.json")
+AUTH_SECRET = os.getenv("AUTH_SECRET")
+AUTH_SECRET_FILE = os.getenv("AUTH_SECRET_FILE", "resources/auth_secret")
+AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", "3600"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+
+# Logging goes through a background thread, so request handlers never block on
+# stderr. One request in LOG_SAMPLE_RATE is logged with its per-stage timings
+# (never the message text), plus every request slower than LOG_SLOW_REQUEST_MS.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "5000"))
@@ -0,0 +1,37 @@
+"""Index resources/data into the vector store without starting the API.
+
+    python -m app.ingest [--data-dir DIR] [--store-dir DIR] [--batch-size N] [--readers N] [--checkpoint N]
+
+Only new or changed files are embedded; prints the ingestion stats as JSON.
+"""
+import argparse
+import json
+from dotenv import load_dotenv
+from .config import DATA_DIR, VECTOR_STORE_DIR, INGEST_BATCH_SIZE, INGEST_READERS, INGEST_CHECKPOINT_CHUNKS
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Incrementally index documents for the FinSolve chatbot.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--store-dir", default=VECTOR_STORE_DIR)
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="chunks per encoder call")
+    parser.add_argument("--readers", type=int, default=INGEST_READERS, help="file reader threads")
+    parser.add_argument("--checkpoint", type=int, default=INGEST_CHECKPOINT_CHUNKS,
+                        help="save every N embedded chunks (0 = only at the end)")
+    args = parser.parse_args()
+
+    from .services.document_processor import DocumentProcessor
+    from .services.telemetry import configure_logging
+    from .services.vector_store import get_vector_store
+
+    configure_logging()
+
+    processor = DocumentProcessor(args.data_dir, vector_store=get_vector_store(args.store_dir))
+    stats = processor.load_documents(batch_size=args.batch_size, readers=args.readers,
+                                     checkpoint_chunks=args.checkpoint)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,29 @@
-from typing import Dict
+import json
+import logging
+import time
+from typing import Dict, List, Optional
 from fastapi import FastAPI, HTTPException, Depends
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from fastapi.security import HTTPBasic, HTTPBasicCredentials, HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from .services.chat_service import ChatService
 from dotenv import load_dotenv
-from .services.document_processor import DocumentProcessor
+from .config import ADMIN_ROLES, BATCH_MAX_QUERIES, BATCH_CONCURRENCY
+from .services.auth import Authenticator
+from .services.llm_gateway import LLMOverloaded
+from .services.telemetry import REGISTRY, configure_logging, record, request_trace
+from .services.warmup import Services
 
 load_dotenv()
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
-security = HTTPBasic()
-chat_service = ChatService()
-document_processor = DocumentProcessor()
+basic_auth = HTTPBasic(auto_error=False)
+bearer_auth = HTTPBearer(auto_error=False)
+authenticator = Authenticator()
+# The chat service, document processor and their heavy imports are built by the warm-up, not at import
+services = Services()
 
 
 app.add_middleware(
@@ -23,70 +34,195 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Dummy user database
-users_db: Dict[str, Dict[str, str]] = {
-    "Tony": {"password": "password123", "role": "engineering"},
-    "Bruce": {"password": "securepass", "role": "marketing"},
-    "Sam": {"password": "financepass", "role": "finance"},
-    "Peter": {"password": "pete123", "role": "engineering"},
-    "Sid": {"password": "sidpass123", "role": "marketing"},
-    "Natasha": {"password": "hrpass123", "role": "hr"}
-}
-
 class ChatRequest(BaseModel):
     message: str
 
+class BatchChatRequest(BaseModel):
+    messages: List[str]
+    concurrency: Optional[int] = None
+
+
+def unauthorized() -> HTTPException:
+    return HTTPException(status_code=401, detail="Invalid credentials",
+                         headers={"WWW-Authenticate": 'Bearer, Basic realm="FinSolve"'})
+
+
+def authenticate(token: HTTPAuthorizationCredentials = Depends(bearer_auth),
+                 credentials: HTTPBasicCredentials = Depends(basic_auth)):
+    """The user behind a bearer token from /login, or (cached) Basic credentials."""
+    start = time.perf_counter()
+    if token is not None:
+        user = authenticator.verify_token(token.credentials)
+    elif credentials is not None:
+        user = authenticator.verify_credentials(credentials.username, credentials.password)
+    else:
+        user = None
+    record("auth", time.perf_counter() - start, role=user["role"] if user else "unauthenticated")
+    if user is None:
+        raise unauthorized()
+    return user
+
+
+def require_admin(user=Depends(authenticate)):
+    if user["role"] not in ADMIN_ROLES:
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return user
+
 
-def authenticate(credentials: HTTPBasicCredentials = Depends(security)):
-    username = credentials.username
-    password = credentials.password
-    user = users_db.get(username)
-    if not user or user["password"] != password:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    return {"username": username, "role": user["role"]}
+def ready_chat_service():
+    """The ChatService once warm-up has finished; 503 until then, so clients and load balancers retry."""
+    if not services.ready:
+        raise HTTPException(status_code=503, detail=f"Warming up ({services.state})", headers={"Retry-After": "5"})
+    return services.chat_service
+
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving, whether or not warm-up has finished."""
+    return {"status": "ok", "state": services.state}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 once indices are open and the encoder has run, 503 before (or if warm-up failed)."""
+    return JSONResponse(services.status(), status_code=200 if services.ready else 503)
 
 
 @app.get("/login")
-def login(user=Depends(authenticate)):
-    return {"message": f"Welcome {user['username']}!", "role": user["role"], "username": user["username"]}
+def login(credentials: HTTPBasicCredentials = Depends(basic_auth)):
+    """Exchange Basic credentials for a bearer token to send on every other request."""
+    user = credentials and authenticator.login(credentials.username, credentials.password)
+    if not user:
+        raise unauthorized()
+    token, expires = authenticator.issue_token(user)
+    return {"message": f"Welcome {user['username']}!", "role": user["role"], "username": user["username"],
+            "access_token": token, "token_type": "bearer", "expires_at": expires}
 
 #
 @app.get("/test")
 def test(user=Depends(authenticate)):
     return {"message": f"Hello {user['username']}! You can now chat.", "role": user["role"]}
 
-def startup_load_documents():
-    try:
-        print("[Startup] Loading and indexing documents...")
-        document_processor.load_documents()
-        print("[Startup] Document indexing complete.")
-    except Exception as e:
-        print(f"[Startup] Error loading documents: {e}")
+@app.get("/cache/stats")
+def cache_stats(user=Depends(authenticate), chat_service=Depends(ready_chat_service)):
+    return chat_service.response_cache.stats()
+
+@app.get("/auth/stats")
+def auth_stats(user=Depends(authenticate)):
+    return authenticator.stats()
+
+@app.get("/embeddings/stats")
+def embedding_stats(user=Depends(authenticate), chat_service=Depends(ready_chat_service)):
+    return chat_service.document_processor.vector_store.query_embedder.stats()
+
+@app.get("/llm/stats")
+def llm_stats(user=Depends(authenticate), chat_service=Depends(ready_chat_service)):
+    return chat_service.llm.stats()
+
+@app.get("/rerank/stats")
+def rerank_stats(user=Depends(authenticate), chat_service=Depends(ready_chat_service)):
+    return chat_service.reranker.stats()
+
+@app.post("/admin/reload", status_code=202)
+def reload_corpus(user=Depends(require_admin), chat_service=Depends(ready_chat_service)):
+    """Index changed documents in the background and swap the new indices in; searches are never paused.
+
+    With several workers this reloads the one that took the request; the others
+    pick the saved indices up when RELOAD_POLL_SECONDS is set.
+    """
+    started = services.reloader.request()
+    return {"started": started, **services.reloader.status()}
+
+@app.get("/admin/reload")
+def reload_status(user=Depends(require_admin), chat_service=Depends(ready_chat_service)):
+    return services.reloader.status()
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint: latency histograms per endpoint, stage and role, and LLM token counts."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.on_event("startup")
 def on_startup():
-    startup_load_documents()
+    # Serve /healthz right away; ingestion, index loading and a first encode run in the background
+    services.start_warm_up()
 
 
 @app.post("/chat")
-def chat(request: ChatRequest, user=Depends(authenticate)):
-    try:
-        print(f"[Chat] User: {user['username']} | Role: {user['role']} | Message: {request.message}")
-        response = chat_service.generate_response(
-            role=user["role"],
-            query=request.message
-        )
-        return {
-            "response": response,
-            "role": user["role"],
-            "username": user["username"]
-        }
-    except Exception as e:
-        import traceback
-        print(f"[Chat] Error: {e}")
-        traceback.print_exc()
-        return {
-            "response": f"Sorry, an error occurred: {str(e)}",
-            "role": user["role"],
-            "username": user["username"]
-        }
\ No newline at end of file
+async def chat(request: ChatRequest, user=Depends(authenticate), chat_service=Depends(ready_chat_service)):
+    with request_trace("/chat", user["role"], user["username"]) as trace:
+        try:
+            response = await chat_service.agenerate_response(
+                role=user["role"],
+                query=request.message
+            )
+        except LLMOverloaded as e:
+            trace.error = True
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": f"{e.retry_after:.0f}"})
+        except Exception as e:
+            trace.error = True
+            logger.exception("Chat error for %s", user["username"])
+            response = f"Sorry, an error occurred: {str(e)}"
+    return {
+        "response": response,
+        "role": user["role"],
+        "username": user["username"],
+        "prompt_tokens": trace.tokens.get("prompt", 0)
+    }
+
+
+def sse_event(data: Dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, user=Depends(authenticate), chat_service=Depends(ready_chat_service)):
+    """Server-sent events: one `data: {"token": ...}` per chunk of the answer, then `event: done`."""
+
+    async def events():
+        with request_trace("/chat/stream", user["role"], user["username"]) as trace:
+            try:
+                async for token in chat_service.stream_response(role=user["role"], query=request.message):
+                    yield sse_event({"token": token})
+            except Exception as e:
+                trace.error = True
+                logger.exception("Stream error for %s", user["username"])
+                yield sse_event({"error": f"Sorry, an error occurred: {str(e)}"}, event="error")
+            done = {"role": user["role"], "username": user["username"], "prompt_tokens": trace.tokens.get("prompt", 0)}
+        yield sse_event(done, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest, user=Depends(authenticate), chat_service=Depends(ready_chat_service)):
+    """NDJSON: one `{"index", "response", "source"}` (or `{"index", "error"}`) line per message as it is answered, then `{"done": true}`.
+
+    The messages are embedded and retrieved together; up to BATCH_CONCURRENCY
+    (or the request's lower `concurrency`) LLM calls run at once.
+    """
+    if not 0 < len(request.messages) <= BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=422, detail=f"Send between 1 and {BATCH_MAX_QUERIES} messages")
+    concurrency = min(request.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+
+    async def lines():
+        errors = 0
+        with request_trace("/chat/batch", user["role"], user["username"]) as trace:
+            try:
+                async for result in chat_service.agenerate_batch(user["role"], request.messages, concurrency):
+                    errors += "error" in result
+                    yield json.dumps(result) + "\n"
+            except Exception as e:
+                trace.error = True
+                logger.exception("Batch error for %s", user["username"])
+                yield json.dumps({"error": f"Sorry, an error occurred: {str(e)}"}) + "\n"
+            trace.error = trace.error or errors > 0
+        yield json.dumps({"done": True, "count": len(request.messages), "errors": errors,
+                          "role": user["role"], "username": user["username"]}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
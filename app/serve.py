@@ -0,0 +1,89 @@
+"""Production launcher: index once, preload once, then fork the API workers.
+
+    python -m app.serve --workers 4 [--host 0.0.0.0] [--port 8000] [--skip-ingest]
+
+Documents are indexed by ``app.ingest`` in a child process before any worker
+starts, so workers never race to ingest. The parent then imports the app and
+preloads the services (modules, memory-mapped indices and torch model weights,
+see Services.preload) without running inference, binds the listening socket
+and forks --workers uvicorn workers that share it. The preloaded pages are
+shared copy-on-write; each worker's warm-up only runs one query embedding
+before its /readyz turns 200. Workers that exit are restarted; SIGTERM or
+SIGINT stops them all.
+"""
+import argparse
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger("app.serve")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--skip-ingest", action="store_true", help="serve the vector store as it is")
+    args = parser.parse_args()
+
+    if not args.skip_ingest:
+        subprocess.run([sys.executable, "-m", "app.ingest"], check=True)
+
+    import uvicorn
+    from .main import app, services
+
+    # Indexing is done; the workers' warm-up must not ingest again
+    services.ingest = False
+    start = time.perf_counter()
+    services.preload()
+    logger.info("Preloaded in %.2fs: %s", time.perf_counter() - start, services.timings)
+    # Requests are logged by telemetry's sampled request log, so uvicorn's access log stays off
+    config = uvicorn.Config(app, host=args.host, port=args.port, log_config=None, access_log=False)
+    sock = config.bind_socket()
+
+    workers = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                uvicorn.Server(config).run(sockets=[sock])
+            finally:
+                os._exit(0)
+        workers[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(max(1, args.workers)):
+        spawn()
+    logger.info("Serving on %s:%d with %d workers", args.host, args.port, len(workers))
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if stopping or started is None:
+            continue
+        logger.warning("Worker %d exited with status %d; restarting", pid, os.waitstatus_to_exitcode(status))
+        if time.monotonic() - started < 1:
+            time.sleep(1)  # don't spin if workers die at startup
+        spawn()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import json
+from typing import Dict, List, Optional, Tuple
+from ..config import ROLES, ROLE_POLICY_FILE, DEFAULT_ROLE_POLICY
+
+PUBLIC_COLLECTION = "general"
+
+
+class AccessPolicy:
+    """Maps a user role to the collections it may retrieve from.
+
+    The visible collections are resolved once per role, in store order, so a
+    search only ever touches permitted indices instead of filtering results
+    afterwards.
+    """
+
+    def __init__(self, policy: Optional[Dict[str, List[str]]] = None, collections: Optional[List[str]] = None):
+        self.collections = list(collections or ROLES)
+        if policy is None:
+            policy = self.load_policy(ROLE_POLICY_FILE)
+        self._visible: Dict[str, Tuple[str, ...]] = {}
+        for role, granted in policy.items():
+            unknown = set(granted) - set(self.collections)
+            if unknown:
+                raise ValueError(f"Role policy for '{role}' references unknown collections: {sorted(unknown)}")
+            self._visible[role] = self._resolve(granted)
+        self._default = self._resolve([])
+
+    @staticmethod
+    def load_policy(path: Optional[str]) -> Dict[str, List[str]]:
+        if not path:
+            return DEFAULT_ROLE_POLICY
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _resolve(self, granted: List[str]) -> Tuple[str, ...]:
+        allowed = set(granted) | {PUBLIC_COLLECTION}
+        return tuple(c for c in self.collections if c in allowed)
+
+    def visible(self, role: str) -> Tuple[str, ...]:
+        """Collections the role may retrieve from, in store order; unknown roles only see the public collection."""
+        return self._visible.get(role, self._default)
+
+    def can_access(self, role: str, collection: str) -> bool:
+        return collection in self.visible(role)
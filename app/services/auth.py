@@ -0,0 +1,301 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from ..config import USER_STORE, AUTH_SECRET, AUTH_SECRET_FILE, AUTH_TOKEN_TTL, AUTH_CACHE_SIZE
+
+# scrypt cost: ~16 MiB and tens of milliseconds per hash, paid at login only
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2 ** 14, 8, 1
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode('ascii')
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def hash_password(password: str, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P) -> str:
+    """Salted scrypt hash of a password as 'scrypt$n$r$p$salt$digest'."""
+    salt = secrets.token_bytes(16)
+    digest = hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p, dklen=32)
+    return f"scrypt${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    try:
+        scheme, n, r, p, salt, digest = encoded.split("$")
+        if scheme != "scrypt":
+            return False
+        expected = _b64decode(digest)
+        actual = hashlib.scrypt(password.encode('utf-8'), salt=_b64decode(salt), n=int(n), r=int(r), p=int(p),
+                                dklen=len(expected))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    """Checked against for unknown usernames, so they cost as much as a wrong password."""
+    return hash_password(secrets.token_hex(16))
+
+
+class UserStore:
+    """Users and their roles and password hashes; get() returns {"role", "password_hash"} or None."""
+
+    def get(self, username: str) -> Optional[Dict[str, str]]:
+        raise NotImplementedError
+
+    def set(self, username: str, role: str, password_hash: str):
+        raise NotImplementedError
+
+    def remove(self, username: str) -> bool:
+        raise NotImplementedError
+
+    def usernames(self) -> List[str]:
+        raise NotImplementedError
+
+
+class JsonUserStore(UserStore):
+    """Users in a JSON file, {"users": {name: {"role", "password_hash"}}}; re-read when the file changes."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._users: Dict[str, Dict[str, str]] = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _current(self) -> Dict[str, Dict[str, str]]:
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime != self._mtime:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._users = json.load(f).get("users", {})
+            self._mtime = mtime
+        return self._users
+
+    def _write(self, users: Dict[str, Dict[str, str]]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"users": users}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp_path, self.path)
+
+    def get(self, username: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            return self._current().get(username)
+
+    def set(self, username: str, role: str, password_hash: str):
+        with self._lock:
+            users = dict(self._current())
+            users[username] = {"role": role, "password_hash": password_hash}
+            self._write(users)
+
+    def remove(self, username: str) -> bool:
+        with self._lock:
+            users = dict(self._current())
+            if users.pop(username, None) is None:
+                return False
+            self._write(users)
+            return True
+
+    def usernames(self) -> List[str]:
+        with self._lock:
+            return sorted(self._current())
+
+
+class SqliteUserStore(UserStore):
+    """Users in a SQLite table, for stores edited while the API is running."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS users "
+                               "(username TEXT PRIMARY KEY, role TEXT NOT NULL, password_hash TEXT NOT NULL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections can't be shared across threads by default
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path)
+            self._local.connection = connection
+        return connection
+
+    def get(self, username: str) -> Optional[Dict[str, str]]:
+        row = self._connection().execute("SELECT role, password_hash FROM users WHERE username = ?",
+                                         (username,)).fetchone()
+        return {"role": row[0], "password_hash": row[1]} if row else None
+
+    def set(self, username: str, role: str, password_hash: str):
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO users VALUES (?, ?, ?)", (username, role, password_hash))
+
+    def remove(self, username: str) -> bool:
+        with self._connection() as connection:
+            return connection.execute("DELETE FROM users WHERE username = ?", (username,)).rowcount > 0
+
+    def usernames(self) -> List[str]:
+        return [row[0] for row in self._connection().execute("SELECT username FROM users ORDER BY username")]
+
+
+def open_user_store(location: str = USER_STORE) -> UserStore:
+    """SQLite store for a .db / .sqlite path, JSON file otherwise."""
+    path = Path(location)
+    if path.suffix in ('.db', '.sqlite', '.sqlite3'):
+        return SqliteUserStore(path)
+    return JsonUserStore(path)
+
+
+def load_secret(secret: Optional[str] = AUTH_SECRET, path: str = AUTH_SECRET_FILE) -> bytes:
+    """Token signing key: AUTH_SECRET if set, else a random key created once in AUTH_SECRET_FILE.
+
+    The file is shared by every worker process and survives restarts, so a
+    token stays valid whichever worker receives it.
+    """
+    if secret:
+        return secret.encode('utf-8')
+    path = Path(path)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}")
+        tmp_path.write_text(secrets.token_hex(32))
+        os.chmod(tmp_path, 0o600)
+        try:
+            # Linking fails if another worker got there first; then its key is used
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            tmp_path.unlink()
+    return path.read_text().strip().encode('utf-8')
+
+
+class _ExpiringLRU:
+    """Small thread-safe LRU of key -> (value, expires)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[object, Tuple[Dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now: float) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value: Dict, expires: float):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class Authenticator:
+    """Password login against a UserStore, and cheap per-request checks after it.
+
+    login() verifies the scrypt hash and issues a bearer token,
+    base64url(claims) + "." + base64url(HMAC-SHA256(secret, claims)), whose
+    claims carry the username, role and expiry. verify_token() is one HMAC and
+    a JSON decode, skipped entirely for tokens in the LRU of recently verified
+    ones. Basic credentials are still accepted on every endpoint; a verified
+    pair is remembered under an HMAC of it (never the password itself) for the
+    token lifetime, so repeat requests don't pay for scrypt either. Role changes
+    take effect when tokens and cached credentials expire.
+    """
+
+    def __init__(self, store: Optional[UserStore] = None, secret: Optional[bytes] = None,
+                 ttl_seconds: int = AUTH_TOKEN_TTL, cache_size: int = AUTH_CACHE_SIZE):
+        self.store = store or open_user_store()
+        self._secret = secret or load_secret()
+        self.ttl_seconds = ttl_seconds
+        self._tokens = _ExpiringLRU(cache_size)
+        self._credentials = _ExpiringLRU(cache_size)
+        self.counters = {"logins": 0, "failed_logins": 0, "token_hits": 0, "token_verifications": 0,
+                         "invalid_tokens": 0, "credential_hits": 0}
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._secret, payload, hashlib.sha256).digest()
+
+    def login(self, username: str, password: str) -> Optional[Dict]:
+        """{"username", "role"} if the password matches, else None. Deliberately slow (scrypt)."""
+        record = self.store.get(username)
+        valid = verify_password(password, record["password_hash"] if record else _dummy_hash())
+        if not (valid and record):
+            self.counters["failed_logins"] += 1
+            return None
+        self.counters["logins"] += 1
+        return {"username": username, "role": record["role"]}
+
+    def issue_token(self, user: Dict) -> Tuple[str, int]:
+        """(token, expiry as a Unix time) for a logged-in user."""
+        expires = int(time.time()) + self.ttl_seconds
+        payload = json.dumps({"sub": user["username"], "role": user["role"], "exp": expires},
+                             separators=(",", ":")).encode('utf-8')
+        return f"{_b64encode(payload)}.{_b64encode(self._sign(payload))}", expires
+
+    def verify_token(self, token: str) -> Optional[Dict]:
+        """{"username", "role"} of a valid, unexpired token, else None."""
+        now = time.time()
+        user = self._tokens.get(token, now)
+        if user is not None:
+            self.counters["token_hits"] += 1
+            return user
+        self.counters["token_verifications"] += 1
+        try:
+            encoded_payload, encoded_signature = token.split(".")
+            payload = _b64decode(encoded_payload)
+            if not hmac.compare_digest(self._sign(payload), _b64decode(encoded_signature)):
+                raise ValueError("bad signature")
+            claims = json.loads(payload)
+        except ValueError:
+            self.counters["invalid_tokens"] += 1
+            return None
+        if claims["exp"] <= now:
+            return None
+        user = {"username": claims["sub"], "role": claims["role"]}
+        self._tokens.put(token, user, claims["exp"])
+        return user
+
+    def verify_credentials(self, username: str, password: str) -> Optional[Dict]:
+        """login(), cached for the token lifetime once the pair has been verified."""
+        now = time.time()
+        key = self._sign(b"basic\x00" + username.encode('utf-8') + b"\x00" + password.encode('utf-8'))
+        user = self._credentials.get(key, now)
+        if user is not None:
+            self.counters["credential_hits"] += 1
+            return user
+        user = self.login(username, password)
+        if user is not None:
+            self._credentials.put(key, user, now + self.ttl_seconds)
+        return user
+
+    def stats(self) -> Dict:
+        return {**self.counters, "cached_tokens": len(self._tokens), "cached_credentials": len(self._credentials)}
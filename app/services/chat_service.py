@@ -1,221 +1,237 @@
-import os
-from typing import List, Dict
-from groq import Groq
+from typing import List, Dict, Optional, AsyncIterator, Tuple
+from starlette.concurrency import run_in_threadpool
 from .document_processor import DocumentProcessor
-import tiktoken
-import re
-import pandas as pd
-from io import StringIO
+from .llm import create_llm_clients
+from .llm_gateway import LLMGateway
+from .response_cache import ResponseCache
+from .context_packer import ContextPacker
+from .reranker import Reranker
+from .hr_table import HRTable
+from .tokens import count_tokens
+from .telemetry import span, record, record_tokens, set_source
+from ..config import LLM_MODEL, BATCH_CONCURRENCY
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "You are a helpful AI assistant for FinSolve Technologies."
+PROMPT_TEMPLATE = (
+    "You are an AI assistant for FinSolve Technologies. You have access to the following context:\n\n{context}\n"
+    "User Query: {query}\n\nPlease provide a helpful response based on the context above. If the context doesn't "
+    "contain relevant information, please say so. Cite the source file(s) and chunk(s) you used."
+)
 
 class ChatService:
-    def __init__(self):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        self.document_processor = DocumentProcessor()
-        self.model = "Qwen-qwq-32b"
-        self.max_tokens = 3500  #
-        self.tokenizer = tiktoken.encoding_for_model("gpt-3.5-turbo")  
-        self.hr_df = self.load_hr_csv()
-
-    def load_hr_csv(self):
-        
-        hr_path = None
-        for role_dir in self.document_processor.data_dir.iterdir():
-            if role_dir.is_dir() and role_dir.name == 'hr':
-                for file_path in role_dir.glob("*.csv"):
-                    if file_path.name == 'hr_data.csv':
-                        hr_path = file_path
-                        break
-        if hr_path:
-            try:
-                return pd.read_csv(hr_path)
-            except Exception as e:
-                print(f"Error loading hr_data.csv: {e}")
-        return None
+    def __init__(self, document_processor: DocumentProcessor = None):
+        self.llm = LLMGateway(*create_llm_clients())
+        self.document_processor = document_processor or DocumentProcessor()
+        self.model = LLM_MODEL
+        self.temperature = 0.7
+        self.max_completion_tokens = 1024
+        self.max_tokens = 3500  # prompt budget: system prompt, template, query and context
+        self.context_packer = ContextPacker(self.max_tokens, SYSTEM_PROMPT, PROMPT_TEMPLATE)
+        # With a reranker, retrieve more candidates and pack only the few it ranks best
+        self.reranker = Reranker()
+        self.n_results = self.reranker.candidates if self.reranker.enabled else 10
+        # The typed table written at ingest is memory-mapped; the CSV is parsed only if it isn't there yet
+        self.hr_table = HRTable(self.document_processor.data_dir / 'hr' / 'hr_data.csv',
+                                self.document_processor.table_store)
+        self.response_cache = ResponseCache(self.document_processor.vector_store.versions_for)
 
     def estimate_tokens(self, text: str) -> int:
-       
-        return len(self.tokenizer.encode(text))
-
-    def extract_employee_details(self, query: str, context: List[Dict]) -> str:
-  
-        match = re.search(r'FINEMP\d{4}', query)
-        if not match:
-            return None
-        emp_id = match.group(0)
-      
-        for doc in context:
-            if doc['metadata']['source'].endswith('.csv'):
-               
-                try:
-                
-                    if emp_id in doc['document']:
-                      
-                        csv_text = doc['document']
-                      
-                        if 'employee_id' not in csv_text.split('\n')[0]:
-                            csv_text = 'employee_id,full_name,role,department,email,location,date_of_birth,date_of_joining,manager_id,salary,leave_balance,leaves_taken,attendance_pct,performance_rating,last_review_date\n' + csv_text
-                        df = pd.read_csv(StringIO(csv_text))
-                        row = df[df['employee_id'] == emp_id]
-                        if not row.empty:
-                            info = row.iloc[0]
-                            return f"Employee ID: {info['employee_id']}\nFull Name: {info['full_name']}\nRole: {info['role']}\nDepartment: {info['department']}\nEmail: {info['email']}\nLocation: {info['location']}\nDate of Birth: {info['date_of_birth']}\nDate of Joining: {info['date_of_joining']}\nManager ID: {info['manager_id']}\nSalary: {info['salary']}\nLeave Balance: {info['leave_balance']}\nLeaves Taken: {info['leaves_taken']}\nAttendance %: {info['attendance_pct']}\nPerformance Rating: {info['performance_rating']}\nLast Review Date: {info['last_review_date']}"
-                except Exception as e:
-                    continue
-        return None
+        return count_tokens(text)
 
-    def extract_hr_table_query(self, query: str, context: List[Dict]) -> str:
-        dfs = []
-        for doc in context:
-            if doc['metadata']['source'].endswith('.csv'):
-                try:
-                    csv_text = doc['document']
-                    if 'employee_id' not in csv_text.split('\n')[0]:
-                        csv_text = 'employee_id,full_name,role,department,email,location,date_of_birth,date_of_joining,manager_id,salary,leave_balance,leaves_taken,attendance_pct,performance_rating,last_review_date\n' + csv_text
-                    df = pd.read_csv(StringIO(csv_text))
-                    dfs.append(df)
-                except Exception as e:
-                    continue
-        if not dfs:
-            return None
-        df_all = pd.concat(dfs, ignore_index=True)
-       
-        if re.search(r'(all )?employee id(s)?', query, re.I):
-            ids = df_all['employee_id'].drop_duplicates().tolist()
-            return 'Employee IDs:\n' + '\n'.join(ids)
-      
-        if re.search(r'(all )?role(s)?( available)?', query, re.I):
-            roles = df_all['role'].drop_duplicates().tolist()
-            return 'Roles:\n' + '\n'.join(roles)
-       
-        match = re.search(r'(?:employees? who (?:are|is)|employees? with|name (?:the )?employees? (?:who )?(?:are|is|with)?|list (?:the )?employees? (?:who )?(?:are|is|with)?) ([\w\s]+)', query, re.I)
-        if match:
-            role_query = match.group(1).strip().lower()
-           
-            mask = df_all['role'].str.lower().str.contains(role_query)
-            names = df_all.loc[mask, 'full_name'].drop_duplicates().tolist()
-            if names:
-                return f"Employees with role '{role_query}':\n" + '\n'.join(names)
-            else:
-                return f"No employees found with role '{role_query}'."
+    def answer_hr_query(self, query: str) -> str:
+        self.hr_table.check()
+        engine = self.hr_table.engine
+        return engine.answer(query) if engine is not None else None
+
+    def direct_answer(self, role: str, query: str) -> Optional[str]:
+        """Answer without the LLM when a structured lookup can (HR queries over hr_data.csv)."""
+        if role == 'hr':
+            return self.answer_hr_query(query)
         return None
 
-    def answer_hr_query(self, query: str) -> str:
-        if self.hr_df is None:
-            return None
-        df = self.hr_df
-        q = query.lower()
-
-        if re.search(r'(all )?employee id(s)?', q):
-            ids = df['employee_id'].drop_duplicates().tolist()
-            return 'Employee IDs:\n' + '\n'.join(ids)
-       
-        if re.search(r'(all )?role(s)?( available)?', q):
-            roles = df['role'].drop_duplicates().tolist()
-            return 'Roles:\n' + '\n'.join(roles)
-      
-        if re.search(r'(all )?department(s)?', q):
-            depts = df['department'].drop_duplicates().tolist()
-            return 'Departments:\n' + '\n'.join(depts)
-
-        match = re.search(r'(?:employees? who (?:are|is)|employees? with|name (?:the )?employees? (?:who )?(?:are|is|with)?|list (?:the )?employees? (?:who )?(?:are|is|with)?) ([\w\s]+)', q)
-        if match:
-            role_query = match.group(1).strip().lower()
-            mask = df['role'].str.lower().str.contains(role_query)
-            names = df.loc[mask, 'full_name'].drop_duplicates().tolist()
-            if names:
-                return f"Employees with role '{role_query}':\n" + '\n'.join(names)
-            else:
-                return f"No employees found with role '{role_query}'."
-        match = re.search(r'(?:employees? in|list employees? in|show employees? in|who works in) ([\w\s]+)', q)
-        if match:
-            dept_query = match.group(1).strip().lower()
-            mask = df['department'].str.lower().str.contains(dept_query)
-            names = df.loc[mask, 'full_name'].drop_duplicates().tolist()
-            if names:
-                return f"Employees in department '{dept_query}':\n" + '\n'.join(names)
-            else:
-                return f"No employees found in department '{dept_query}'."
-        match = re.search(r'(?:employees? in|list employees? in|show employees? in|who works in) ([\w\s]+)', q)
-        if match:
-            loc_query = match.group(1).strip().lower()
-            mask = df['location'].str.lower().str.contains(loc_query)
-            names = df.loc[mask, 'full_name'].drop_duplicates().tolist()
-            if names:
-                return f"Employees in location '{loc_query}':\n" + '\n'.join(names)
+    def build_messages(self, role: str, query: str, context: List[Dict] = None) -> List[Dict]:
+        """Retrieve context for the query, rerank it if enabled and assemble the chat messages, limiting total tokens."""
+        if context is None:
+            context = self.document_processor.get_relevant_documents(role, query, n_results=self.n_results)
+        context = self.reranker.rerank(query, context)
+        with span("pack"):
+            prompt, _, prompt_tokens = self.context_packer.pack(query, context)
+        record_tokens("prompt", prompt_tokens)
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+    def prepare(self, role: str, query: str, context: List[Dict] = None):
+        """Everything up to the LLM call.
+
+        Returns (answer, None, None) when no LLM call is needed (structured HR
+        lookup or cached answer), otherwise (None, messages, cache_slot); pass
+        cache_slot and the LLM's answer to remember().
+        """
+        with span("hr_lookup"):
+            answer = self.direct_answer(role, query)
+        if answer:
+            set_source("hr")
+            return answer, None, None
+        if context is not None:
+            # The answer depends on caller-supplied context, so it isn't cached
+            return None, self.build_messages(role, query, context), None
+
+        scope = self.document_processor.scope(role)
+        with span("cache"):
+            answer = self.response_cache.get_exact(scope, query)
+        if answer:
+            set_source("cache")
+            return answer, None, None
+        # Embed once: the same vector serves the semantic cache lookup and retrieval
+        embedding = self.document_processor.vector_store.embed_query(query)
+        with span("cache"):
+            answer = self.response_cache.get_similar(scope, embedding)
+        if answer:
+            set_source("cache")
+            return answer, None, None
+        # Versions before retrieval: if a reload publishes during the LLM call, the cached answer is already stale
+        versions = self.document_processor.vector_store.versions_for(scope)
+        context = self.document_processor.get_relevant_documents(role, query, n_results=self.n_results,
+                                                                 query_embedding=embedding)
+        return None, self.build_messages(role, query, context), (scope, query, embedding, versions)
+
+    def completion_params(self, messages: List[Dict]) -> Dict:
+        return {"model": self.model, "messages": messages, "temperature": self.temperature,
+                "max_tokens": self.max_completion_tokens}
+
+    def prepare_batch(self, role: str, queries: List[str]) -> List[Tuple[Optional[str], Optional[List[Dict]], object, str]]:
+        """prepare() for many queries of one role: (answer, messages, cache_slot, source) per query.
+
+        Queries the HR lookup or the exact cache don't answer are embedded in one
+        encoder call and retrieved together (see get_relevant_documents_batch).
+        """
+        scope = self.document_processor.scope(role)
+        prepared: List = [None] * len(queries)
+        pending = []
+        for i, query in enumerate(queries):
+            with span("hr_lookup"):
+                answer = self.direct_answer(role, query)
+            if answer:
+                prepared[i] = (answer, None, None, "hr")
+                continue
+            with span("cache"):
+                answer = self.response_cache.get_exact(scope, query)
+            if answer:
+                prepared[i] = (answer, None, None, "cache")
             else:
-                return f"No employees found in location '{loc_query}'."
-       
-        match = re.search(r'(?:manager of|who manages|who is the manager of) ([\w\s]+)', q)
-        if match:
-            emp_query = match.group(1).strip().lower()
-            row = df[df['full_name'].str.lower().str.contains(emp_query)]
-            if not row.empty:
-                manager_id = row.iloc[0]['manager_id']
-                manager_row = df[df['employee_id'] == manager_id]
-                if not manager_row.empty:
-                    manager_name = manager_row.iloc[0]['full_name']
-                    return f"Manager of {row.iloc[0]['full_name']}: {manager_name} (ID: {manager_id})"
-                else:
-                    return f"Manager ID for {row.iloc[0]['full_name']}: {manager_id} (not found in data)"
+                pending.append(i)
+        if not pending:
+            return prepared
+        embeddings = self.document_processor.vector_store.embed_queries([queries[i] for i in pending])
+        misses = []
+        for row, i in enumerate(pending):
+            with span("cache"):
+                answer = self.response_cache.get_similar(scope, embeddings[row])
+            if answer:
+                prepared[i] = (answer, None, None, "cache")
             else:
-                return f"No employee found with name '{emp_query}'."
-       
-        match = re.search(r'finemp\d{4}', q)
-        if match:
-            emp_id = match.group(0).upper()
-            row = df[df['employee_id'] == emp_id]
-            if not row.empty:
-                info = row.iloc[0]
-                return f"Employee ID: {info['employee_id']}\nFull Name: {info['full_name']}\nRole: {info['role']}\nDepartment: {info['department']}\nEmail: {info['email']}\nLocation: {info['location']}\nDate of Birth: {info['date_of_birth']}\nDate of Joining: {info['date_of_joining']}\nManager ID: {info['manager_id']}\nSalary: {info['salary']}\nLeave Balance: {info['leave_balance']}\nLeaves Taken: {info['leaves_taken']}\nAttendance %: {info['attendance_pct']}\nPerformance Rating: {info['performance_rating']}\nLast Review Date: {info['last_review_date']}"
-        match = re.search(r'(?:details for|show details for|info for|information for|find) ([\w\s]+)', q)
-        if match:
-            emp_query = match.group(1).strip().lower()
-            row = df[df['full_name'].str.lower().str.contains(emp_query)]
-            if not row.empty:
-                info = row.iloc[0]
-                return f"Employee ID: {info['employee_id']}\nFull Name: {info['full_name']}\nRole: {info['role']}\nDepartment: {info['department']}\nEmail: {info['email']}\nLocation: {info['location']}\nDate of Birth: {info['date_of_birth']}\nDate of Joining: {info['date_of_joining']}\nManager ID: {info['manager_id']}\nSalary: {info['salary']}\nLeave Balance: {info['leave_balance']}\nLeaves Taken: {info['leaves_taken']}\nAttendance %: {info['attendance_pct']}\nPerformance Rating: {info['performance_rating']}\nLast Review Date: {info['last_review_date']}"
-   
-        if re.search(r'(all )?employees?$', q) or re.search(r'list (all )?employees?', q):
-            names = df['full_name'].drop_duplicates().tolist()
-            return 'All Employees:\n' + '\n'.join(names)
-        return None
+                misses.append(row)
+        versions = self.document_processor.vector_store.versions_for(scope)
+        contexts = self.document_processor.get_relevant_documents_batch(
+            role, [queries[pending[row]] for row in misses], n_results=self.n_results,
+            query_embeddings=embeddings[misses])
+        for row, context in zip(misses, contexts):
+            query = queries[pending[row]]
+            prepared[pending[row]] = (None, self.build_messages(role, query, context),
+                                      (scope, query, embeddings[row:row + 1], versions), "llm")
+        return prepared
+
+    @staticmethod
+    def record_completion(completion) -> str:
+        """The answer text of a completion, recording its completion tokens."""
+        response = completion.choices[0].message.content
+        usage = getattr(completion, "usage", None)
+        record_tokens("completion", usage.completion_tokens if usage else count_tokens(response))
+        return response
+
+    def remember(self, cache_slot, response: str):
+        if cache_slot is not None:
+            scope, query, embedding, versions = cache_slot
+            self.response_cache.put(scope, query, response, embedding=embedding, versions=versions)
 
     def generate_response(self, role: str, query: str, context: List[Dict] = None) -> str:
-        """Generate a response using the LLM with context, limiting total tokens. Retrieve from all files/chunks."""
-        if role == 'hr':
-            hr_answer = self.answer_hr_query(query)
-            if hr_answer:
-                return hr_answer
-        if context is None:
-            
-            context = self.document_processor.get_relevant_documents('all', query, n_results=10)
-
-        context_str = ""
-        total_tokens = 0
-        for doc in context:
-            doc_str = f"Source: {doc['metadata']['source']} (chunk {doc['metadata'].get('chunk_index', 0)})\nContent: {doc['document']}\n\n"
-            doc_tokens = self.estimate_tokens(doc_str)
-            if total_tokens + doc_tokens > self.max_tokens:
-                break
-            context_str += doc_str
-            total_tokens += doc_tokens
-
-     
-        prompt = f"""You are an AI assistant for FinSolve Technologies. You have access to the following context:\n\n{context_str}\nUser Query: {query}\n\nPlease provide a helpful response based on the context above. If the context doesn't contain relevant information, please say so. Cite the source file(s) and chunk(s) you used."""
-        # If prompt is still too large, truncate context_str further
-        while self.estimate_tokens(prompt) > self.max_tokens and '\n\n' in context_str:
-            # Remove the last chunk
-            context_str = '\n\n'.join(context_str.strip().split('\n\n')[:-1]) + '\n\n'
-            prompt = f"""You are an AI assistant for FinSolve Technologies. You have access to the following context:\n\n{context_str}\nUser Query: {query}\n\nPlease provide a helpful response based on the context above. If the context doesn't contain relevant information, please say so. Cite the source file(s) and chunk(s) you used."""
-
-        completion = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant for FinSolve Technologies."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1024
-        )
-
-        return completion.choices[0].message.content 
\ No newline at end of file
+        """Generate a response using the LLM with context, limiting total tokens. Retrieve only from the collections the role may see."""
+        answer, messages, cache_slot = self.prepare(role, query, context)
+        if answer:
+            return answer
+        with span("llm"):
+            completion = self.llm.complete(**self.completion_params(messages))
+        response = self.record_completion(completion)
+        self.remember(cache_slot, response)
+        return response
+
+    async def agenerate_response(self, role: str, query: str, context: List[Dict] = None) -> str:
+        """Async generate_response: retrieval runs in the threadpool and the LLM call on the async client."""
+        # Structured lookups, embedding, FAISS search and token counting are CPU-bound; keep them off the event loop
+        answer, messages, cache_slot = await run_in_threadpool(self.prepare, role, query, context)
+        if answer:
+            return answer
+        with span("llm"):
+            completion = await self.llm.acomplete(**self.completion_params(messages))
+        response = self.record_completion(completion)
+        self.remember(cache_slot, response)
+        return response
+
+    async def stream_response(self, role: str, query: str, context: List[Dict] = None) -> AsyncIterator[str]:
+        """Yield the response text as the LLM produces it."""
+        answer, messages, cache_slot = await run_in_threadpool(self.prepare, role, query, context)
+        if answer:
+            yield answer
+            return
+        start = time.perf_counter()
+        parts = []
+        async for part in self.llm.astream(**self.completion_params(messages)):
+            if not parts:
+                record("llm_first_token", time.perf_counter() - start)
+            parts.append(part)
+            yield part
+        # Until the last token, so it includes any time the client took to read earlier ones
+        record("llm", time.perf_counter() - start)
+        response = "".join(parts)
+        record_tokens("completion", count_tokens(response))
+        self.remember(cache_slot, response)
+
+    async def agenerate_batch(self, role: str, queries: List[str],
+                              concurrency: int = BATCH_CONCURRENCY) -> AsyncIterator[Dict]:
+        """Answer many queries, yielding {"index", "response", "source"} (or "error") for each as it completes.
+
+        Retrieval for the whole batch runs once in the threadpool; then at most
+        concurrency LLM calls are in flight for this batch.
+        """
+        prepared = await run_in_threadpool(self.prepare_batch, role, queries)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def answer(i: int) -> Dict:
+            response, messages, cache_slot, source = prepared[i]
+            if messages is not None:
+                try:
+                    async with semaphore:
+                        with span("llm"):
+                            completion = await self.llm.acomplete(**self.completion_params(messages))
+                except Exception as e:
+                    logger.error("Batch item %d failed: %s", i, e)
+                    return {"index": i, "error": str(e)}
+                response = self.record_completion(completion)
+                self.remember(cache_slot, response)
+            return {"index": i, "response": response, "source": source}
+
+        tasks = [asyncio.ensure_future(answer(i)) for i in range(len(queries))]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield await done
+        finally:
+            # The client went away: don't keep calling the LLM for it
+            for task in tasks:
+                task.cancel()
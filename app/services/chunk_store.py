@@ -0,0 +1,296 @@
+import copy
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INT_MISSING = np.iinfo(np.int64).min
+
+
+class ChunkStore:
+    """Chunk texts and metadata for one collection, stored as memory-mapped columns.
+
+    Files under ``directory`` (``{name}`` is the collection, ``{gen}`` the generation):
+
+    - ``{name}_chunks.json``: header with the row count, generation and column schema
+    - ``{name}_chunks.{gen}.text``: UTF-8 text of every chunk, back to back
+    - ``{name}_chunks.{gen}.offsets.npy``: int64[n + 1] byte offsets into the text blob
+    - ``{name}_chunks.{gen}.keys.npy``: int64[n] FAISS id of each row
+    - ``{name}_chunks.{gen}.lookup.npy``: int64[2, n] sorted keys and their rows
+    - ``{name}_chunks.{gen}.col{i}.npy``: one array per metadata column
+
+    Rows are decoded only when asked for. A generation's files are never
+    modified: save() writes the next generation and swaps the header, so worker
+    processes sharing the directory read-only always see a complete snapshot.
+    The generation it replaced is kept until the save after, for readers that
+    read the header just before the swap.
+    Additions and removals since the last save are kept in memory; copy() gives
+    a writer its own pending changes over the same generation.
+    """
+
+    VERSION = 1
+
+    def __init__(self, directory: Path, name: str):
+        self.directory = Path(directory)
+        self.name = name
+        self.header_path = self.directory / f"{name}_chunks.json"
+        self._added: Dict[int, Tuple[str, Dict]] = {}
+        self._deleted = set()
+        self._load()
+
+    # -- loading -----------------------------------------------------------------
+
+    def _file(self, generation: int, suffix: str) -> Path:
+        return self.directory / f"{self.name}_chunks.{generation}.{suffix}"
+
+    def _load(self):
+        self.generation = 0
+        self._rows = 0
+        self._columns: List[Dict] = []
+        self._text = None
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._lookup = np.zeros((2, 0), dtype=np.int64)
+        self._arrays: List[np.ndarray] = []
+        if not self.header_path.exists():
+            return
+        with open(self.header_path, 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if header.get("version") != self.VERSION:
+            raise ValueError(f"Unsupported chunk store version in {self.header_path}")
+        self.generation = header["generation"]
+        self._rows = header["rows"]
+        self._columns = header["columns"]
+        if self._rows == 0:
+            return
+        gen = self.generation
+        self._text = np.memmap(self._file(gen, "text"), dtype=np.uint8, mode='r') \
+            if header["text_bytes"] else np.zeros(0, dtype=np.uint8)
+        self._offsets = np.load(self._file(gen, "offsets.npy"), mmap_mode='r')
+        self._keys = np.load(self._file(gen, "keys.npy"), mmap_mode='r')
+        # A plain ndarray view of the mapping: slicing a np.memmap costs more than the lookup itself
+        self._lookup = np.asarray(np.load(self._file(gen, "lookup.npy"), mmap_mode='r'))
+        self._arrays = [np.load(self._file(gen, f"col{i}.npy"), mmap_mode='r') for i in range(len(self._columns))]
+
+    @classmethod
+    def exists(cls, directory: Path, name: str) -> bool:
+        return (Path(directory) / f"{name}_chunks.json").exists()
+
+    # -- reads -------------------------------------------------------------------
+
+    def _base_rows(self, keys: np.ndarray) -> np.ndarray:
+        """Row of each key in the persisted generation, or -1."""
+        sorted_keys = self._lookup[0]
+        if len(sorted_keys) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        pos = np.searchsorted(sorted_keys, keys)
+        pos = np.minimum(pos, len(sorted_keys) - 1)
+        found = sorted_keys[pos] == keys
+        return np.where(found, self._lookup[1][pos], -1)
+
+    def _read_row(self, row: int) -> Tuple[str, Dict]:
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        text = bytes(self._text[start:end]).decode('utf-8')
+        metadata = {}
+        for column, array in zip(self._columns, self._arrays):
+            value = array[row]
+            if column["kind"] == "int":
+                if value != INT_MISSING:
+                    metadata[column["name"]] = int(value)
+            elif value >= 0:
+                metadata[column["name"]] = json.loads(column["values"][value])
+        return text, metadata
+
+    def __len__(self) -> int:
+        return self._rows - len(self._deleted) + len(self._added)
+
+    def __contains__(self, key: int) -> bool:
+        if key in self._added:
+            return True
+        return key not in self._deleted and self._base_rows(np.array([key], dtype=np.int64))[0] >= 0
+
+    def contains_all(self, keys) -> bool:
+        """Whether every key is present; one lookup for the lot rather than one per key."""
+        keys = np.asarray(keys, dtype=np.int64)
+        rows = self._base_rows(keys)
+        return all(key in self._added or (row >= 0 and key not in self._deleted)
+                   for key, row in zip(keys.tolist(), rows.tolist()))
+
+    def get_many(self, keys) -> List[Optional[Tuple[str, Dict]]]:
+        """(document, metadata) for each key, or None where the key is unknown."""
+        keys = np.asarray(keys, dtype=np.int64)
+        rows = self._base_rows(keys)
+        results = []
+        for key, row in zip(keys.tolist(), rows.tolist()):
+            if key in self._added:
+                results.append(self._added[key])
+            elif row >= 0 and key not in self._deleted:
+                results.append(self._read_row(row))
+            else:
+                results.append(None)
+        return results
+
+    def get(self, key: int) -> Optional[Tuple[str, Dict]]:
+        return self.get_many([key])[0]
+
+    def items(self) -> Iterator[Tuple[int, str, Dict]]:
+        for row, key in enumerate(self._keys.tolist()):
+            if key not in self._deleted:
+                yield (key, *self._read_row(row))
+        for key, (document, metadata) in list(self._added.items()):
+            yield key, document, metadata
+
+    # -- writes ------------------------------------------------------------------
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._added or self._deleted)
+
+    def copy(self) -> "ChunkStore":
+        """A store sharing this one's mapped generation, whose changes and saves leave this one untouched."""
+        clone = copy.copy(self)
+        clone._added = dict(self._added)
+        clone._deleted = set(self._deleted)
+        return clone
+
+    def add(self, keys: List[int], documents: List[str], metadatas: List[Dict]):
+        """Add chunks, replacing any stored under the same keys."""
+        base_rows = self._base_rows(np.asarray(keys, dtype=np.int64))
+        for key, row, document, metadata in zip(keys, base_rows.tolist(), documents, metadatas):
+            if row >= 0:
+                self._deleted.add(key)
+            self._added[key] = (document, dict(metadata))
+
+    def remove(self, keys: List[int]) -> int:
+        """Remove chunks by key. Returns the number removed."""
+        base_rows = self._base_rows(np.asarray(keys, dtype=np.int64))
+        removed = 0
+        for key, row in zip(keys, base_rows.tolist()):
+            present = key in self._added or (row >= 0 and key not in self._deleted)
+            self._added.pop(key, None)
+            if row >= 0:
+                self._deleted.add(key)
+            removed += present
+        return removed
+
+    def clear(self):
+        """Drop every chunk; takes effect on disk at the next save()."""
+        self._added.clear()
+        self._deleted = set(np.asarray(self._keys).tolist())
+
+    def save(self):
+        """Write pending changes as a new generation and publish it by swapping the header."""
+        if not self.dirty and self.header_path.exists():
+            return
+        gen = self.generation + 1
+        keep = np.ones(self._rows, dtype=bool)
+        if self._deleted and self._rows:
+            keep = ~np.isin(self._keys, np.fromiter(self._deleted, dtype=np.int64))
+        kept_rows = np.flatnonzero(keep)
+        added_keys = list(self._added)
+        added = [self._added[key] for key in added_keys]
+
+        # Text blob: copy surviving byte ranges from the mapped blob, then append new chunks
+        lengths = []
+        with open(self._file(gen, "text"), 'wb') as f:
+            for start, end in _runs(kept_rows):
+                lo, hi = int(self._offsets[start]), int(self._offsets[end])
+                f.write(self._text[lo:hi].tobytes())
+            base_lengths = np.diff(np.asarray(self._offsets))[kept_rows] if len(kept_rows) else np.zeros(0, np.int64)
+            for document, _ in added:
+                encoded = document.encode('utf-8')
+                f.write(encoded)
+                lengths.append(len(encoded))
+        offsets = np.zeros(len(kept_rows) + len(added) + 1, dtype=np.int64)
+        np.cumsum(np.concatenate([base_lengths, np.array(lengths, dtype=np.int64)]), out=offsets[1:])
+
+        keys = np.concatenate([np.asarray(self._keys)[kept_rows], np.array(added_keys, dtype=np.int64)])
+        order = np.argsort(keys, kind='stable')
+        columns, arrays = self._merge_columns(kept_rows, [metadata for _, metadata in added])
+
+        np.save(self._file(gen, "offsets.npy"), offsets)
+        np.save(self._file(gen, "keys.npy"), keys)
+        np.save(self._file(gen, "lookup.npy"), np.stack([keys[order], order.astype(np.int64)]))
+        for i, array in enumerate(arrays):
+            np.save(self._file(gen, f"col{i}.npy"), array)
+
+        header = {"version": self.VERSION, "generation": gen, "rows": int(len(keys)),
+                  "text_bytes": int(offsets[-1]), "columns": columns}
+        tmp_path = self.header_path.with_suffix(".json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(header, f)
+        os.replace(tmp_path, self.header_path)
+
+        self._added.clear()
+        self._deleted.clear()
+        self._load()
+        self._remove_old_generations()
+
+    def _merge_columns(self, kept_rows: np.ndarray, added: List[Dict]):
+        names = [column["name"] for column in self._columns]
+        for metadata in added:
+            names.extend(name for name in metadata if name not in names)
+        columns, arrays = [], []
+        for name in names:
+            base = next((i for i, column in enumerate(self._columns) if column["name"] == name), None)
+            new_values = [metadata.get(name) for metadata in added]
+            base_is_int = base is None or self._columns[base]["kind"] == "int"
+            if base_is_int and all(v is None or (isinstance(v, int) and not isinstance(v, bool)) for v in new_values):
+                base_part = (np.asarray(self._arrays[base])[kept_rows] if base is not None
+                             else np.full(len(kept_rows), INT_MISSING, dtype=np.int64))
+                added_part = np.array([INT_MISSING if v is None else v for v in new_values], dtype=np.int64)
+                columns.append({"name": name, "kind": "int"})
+                arrays.append(np.concatenate([base_part, added_part]))
+                continue
+            # Dictionary-encode JSON values; code -1 means the row has no such key
+            values: List[str] = []
+            if base is None:
+                base_part = np.full(len(kept_rows), -1, dtype=np.int32)
+            elif self._columns[base]["kind"] == "int":
+                ints = np.asarray(self._arrays[base])[kept_rows]
+                distinct = np.unique(ints[ints != INT_MISSING])
+                values = [json.dumps(int(v)) for v in distinct]
+                base_part = np.where(ints == INT_MISSING, -1, np.searchsorted(distinct, ints)).astype(np.int32)
+            else:
+                values = list(self._columns[base]["values"])
+                base_part = np.asarray(self._arrays[base])[kept_rows].astype(np.int32)
+            codes = {value: i for i, value in enumerate(values)}
+            added_part = np.empty(len(new_values), dtype=np.int32)
+            for i, value in enumerate(new_values):
+                if value is None:
+                    added_part[i] = -1
+                    continue
+                encoded = json.dumps(value, sort_keys=True)
+                if encoded not in codes:
+                    codes[encoded] = len(values)
+                    values.append(encoded)
+                added_part[i] = codes[encoded]
+            columns.append({"name": name, "kind": "json", "values": values})
+            arrays.append(np.concatenate([base_part, added_part]))
+        return columns, arrays
+
+    def _remove_old_generations(self):
+        """Delete the files of generations before the previous one."""
+        prefix = f"{self.name}_chunks."
+        for path in self.directory.glob(f"{prefix}*.*"):
+            generation = path.name[len(prefix):].split(".", 1)[0]
+            if not generation.isdigit() or int(generation) >= self.generation - 1:
+                continue
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning("Could not remove %s: %s", path, e)
+
+
+def _runs(rows: np.ndarray) -> Iterator[Tuple[int, int]]:
+    """Contiguous [start, end) ranges covering sorted row numbers."""
+    if len(rows) == 0:
+        return
+    breaks = np.flatnonzero(np.diff(rows) != 1)
+    starts = np.concatenate([[rows[0]], rows[breaks + 1]])
+    ends = np.concatenate([rows[breaks], [rows[-1]]]) + 1
+    yield from zip(starts.tolist(), ends.tolist())
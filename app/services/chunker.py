@@ -0,0 +1,187 @@
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+from ..config import CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+from .tokens import count_tokens_batch, get_tokenizer
+
+# Where a unit starts, from weakest to strongest place to end a chunk before it
+SENTENCE, BLOCK, HEADING = 0, 1, 2
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_LINE_ITEM = re.compile(r"^\s*(?:[*+-]|\d+[.)]|\|)\s?")
+_ITEM_STARTS = frozenset("*+-|0123456789")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[*A-Z0-9])")
+
+
+class _Unit:
+    __slots__ = ("text", "tokens", "sep", "level", "path")
+
+    def __init__(self, text: str, sep: str, level: int, path: str, tokens: int = 0):
+        self.text = text
+        self.sep = sep
+        self.level = level
+        self.path = path
+        self.tokens = tokens
+
+
+class TextChunker:
+    """Single-pass chunking of markdown / plain text into token-budgeted chunks.
+
+    Text is split into units (headings, sentences, list items, table rows and
+    code blocks), which are token-counted in batches and packed greedily. When
+    the next unit doesn't fit, the chunk ends at the latest heading, else
+    paragraph, boundary that leaves it at least half full, so sections are
+    kept together where possible. Only chunks cut inside a section repeat the
+    last ``overlap_tokens`` of the previous one. Each chunk records the heading
+    path of the section it starts in.
+    """
+
+    COUNT_BATCH = 256  # units tokenized per tokenizer call
+
+    def __init__(self, max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS):
+        self.max_tokens = max(1, max_tokens)
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens // 2))
+
+    def chunks(self, lines: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+        """(text, metadata) for each chunk of the given lines; metadata has token_count and heading_path."""
+        self._units: List[_Unit] = []
+        self._total = 0
+        self._fresh = 0  # units not carried over from the previous chunk
+        queue: List[_Unit] = []
+        for unit in self._parse(lines):
+            queue.append(unit)
+            if len(queue) >= self.COUNT_BATCH:
+                yield from self._add_counted(queue)
+                queue = []
+        yield from self._add_counted(queue)
+        if self._fresh:
+            yield self._emit(self._units)
+
+    def _parse(self, lines: Iterable[str]) -> Iterator[_Unit]:
+        """Markdown lines -> units, in order, without token counts."""
+        headings: List[str] = []
+        path = ""
+        paragraph: List[str] = []
+        code: List[str] = []
+        in_code = False
+        after_item = False
+
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if in_code:
+                code.append(line)
+                if _FENCE.match(line):
+                    in_code = False
+                    yield _Unit("\n".join(code), "\n\n", BLOCK, path)
+                    code = []
+                continue
+            stripped = line.lstrip()
+            first = stripped[:1]
+            heading = _HEADING.match(line) if first == "#" else None
+            fence = _FENCE.match(line) if first in ("`", "~") else None
+            item = _LINE_ITEM.match(line) if first in _ITEM_STARTS else None
+            if paragraph and (heading or fence or item or not stripped):
+                yield from self._sentences(paragraph, path)
+                paragraph = []
+            if heading:
+                level = len(heading.group(1))
+                del headings[level - 1:]
+                headings.extend([""] * (level - 1 - len(headings)))
+                headings.append(heading.group(2))
+                path = " > ".join(h for h in headings if h)
+                yield _Unit(line, "\n\n", HEADING, path)
+                after_item = False
+            elif fence:
+                in_code = True
+                code = [line]
+            elif not stripped:
+                after_item = False
+            elif item:
+                yield _Unit(line, "\n" if after_item else "\n\n", BLOCK, path)
+                after_item = True
+            else:
+                paragraph.append(line)
+        if code:
+            yield _Unit("\n".join(code), "\n\n", BLOCK, path)
+        if paragraph:
+            yield from self._sentences(paragraph, path)
+
+    @staticmethod
+    def _sentences(lines: List[str], path: str) -> Iterator[_Unit]:
+        for i, sentence in enumerate(_SENTENCE_END.split("\n".join(lines))):
+            yield _Unit(sentence, " " if i else "\n\n", SENTENCE if i else BLOCK, path)
+
+    # -- packing -----------------------------------------------------------------
+
+    def _add_counted(self, units: List[_Unit]) -> Iterator[Tuple[str, Dict]]:
+        if not units:
+            return
+        for unit, tokens in zip(units, count_tokens_batch([unit.text for unit in units])):
+            # A newline separator is about one token of its own; a space merges into the next word
+            unit.tokens = tokens + (unit.sep != " ")
+            yield from self._add(unit)
+
+    def _add(self, unit: _Unit) -> Iterator[Tuple[str, Dict]]:
+        if unit.tokens > self.max_tokens and self.max_tokens > 1:
+            # A single sentence or block over budget is cut into token windows
+            tokenizer = get_tokenizer()
+            tokens = tokenizer.encode_ordinary(unit.text)
+            for i in range(0, len(tokens), self.max_tokens - 1):
+                piece = tokens[i:i + self.max_tokens - 1]
+                first = i == 0
+                yield from self._add(_Unit(tokenizer.decode(piece), unit.sep if first else " ",
+                                           unit.level if first else SENTENCE, unit.path,
+                                           len(piece) + (first and unit.sep != " ")))
+            return
+        if self._units and self._total + unit.tokens > self.max_tokens:
+            cut = self._cut(unit)
+            emitted, rest = self._units[:cut], self._units[cut:]
+            if self._fresh > len(rest):
+                yield self._emit(emitted)
+            starts = rest[0] if rest else unit
+            carry = [] if starts.level == HEADING else self._overlap(emitted, starts.path)
+            if sum(u.tokens for u in carry + rest) + unit.tokens > self.max_tokens:
+                carry = []
+            self._units = carry + rest
+            self._total = sum(u.tokens for u in self._units)
+            self._fresh = len(rest)
+        self._units.append(unit)
+        self._total += unit.tokens
+        self._fresh += 1
+
+    def _cut(self, incoming: _Unit) -> int:
+        """Index into the pending units at which the next chunk should start."""
+        if incoming.level == HEADING:
+            return len(self._units)
+        half = self.max_tokens // 2
+        for level in (HEADING, BLOCK):
+            before = self._total
+            for i in range(len(self._units) - 1, 0, -1):
+                before -= self._units[i].tokens
+                if before < half:
+                    break
+                if self._units[i].level >= level and self._total - before + incoming.tokens <= self.max_tokens:
+                    return i
+            if incoming.level >= level:
+                return len(self._units)
+        return len(self._units)
+
+    def _overlap(self, emitted: List[_Unit], path: str) -> List[_Unit]:
+        carry, total = [], 0
+        for unit in reversed(emitted):
+            if unit.path != path or unit.level == HEADING or total + unit.tokens > self.overlap_tokens:
+                break
+            carry.insert(0, unit)
+            total += unit.tokens
+        return carry
+
+    @staticmethod
+    def _emit(units: List[_Unit]) -> Tuple[str, Dict]:
+        text = units[0].text + "".join(u.sep + u.text for u in units[1:])
+        # Summed unit counts come within a few tokens of re-encoding the text, at no cost
+        tokens = sum(u.tokens for u in units) - (units[0].sep != " ")
+        metadata = {"token_count": tokens}
+        path = units[0].path
+        if path:
+            metadata["heading_path"] = path
+        return text, metadata
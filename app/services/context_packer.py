@@ -0,0 +1,122 @@
+import re
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+from ..config import CONTEXT_STRATEGY, CONTEXT_MMR_LAMBDA, CONTEXT_MAX_PER_SOURCE
+from .tokens import count_tokens
+
+STRATEGIES = ("greedy", "mmr")
+
+
+class ContextPacker:
+    """Chooses which retrieved chunks go into the prompt under a token budget.
+
+    The cost of the system prompt and the template is counted once, the query
+    once per request, and each chunk from the token_count stored with it at
+    ingest time, so packing is a single pass over the candidates with no
+    re-tokenization of the assembled prompt. Chunks are kept whole.
+
+    Strategies: "greedy" takes chunks in score order, skipping any that no
+    longer fit; "mmr" orders them by maximal marginal relevance so chunks that
+    mostly repeat an already selected one (overlapping windows, duplicate
+    reports) lose out to new information. max_per_source caps how many chunks
+    one file may contribute.
+    """
+
+    def __init__(self, budget: int, system_prompt: str, template: str, strategy: str = CONTEXT_STRATEGY,
+                 max_per_source: int = CONTEXT_MAX_PER_SOURCE, mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+                 count_tokens: Callable[[str], int] = count_tokens):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown context strategy: {strategy}")
+        self.budget = budget
+        self.system_prompt = system_prompt
+        self.template = template
+        self.strategy = strategy
+        self.max_per_source = max_per_source
+        self.mmr_lambda = mmr_lambda
+        self.count_tokens = count_tokens
+        self._overhead = None
+
+    @property
+    def overhead(self) -> int:
+        """Tokens of the system prompt plus the template with nothing filled in."""
+        if self._overhead is None:
+            self._overhead = (self.count_tokens(self.system_prompt)
+                              + self.count_tokens(self.template.format(context="", query="")))
+        return self._overhead
+
+    @staticmethod
+    def format_chunk(doc: Dict) -> Tuple[str, str]:
+        """(header, full text) of one chunk as it appears in the prompt."""
+        header = f"Source: {doc['metadata']['source']} (chunk {doc['metadata'].get('chunk_index', 0)})\nContent: "
+        return header, f"{header}{doc['document']}\n\n"
+
+    def chunk_cost(self, doc: Dict) -> int:
+        header, text = self.format_chunk(doc)
+        stored = doc['metadata'].get('token_count')
+        if stored is None:
+            return self.count_tokens(text)
+        # Header and separator are short; token counts are additive at these boundaries
+        return self.count_tokens(header) + stored + 1
+
+    def pack(self, query: str, candidates: List[Dict]) -> Tuple[str, List[Dict], int]:
+        """Build the user prompt. Returns (prompt, chunks used, estimated prompt tokens incl. system prompt)."""
+        remaining = self.budget - self.overhead - self.count_tokens(query)
+        used = []
+        per_source: Dict[str, int] = {}
+        for doc in self._order(self._dedupe(candidates)):
+            source = doc['metadata']['source']
+            if self.max_per_source and per_source.get(source, 0) >= self.max_per_source:
+                continue
+            cost = self.chunk_cost(doc)
+            if cost > remaining:
+                continue
+            used.append(doc)
+            per_source[source] = per_source.get(source, 0) + 1
+            remaining -= cost
+        context = "".join(self.format_chunk(doc)[1] for doc in used)
+        prompt = self.template.format(context=context, query=query)
+        return prompt, used, self.budget - remaining
+
+    @staticmethod
+    def _dedupe(candidates: List[Dict]) -> List[Dict]:
+        seen = set()
+        unique = []
+        for doc in candidates:
+            key = (doc['metadata']['source'], doc['metadata'].get('chunk_index'), doc['document'][:64])
+            if key not in seen:
+                seen.add(key)
+                unique.append(doc)
+        return unique
+
+    def _order(self, candidates: List[Dict]) -> List[Dict]:
+        ranked = sorted(candidates, key=lambda d: -d.get('score', 0.0))
+        if self.strategy == "greedy" or len(ranked) < 3:
+            return ranked
+        return self._mmr(ranked)
+
+    def _mmr(self, ranked: List[Dict]) -> List[Dict]:
+        # Pairwise Jaccard overlap of the chunks' word sets, from one word-incidence matmul
+        vocabulary: Dict[str, int] = {}
+        rows = [[vocabulary.setdefault(w, len(vocabulary)) for w in set(re.findall(r'\w+', doc['document'].lower()))]
+                for doc in ranked]
+        incidence = np.zeros((len(ranked), len(vocabulary)), dtype=np.float32)
+        for i, columns in enumerate(rows):
+            incidence[i, columns] = 1.0
+        sizes = incidence.sum(axis=1)
+        shared = incidence @ incidence.T
+        union = sizes[:, None] + sizes[None, :] - shared
+        overlap = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+
+        scores = np.array([doc.get('score', 0.0) for doc in ranked], dtype=np.float32)
+        spread = scores.max() - scores.min()
+        relevance = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+        redundancy = np.zeros(len(ranked), dtype=np.float32)
+        available = np.ones(len(ranked), dtype=bool)
+        order = []
+        for _ in range(len(ranked)):
+            mmr = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * redundancy
+            best = int(np.argmax(np.where(available, mmr, -np.inf)))
+            available[best] = False
+            order.append(ranked[best])
+            np.maximum(redundancy, overlap[best], out=redundancy)
+        return order
@@ -1,87 +1,173 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
-import pandas as pd
-from .vector_store import VectorStore
-import re
+import contextvars
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pyarrow as pa
+from .vector_store import VectorStore, get_vector_store
+from .ingestion import IngestionPipeline
+from .access_policy import AccessPolicy
+from .tokens import count_tokens
+from .chunker import TextChunker
+from .table_store import TableStore, read_csv_batches
+from .lexical_index import reciprocal_rank_fusion
+from .telemetry import span
+from ..config import DATA_DIR, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, RETRIEVAL_MODE, HYBRID_CANDIDATES, RRF_K
 
 class DocumentProcessor:
-    def __init__(self, data_dir: str = "resources/data"):
+    SUPPORTED_SUFFIXES = ('.md', '.txt', '.csv')
+    CHUNKER_VERSION = 3  # bump to re-chunk every file on the next ingest
+
+    def __init__(self, data_dir: str = DATA_DIR, vector_store: VectorStore = None, access_policy: AccessPolicy = None):
         self.data_dir = Path(data_dir)
-        self.vector_store = VectorStore()
-        self.chunk_size = 500  # words per chunk
-        self.chunk_overlap = 50  # overlap between chunks
-
-    def chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
-        # Split by paragraphs, then merge into chunks of ~chunk_size words
-        paragraphs = re.split(r'\n{2,}', text)
-        chunks = []
-        current_chunk = []
-        current_len = 0
-        for para in paragraphs:
-            words = para.split()
-            if current_len + len(words) > chunk_size and current_chunk:
-                chunks.append(' '.join(current_chunk))
-                # Overlap
-                if overlap > 0:
-                    current_chunk = current_chunk[-overlap:]
-                    current_len = len(current_chunk)
-                else:
-                    current_chunk = []
-                    current_len = 0
-            current_chunk.extend(words)
-            current_len += len(words)
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
-        return chunks
-
-    def load_documents(self):
-        """Load, chunk, and index all documents from the data directory for RAG."""
-        for role_dir in self.data_dir.iterdir():
-            if not role_dir.is_dir():
-                continue
-            role = role_dir.name
-            for file_path in role_dir.glob("**/*"):
-                if file_path.is_file():
-                    try:
-                        if file_path.suffix in ['.md', '.txt']:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                        elif file_path.suffix == '.csv':
-                            df = pd.read_csv(file_path)
-                            content = df.to_string()
-                        else:
-                            continue
-                        # Chunk the content
-                        chunks = self.chunk_text(content, self.chunk_size, self.chunk_overlap)
-                        documents = []
-                        metadatas = []
-                        ids = []
-                        for i, chunk in enumerate(chunks):
-                            documents.append(chunk)
-                            metadatas.append({
-                                "source": str(file_path),
-                                "role": role,
-                                "chunk_index": i
-                            })
-                            ids.append(f"{file_path}::chunk_{i}")
-                        if documents:
-                            self.vector_store.add_documents(
-                                role=role,
-                                documents=documents,
-                                metadatas=metadatas,
-                                ids=ids
-                            )
-                    except Exception as e:
-                        print(f"Error processing {file_path}: {e}")
-
-    def get_relevant_documents(self, role: str, query: str, n_results: int = 8) -> List[Dict]:
-        """Get relevant document chunks for a query based on role (or all roles if role='all')."""
-        if role == 'all':
-            results = []
-            for r in [d.name for d in self.data_dir.iterdir() if d.is_dir()]:
-                results.extend(self.vector_store.search(r, query, n_results=n_results))
-            # Sort by score descending
-            results = sorted(results, key=lambda x: -x.get('score', 0))
-            return results[:n_results]
-        else:
-            return self.vector_store.search(role, query, n_results=n_results) 
\ No newline at end of file
+        # All processors share the process-wide store unless one is injected
+        self.vector_store = vector_store or get_vector_store()
+        self.access_policy = access_policy or AccessPolicy(collections=self.vector_store.roles)
+        self.table_store = TableStore(self.vector_store.persist_directory / "tables")
+        self.chunk_size = CHUNK_TOKENS  # tokens per text chunk
+        self.chunk_overlap = CHUNK_OVERLAP_TOKENS  # tokens repeated when a chunk is cut mid-section
+        self.table_chunk_cells = 500  # CSV cells (rows x columns) per table chunk
+        self.retrieval_mode = RETRIEVAL_MODE
+        self._lexical_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bm25")
+
+    def chunk_document(self, file_path: Path, role: str) -> Tuple[List[str], List[Dict], List[str]]:
+        """Chunk one file into (documents, metadatas, ids); ids are '{source}::chunk_{i}'."""
+        if file_path.suffix == '.csv':
+            return self.chunk_table(file_path, role)
+        source = file_path.as_posix()
+        documents = []
+        metadatas = []
+        ids = []
+        if file_path.suffix not in ('.md', '.txt'):
+            return documents, metadatas, ids
+        chunker = TextChunker(self.chunk_size, self.chunk_overlap)
+        # Lines are streamed from the file; token_count is cached so prompt packing never re-tokenizes
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for i, (chunk, chunk_metadata) in enumerate(chunker.chunks(f)):
+                documents.append(chunk)
+                metadatas.append({"source": source, "role": role, "chunk_index": i, **chunk_metadata})
+                ids.append(f"{source}::chunk_{i}")
+        return documents, metadatas, ids
+
+    def chunk_table(self, file_path: Path, role: str) -> Tuple[List[str], List[Dict], List[str]]:
+        """Chunk a CSV into groups of whole rows while storing the parsed table in the table store.
+
+        Each chunk starts with the header row and records its rows as
+        [row_start, row_end) in metadata, so answers can read them back by number.
+        """
+        try:
+            return self._chunk_table(file_path, role, all_strings=False)
+        except pa.ArrowInvalid:
+            # A column's type changed past the first block; keep every value as text
+            return self._chunk_table(file_path, role, all_strings=True)
+
+    def _chunk_table(self, file_path: Path, role: str, all_strings: bool):
+        source = file_path.as_posix()
+        documents, metadatas, ids = [], [], []
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        header, row_start, row_end, cells = None, 0, 0, 0
+
+        def flush():
+            nonlocal row_start, cells
+            if row_end == row_start:
+                return
+            chunk = header + buffer.getvalue()
+            i = len(documents)
+            documents.append(chunk)
+            metadatas.append({"source": source, "role": role, "chunk_index": i, "token_count": count_tokens(chunk),
+                              "row_start": row_start, "row_end": row_end})
+            ids.append(f"{source}::chunk_{i}")
+            buffer.seek(0)
+            buffer.truncate()
+            row_start, cells = row_end, 0
+
+        for _, batch in self.table_store.write(source, read_csv_batches(file_path, all_strings)):
+            if header is None:
+                header = ",".join(batch.schema.names) + "\n"
+            for values in zip(*(column.to_pylist() for column in batch.columns)):
+                writer.writerow(["" if v is None else v for v in values])
+                row_end += 1
+                cells += len(values)
+                if cells >= self.table_chunk_cells:
+                    flush()
+        flush()
+        return documents, metadatas, ids
+
+    def artifacts_current(self, file_path: Path) -> bool:
+        """Whether derived files besides the index (a CSV's stored table) exist for a file."""
+        return file_path.suffix != '.csv' or self.table_store.exists(file_path.as_posix())
+
+    def discard(self, source: str):
+        """Delete derived files of a source that is no longer in the data directory."""
+        if source.endswith('.csv'):
+            self.table_store.remove(source)
+
+    def load_documents(self, **pipeline_options) -> Dict:
+        """Incrementally index the data directory for RAG.
+
+        Files whose content hash and chunking parameters match the ingest
+        manifest are skipped, changed files have their old chunks replaced and
+        files that disappeared are purged. Returns counts per outcome and
+        throughput; see IngestionPipeline for the options.
+        """
+        return IngestionPipeline(self, **pipeline_options).run()
+
+    def scope(self, role: str) -> Tuple[str, ...]:
+        """Collections a search for this role covers, as granted by the access policy."""
+        return self.access_policy.visible(role)
+
+    def get_relevant_documents(self, role: str, query: str, n_results: int = 8,
+                               query_embedding: Optional[np.ndarray] = None) -> List[Dict]:
+        """Get relevant document chunks for a query from the collections the user's role may see.
+
+        In hybrid mode BM25 runs on a worker thread while the query is embedded and
+        searched in FAISS, and the two rankings are merged by reciprocal-rank fusion;
+        the result is still the top n_results.
+        """
+        roles = list(self.scope(role))
+        if self.retrieval_mode != "hybrid":
+            return self.vector_store.search_roles(roles, query, n_results=n_results, query_embedding=query_embedding)
+        candidates = max(n_results, HYBRID_CANDIDATES)
+        # Both retrievers and the fetch read the same snapshots, even if a reload publishes new ones meanwhile
+        view = self.vector_store.view(roles)
+        # Submitted under a copy of the context so its timing span joins the current request's trace
+        lexical = self._lexical_pool.submit(contextvars.copy_context().run, self.vector_store.lexical_hits,
+                                            roles, query, candidates, view)
+        dense = self.vector_store.dense_hits(roles, query, candidates, query_embedding, view=view)
+        # Only the fused top n_results are read from the chunk store
+        with span("bm25_wait"):
+            lexical_hits = lexical.result()
+        return self.vector_store.fetch(reciprocal_rank_fusion([dense, lexical_hits], n_results, RRF_K), view=view)
+
+    def get_relevant_documents_batch(self, role: str, queries: List[str], n_results: int = 8,
+                                     query_embeddings: Optional[np.ndarray] = None) -> List[List[Dict]]:
+        """get_relevant_documents for many queries of one role, in order.
+
+        The queries are embedded in one encoder call (unless query_embeddings are
+        given) and each collection's index is searched once with the (N, d)
+        matrix; in hybrid mode their BM25 searches run on one worker thread
+        meanwhile. Chunks several queries retrieve are read once.
+        """
+        if not queries:
+            return []
+        roles = list(self.scope(role))
+        if query_embeddings is None:
+            query_embeddings = self.vector_store.embed_queries(queries)
+        view = self.vector_store.view(roles)
+        if self.retrieval_mode != "hybrid":
+            dense = self.vector_store.dense_hits_batch(roles, query_embeddings, n_results, view=view)
+            return self.vector_store.fetch_batch(dense, view=view)
+        candidates = max(n_results, HYBRID_CANDIDATES)
+        # One task for the whole batch, so concurrent /chat requests still find free BM25 workers
+        lexical = self._lexical_pool.submit(
+            contextvars.copy_context().run,
+            lambda: [self.vector_store.lexical_hits(roles, query, candidates, view) for query in queries])
+        dense = self.vector_store.dense_hits_batch(roles, query_embeddings, candidates, view=view)
+        with span("bm25_wait"):
+            lexical_hits = lexical.result()
+        fused = [reciprocal_rank_fusion([dense_hits, query_lexical], n_results, RRF_K)
+                 for dense_hits, query_lexical in zip(dense, lexical_hits)]
+        return self.vector_store.fetch_batch(fused, view=view)
@@ -0,0 +1,159 @@
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+from ..config import EMBEDDING_MODEL, EMBEDDING_BACKEND, EMBEDDING_ONNX_FILE, EMBEDDING_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# One encoder per (model name, backend) for the whole process. Every
+# VectorStore and service resolves its encoder through get_encoder() so the
+# model weights are loaded once per worker, on first use.
+#
+# An encoder is anything with encode(texts, batch_size=..., show_progress_bar=...)
+# returning a float32 (n, d) array and get_sentence_embedding_dimension().
+_encoders: Dict[Tuple[str, str], object] = {}
+_lock = threading.Lock()
+
+
+class OnnxEncoder:
+    """A sentence-transformers model run with ONNX Runtime: no torch import, and int8 weights if wanted.
+
+    Reads the model's exported ONNX graph, its tokenizer.json and pooling
+    config from a local directory or the Hugging Face hub, and reproduces the
+    torch pipeline: tokenize, truncate to max_seq_length, run the transformer,
+    pool the token embeddings (mean, CLS or max) and L2-normalize.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, file_name: str = EMBEDDING_ONNX_FILE,
+                 quantize: bool = False, cache_dir: str = EMBEDDING_CACHE_DIR):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise RuntimeError("EMBEDDING_BACKEND=onnx needs onnxruntime: pip install onnxruntime") from e
+        from tokenizers import Tokenizer
+
+        directory = _model_directory(model_name, file_name)
+        model_path = directory / file_name
+        if quantize:
+            model_path = _quantized(model_path, Path(cache_dir) / re.sub(r'[^\w.-]', '_', model_name))
+        settings = _read_json(directory / "sentence_bert_config.json")
+        self.max_seq_length = int(settings.get("max_seq_length") or 256)
+        self.pooling = _pooling_mode(_read_json(directory / "1_Pooling" / "config.json"))
+        self.tokenizer = Tokenizer.from_file(str(directory / "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.max_seq_length)
+        self.tokenizer.enable_padding()
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # The arena keeps the largest batch's buffers for good; without it RSS stays near the model size
+        options.enable_cpu_mem_arena = False
+        self.session = onnxruntime.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self._dimension = None
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = int(self.encode(["dimension"]).shape[1])
+        return self._dimension
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False, **_) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        # Longest first, as sentence-transformers does, so each batch pads to similar lengths
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        batches = []
+        for start in range(0, len(order), batch_size):
+            batches.append(self._encode_batch([texts[i] for i in order[start:start + batch_size]]))
+        vectors = np.empty((len(texts), batches[0].shape[1]), dtype=np.float32)
+        vectors[order] = np.concatenate(batches)
+        return vectors
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {"input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                  "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                  "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)}
+        tokens = self.session.run(None, {k: v for k, v in inputs.items() if k in self.input_names})[0]
+        mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+        if self.pooling == "cls":
+            pooled = tokens[:, 0]
+        elif self.pooling == "max":
+            pooled = np.where(mask > 0, tokens, -1e9).max(axis=1)
+        else:
+            pooled = (tokens * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+def _read_json(path: Path) -> Dict:
+    return json.loads(path.read_text(encoding='utf-8')) if path.exists() else {}
+
+
+def _pooling_mode(config: Dict) -> str:
+    if "pooling_mode" in config:
+        return config["pooling_mode"]
+    if config.get("pooling_mode_cls_token"):
+        return "cls"
+    if config.get("pooling_mode_max_tokens"):
+        return "max"
+    return "mean"
+
+
+def _model_directory(model_name: str, file_name: str) -> Path:
+    """A local model directory, or the files the ONNX encoder needs downloaded from the hub."""
+    if Path(model_name).is_dir():
+        return Path(model_name)
+    from huggingface_hub import snapshot_download
+    # Bare names refer to the sentence-transformers organisation, as SentenceTransformer() resolves them
+    repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    return Path(snapshot_download(repo, allow_patterns=[file_name, "tokenizer.json", "sentence_bert_config.json",
+                                                        "1_Pooling/config.json"]))
+
+
+def _quantized(model_path: Path, directory: Path) -> Path:
+    """Dynamically quantize the model's weights to int8, once; later loads reuse the file."""
+    target = directory / (model_path.stem + "_int8.onnx")
+    if not target.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        logger.info("Quantizing %s to int8 in %s", model_path, target)
+        directory.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(target.name + ".tmp")
+        quantize_dynamic(str(model_path), str(partial), weight_type=QuantType.QInt8)
+        partial.replace(target)
+    return target
+
+
+def _torch_encoder(model_name: str):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+# EMBEDDING_BACKEND -> loader taking the model name
+BACKENDS: Dict[str, Callable[[str], object]] = {
+    "torch": _torch_encoder,
+    "onnx": lambda model_name: OnnxEncoder(model_name),
+    "onnx-int8": lambda model_name: OnnxEncoder(model_name, quantize=True),
+}
+
+
+def get_encoder(model_name: str = EMBEDDING_MODEL, backend: str = EMBEDDING_BACKEND):
+    """Return the shared encoder for model_name on the given backend, loading it lazily."""
+    key = (model_name, backend)
+    encoder = _encoders.get(key)
+    if encoder is None:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}; expected one of {sorted(BACKENDS)}")
+        with _lock:
+            encoder = _encoders.get(key)
+            if encoder is None:
+                encoder = BACKENDS[backend](model_name)
+                _encoders[key] = encoder
+    return encoder
+
+
+def loaded_encoders() -> int:
+    """Number of encoder models currently resident in this process."""
+    return len(_encoders)
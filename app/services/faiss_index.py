@@ -0,0 +1,148 @@
+from typing import Dict, List, Optional, Tuple
+import faiss
+import numpy as np
+from ..config import INDEX_PARAMS
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Return an L2-normalized float32 copy so inner product equals cosine similarity."""
+    vectors = np.array(vectors, dtype='float32', order='C', copy=True, ndmin=2)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def index_kind(index: faiss.Index) -> str:
+    """Which of INDEX_TYPES an (ID-mapped) index is."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivfpq"
+    return "flat"
+
+
+def _pq_subquantizers(dimension: int, wanted: int) -> int:
+    # PQ needs the dimension to split evenly across sub-quantizers
+    m = min(wanted, dimension)
+    while dimension % m:
+        m -= 1
+    return m
+
+
+def new_index(kind: str, dimension: int, training: Optional[np.ndarray] = None,
+              params: Dict = INDEX_PARAMS) -> faiss.IndexIDMap2:
+    """Build an empty ID-mapped inner-product index of the requested kind.
+
+    IVF-PQ has to be trained; without at least ivf_min_train training vectors a
+    flat index is returned instead and the caller upgrades it later.
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {kind}")
+    if kind == "hnsw":
+        inner = faiss.IndexHNSWFlat(dimension, params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        inner.hnsw.efConstruction = params["hnsw_ef_construction"]
+    elif kind == "ivfpq" and training is not None and len(training) >= params["ivf_min_train"]:
+        nlist = params["ivf_nlist"] or int(np.clip(4 * np.sqrt(len(training)), 16, 65536))
+        quantizer = faiss.IndexFlatIP(dimension)
+        inner = faiss.IndexIVFPQ(quantizer, dimension, nlist, _pq_subquantizers(dimension, params["pq_m"]),
+                                 params["pq_nbits"], faiss.METRIC_INNER_PRODUCT)
+        # k-means does not need more than a few hundred points per list
+        sample = training
+        if len(sample) > 256 * nlist:
+            rows = np.random.default_rng(0).choice(len(sample), 256 * nlist, replace=False)
+            sample = sample[np.sort(rows)]
+        inner.train(np.ascontiguousarray(sample, dtype='float32'))
+    else:
+        inner = faiss.IndexFlatIP(dimension)  # Inner product on normalized vectors = cosine similarity
+    index = faiss.IndexIDMap2(inner)
+    configure_search(index, params)
+    return index
+
+
+def read_index(path, kind: str, mmap: bool = True) -> faiss.Index:
+    """Read a persisted index, memory-mapping its vectors / inverted lists unless mmap=False.
+
+    A mapped index is read-only: mutating it aborts inside FAISS, so callers
+    must re-read it with mmap=False before adding or removing vectors.
+    """
+    flags = 0
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP if kind == "ivfpq" else faiss.IO_FLAG_MMAP_IFC
+    return faiss.read_index(str(path), flags)
+
+
+def copy_index(index: faiss.Index, params: Dict = INDEX_PARAMS) -> faiss.Index:
+    """A writable copy of an in-memory index (re-read a memory-mapped one with read_index(mmap=False))."""
+    copy = faiss.deserialize_index(faiss.serialize_index(index))
+    configure_search(copy, params)
+    return copy
+
+
+def configure_search(index: faiss.Index, params: Dict = INDEX_PARAMS):
+    """Apply the query-time knobs (efSearch / nprobe), which are not reliably persisted."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = params["hnsw_ef_search"]
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = min(params["ivf_nprobe"], inner.nlist)
+
+
+def stored_vectors(index: faiss.IndexIDMap2):
+    """All (ids, vectors) held by an ID-mapped index. Lossy for IVF-PQ."""
+    ids = faiss.vector_to_array(index.id_map).astype('int64')
+    if len(ids) == 0:
+        return ids, np.zeros((0, index.d), dtype='float32')
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexIVF):
+        inner.make_direct_map()
+    return ids, inner.reconstruct_n(0, inner.ntotal)
+
+
+def rebuild(index: faiss.IndexIDMap2, kind: str, exclude: Optional[np.ndarray] = None,
+            params: Dict = INDEX_PARAMS) -> faiss.IndexIDMap2:
+    """Copy an index's vectors into a freshly built index of the given kind, optionally dropping some ids."""
+    ids, vectors = stored_vectors(index)
+    if exclude is not None and len(exclude):
+        keep = ~np.isin(ids, exclude)
+        ids, vectors = ids[keep], vectors[keep]
+    new = new_index(kind, index.d, training=vectors, params=params)
+    if len(ids):
+        new.add_with_ids(vectors, ids)
+    return new
+
+
+def remove_ids(index: faiss.IndexIDMap2, keys: np.ndarray,
+               deferred: Optional[List[Tuple[np.ndarray, int]]] = None) -> faiss.IndexIDMap2:
+    """Remove ids from an index.
+
+    HNSW has no native removal: the index is rebuilt from its stored vectors,
+    which costs as much as building it. Pass a ``deferred`` list to only record
+    the removal there (with the rows it covers, so vectors added under the same
+    ids later survive) and apply every recorded removal with one rebuild in
+    compact(). Removed vectors stay searchable until then.
+    """
+    if index_kind(index) == "hnsw":
+        if deferred is not None:
+            deferred.append((np.asarray(keys, dtype='int64'), index.ntotal))
+            return index
+        return rebuild(index, "hnsw", exclude=keys)
+    index.remove_ids(faiss.IDSelectorBatch(keys))
+    return index
+
+
+def compact(index: faiss.IndexIDMap2, deferred: List[Tuple[np.ndarray, int]],
+            params: Dict = INDEX_PARAMS) -> faiss.IndexIDMap2:
+    """Apply the removals remove_ids() deferred, rebuilding the index once, and clear the list."""
+    if not deferred:
+        return index
+    ids, vectors = stored_vectors(index)
+    keep = np.ones(len(ids), dtype=bool)
+    for keys, rows in deferred:
+        keep[:rows] &= ~np.isin(ids[:rows], keys)
+    deferred.clear()
+    new = new_index(index_kind(index), index.d, training=vectors[keep], params=params)
+    if keep.any():
+        new.add_with_ids(vectors[keep], ids[keep])
+    return new
@@ -0,0 +1,182 @@
+"""Deterministic, offline stand-in for the Groq chat completions API.
+
+FakeGroq / AsyncFakeGroq expose the ``client.chat.completions.create(...)``
+surface ChatService uses, streaming included. The reply is derived from the
+prompt, so identical requests produce identical answers, and latency is
+simulated with a time-to-first-token (plus an optional cost per prompt token)
+and a per-token delay. Select it with
+LLM_BACKEND=fake to benchmark latency and concurrency without network access.
+ProviderLimits adds the provider's rate limits: requests beyond a concurrency
+or tokens-per-minute limit fail with a 429 carrying Retry-After, so the
+LLMGateway's scheduling and retries can be load-tested offline.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+from ..config import (FAKE_LLM_TTFT_MS, FAKE_LLM_TOKEN_MS, FAKE_LLM_TOKENS, FAKE_LLM_MAX_IN_FLIGHT,
+                      FAKE_LLM_TOKENS_PER_MINUTE, FAKE_LLM_PROMPT_TOKEN_MS)
+
+
+def fake_reply(messages: List[Dict], max_tokens: int = FAKE_LLM_TOKENS) -> List[str]:
+    """The tokens of the deterministic reply to a conversation."""
+    prompt = messages[-1]["content"] if messages else ""
+    digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    sources = sorted({line.split()[1] for line in prompt.splitlines() if line.startswith("Source: ")})
+    words = ["This", "is", "a", "simulated", "answer", f"({digest[:8]})", "based", "on"]
+    words += sources or ["no", "retrieved", "context"]
+    while len(words) < max_tokens:
+        words.append(digest[len(words) % len(digest)])
+    return [word + " " for word in words[:max_tokens]]
+
+
+class FakeRateLimitError(Exception):
+    """The fake provider's 429, shaped like the SDK's: status_code and a Retry-After header."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": f"{retry_after:.3f}"})
+
+
+class ProviderLimits:
+    """Concurrent requests and tokens per minute the fake provider accepts (0 = unlimited)."""
+
+    def __init__(self, max_in_flight: int = FAKE_LLM_MAX_IN_FLIGHT,
+                 tokens_per_minute: int = FAKE_LLM_TOKENS_PER_MINUTE, window: float = 60.0):
+        self.max_in_flight = max_in_flight
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self.in_flight = 0
+        self.calls = 0
+        self.rejected = 0
+        self._spent: Deque[Tuple[float, int]] = deque()  # (time, tokens) within the last window
+        self._lock = threading.Lock()
+
+    def admit(self, tokens: int, retry_after: float):
+        """Take a request slot and charge its tokens, or raise FakeRateLimitError. Pair with release()."""
+        with self._lock:
+            now = time.monotonic()
+            while self._spent and self._spent[0][0] <= now - self.window:
+                self._spent.popleft()
+            error: Optional[FakeRateLimitError] = None
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                error = FakeRateLimitError(f"Rate limit reached: {self.max_in_flight} concurrent requests",
+                                           retry_after)
+            elif self.tokens_per_minute and sum(spent for _, spent in self._spent) + tokens > self.tokens_per_minute:
+                wait = self._spent[0][0] + self.window - now if self._spent else self.window
+                error = FakeRateLimitError(f"Rate limit reached: {self.tokens_per_minute} tokens per minute",
+                                           wait)
+            if error is not None:
+                self.rejected += 1
+                raise error
+            self.in_flight += 1
+            self.calls += 1
+            self._spent.append((now, tokens))
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict:
+        return {"calls": self.calls, "rejected": self.rejected, "in_flight": self.in_flight}
+
+
+def _prompt_tokens(messages: List[Dict]) -> int:
+    return sum(len(m.get("content", "").split()) for m in messages)
+
+
+def _usage(messages: List[Dict], tokens: List[str]):
+    prompt_tokens = _prompt_tokens(messages)
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(tokens),
+                           total_tokens=prompt_tokens + len(tokens))
+
+
+def _completion(model: str, messages: List[Dict], tokens: List[str]):
+    message = SimpleNamespace(role="assistant", content="".join(tokens).strip())
+    return SimpleNamespace(model=model, choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+                           usage=_usage(messages, tokens))
+
+
+def _chunk(model: str, content, finish_reason=None):
+    delta = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(model=model, choices=[SimpleNamespace(index=0, delta=delta, finish_reason=finish_reason)])
+
+
+class _Completions:
+    def __init__(self, ttft_ms: float, token_ms: float, limits: ProviderLimits, prompt_token_ms: float = 0.0):
+        self.ttft = ttft_ms / 1000
+        self.per_token = token_ms / 1000
+        self.per_prompt_token = prompt_token_ms / 1000
+        self.limits = limits
+
+    def _first_token(self, messages: List[Dict]) -> float:
+        """Seconds before the first token: fixed overhead plus reading the prompt."""
+        return self.ttft + self.per_prompt_token * _prompt_tokens(messages)
+
+    def _admit(self, messages: List[Dict], tokens: List[str]):
+        # A rate limit is raised by create() itself, before any chunk, like the real API
+        self.limits.admit(_prompt_tokens(messages) + len(tokens), self.ttft)
+
+    def create(self, model: str, messages: List[Dict], max_tokens: int = FAKE_LLM_TOKENS, stream: bool = False,
+               **_):
+        tokens = fake_reply(messages, min(max_tokens, FAKE_LLM_TOKENS))
+        self._admit(messages, tokens)
+        if stream:
+            return self._stream(model, tokens, self._first_token(messages))
+        try:
+            time.sleep(self._first_token(messages) + self.per_token * len(tokens))
+        finally:
+            self.limits.release()
+        return _completion(model, messages, tokens)
+
+    def _stream(self, model: str, tokens: List[str], first_token: float) -> Iterator:
+        try:
+            time.sleep(first_token)
+            for token in tokens:
+                yield _chunk(model, token)
+                time.sleep(self.per_token)
+            yield _chunk(model, None, "stop")
+        finally:
+            self.limits.release()
+
+
+class _AsyncCompletions(_Completions):
+    async def create(self, model: str, messages: List[Dict], max_tokens: int = FAKE_LLM_TOKENS,
+                     stream: bool = False, **_):
+        tokens = fake_reply(messages, min(max_tokens, FAKE_LLM_TOKENS))
+        self._admit(messages, tokens)
+        if stream:
+            return self._astream(model, tokens, self._first_token(messages))
+        try:
+            await asyncio.sleep(self._first_token(messages) + self.per_token * len(tokens))
+        finally:
+            self.limits.release()
+        return _completion(model, messages, tokens)
+
+    async def _astream(self, model: str, tokens: List[str], first_token: float):
+        try:
+            await asyncio.sleep(first_token)
+            for token in tokens:
+                yield _chunk(model, token)
+                await asyncio.sleep(self.per_token)
+            yield _chunk(model, None, "stop")
+        finally:
+            self.limits.release()
+
+
+class FakeGroq:
+    def __init__(self, ttft_ms: float = FAKE_LLM_TTFT_MS, token_ms: float = FAKE_LLM_TOKEN_MS,
+                 limits: ProviderLimits = None, prompt_token_ms: float = FAKE_LLM_PROMPT_TOKEN_MS, **_):
+        self.limits = limits or ProviderLimits()
+        self.chat = SimpleNamespace(completions=_Completions(ttft_ms, token_ms, self.limits, prompt_token_ms))
+
+
+class AsyncFakeGroq:
+    def __init__(self, ttft_ms: float = FAKE_LLM_TTFT_MS, token_ms: float = FAKE_LLM_TOKEN_MS,
+                 limits: ProviderLimits = None, prompt_token_ms: float = FAKE_LLM_PROMPT_TOKEN_MS, **_):
+        self.limits = limits or ProviderLimits()
+        self.chat = SimpleNamespace(completions=_AsyncCompletions(ttft_ms, token_ms, self.limits, prompt_token_ms))
@@ -0,0 +1,367 @@
+"""Aggregate and filter questions over hr_data.csv, answered without the LLM.
+
+HRAnalytics keeps the numeric columns as float64 arrays and department /
+location / role as integer codes, and precomputes per-group row counts, sums,
+minima and maxima of every metric when the table is loaded. A question is
+parsed into an aggregation (average, total, minimum, maximum, headcount, top
+N), a metric, an optional group-by, filters on department / location / role
+values and an optional numeric threshold ("attendance below 80"). Unfiltered
+aggregates are read from the summaries; filtered ones are computed with
+np.bincount over a boolean mask. ``extended()`` folds appended rows into the
+summaries without recomputing the rest.
+"""
+import operator
+import re
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+METRICS = ("salary", "attendance_pct", "performance_rating", "leave_balance", "leaves_taken")
+GROUP_FIELDS = ("department", "location", "role")
+LIST_LIMIT = 50  # employees listed for a threshold or top-N question
+TOP_DEFAULT = 5
+
+METRIC_LABELS = {"salary": "salary", "attendance_pct": "attendance %", "performance_rating": "performance rating",
+                 "leave_balance": "leave balance", "leaves_taken": "leaves taken"}
+AGGREGATE_LABELS = {"mean": "Average", "sum": "Total", "min": "Minimum", "max": "Maximum", "count": "Headcount"}
+
+# Most specific first: "leave balance" and "leaves taken" before anything shorter
+METRIC_WORDS = [
+    ("leave_balance", r"leave balances?|leaves? left|remaining leaves?|leaves? remaining"),
+    ("leaves_taken", r"leaves? taken|leaves? used"),
+    ("attendance_pct", r"attendance(?: percentage| percent| %)?"),
+    ("performance_rating", r"performance(?: ratings?| scores?)?|ratings?|rated"),
+    ("salary", r"salar(?:y|ies)|pay|compensation|ctc"),
+]
+GROUP_WORDS = {"department": r"departments?|depts?|teams?", "location": r"locations?|cit(?:y|ies)|offices?",
+               "role": r"roles?|titles?|positions?|designations?"}
+OPERATORS = {"below": "<", "under": "<", "less than": "<", "lower than": "<", "fewer than": "<", "<": "<",
+             "above": ">", "over": ">", "more than": ">", "greater than": ">", "higher than": ">", ">": ">",
+             "at least": ">=", "no less than": ">=", ">=": ">=", "at most": "<=", "no more than": "<=", "<=": "<=",
+             "equal to": "==", "exactly": "==", "=": "==", "of": "=="}
+COMPARE = {"<": operator.lt, ">": operator.gt, "<=": operator.le, ">=": operator.ge, "==": operator.eq}
+UNITS = {"k": 1e3, "l": 1e5, "lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5, "m": 1e6, "million": 1e6,
+         "cr": 1e7, "crore": 1e7, "crores": 1e7}
+
+_METRIC = "|".join(f"(?:{words})" for _, words in METRIC_WORDS)
+
+
+def _alternation(words) -> str:
+    return "|".join(sorted((re.escape(word) for word in words), key=len, reverse=True))
+
+
+_NUMBER = r"(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>%|k|lakhs?|lacs?|l|million|m|crores?|cr)?(?!\w)"
+_THRESHOLD = re.compile(rf"\b(?P<metric>{_METRIC})\s+(?:(?:is|are|was|percentage|percent|score)\s+)?"
+                        rf"(?P<op>{_alternation(OPERATORS)})\s+{_NUMBER}")
+# "below 80% attendance"; "of" only reads as a comparison after the metric ("rating of 5")
+_THRESHOLD_BEFORE = re.compile(rf"(?P<op>{_alternation(op for op in OPERATORS if op != 'of')})\s+{_NUMBER}"
+                               rf"\s*(?:of\s+)?(?P<metric>{_METRIC})\b")
+_GROUP_BY = re.compile(r"\b(?:by|per|for each|in each|for every|across|each|which|what)\s+(?:the\s+)?(?P<field>"
+                       + "|".join(f"(?:{words})" for words in GROUP_WORDS.values()) + r")\b")
+_AGGREGATES = [(re.compile(r"\b(?:average|avg|mean)\b"), "mean"),
+               (re.compile(r"\b(?:total|sum of|combined)\b"), "sum"),
+               (re.compile(r"\b(?:minimum|min|lowest|smallest|least)\b"), "min"),
+               (re.compile(r"\b(?:maximum|max|highest|largest|most)\b"), "max"),
+               (re.compile(r"\b(?:headcount|head count|how many|number of|count)\b"), "count")]
+_PEOPLE = re.compile(r"\b(?:headcount|head count|employees?|people|staff|members|workers|persons)\b")
+_RANKING = re.compile(r"\b(?P<word>top|bottom|best|worst)\b(?:\s+(?P<n>\d+))?"
+                      r"|\bwho (?:has|have|had|is|are|gets?) (?:the )?(?P<who>highest|lowest|best|worst|most|least)\b")
+TRIGGER = re.compile(r"\b(?:average|avg|mean|total|sum|combined|minimum|min|lowest|smallest|least|maximum|max|highest"
+                     r"|largest|most|headcount|head count|how many|number of|count|top|bottom|best|worst|below|under"
+                     r"|above|over|less than|more than|greater than|lower than|higher than|fewer than|at least"
+                     r"|at most|exactly|equal to)\b|[<>=]")
+# Words a question may wrap around what answer() parses. Anything else left over (a name, a date, a place
+# not in the table, "report to", "I") is a condition it would silently drop, so it answers None instead.
+_FILLER = ("what", "which", "who", "whose", "is", "are", "was", "were", "has", "have", "had", "do", "does", "get",
+           "gets", "the", "a", "an", "of", "in", "at", "for", "from", "by", "per", "each", "every", "across", "with",
+           "and", "or", "all", "there", "our", "overall", "company", "show", "list", "give", "tell", "me", "wise")
+_UNDERSTOOD = [_GROUP_BY, _RANKING, re.compile(rf"\b(?:{_METRIC})\b"), *(pattern for pattern, _ in _AGGREGATES),
+               _PEOPLE, re.compile(r"\b(?:" + "|".join(GROUP_WORDS.values()) + "|" + _alternation(_FILLER) + r")\b")]
+
+
+def _metric_of(text: str) -> Optional[str]:
+    for metric, words in METRIC_WORDS:
+        if re.fullmatch(words, text):
+            return metric
+    return None
+
+
+def _understood(q: str) -> bool:
+    """Whether every word of q is one answer() parses or may ignore."""
+    q = re.sub(r"'s\b", " ", q)
+    for pattern in _UNDERSTOOD:
+        q = pattern.sub(" ", q)
+    return not re.search(r"[a-z0-9]", q)
+
+
+def _summarize(codes: np.ndarray, groups: int, values: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per-group rows, and per metric and group the non-missing count, sum, min and max. values is (metrics, rows)."""
+    valid = ~np.isnan(values)
+    clean = np.where(valid, values, 0.0)
+    summary = {"rows": np.bincount(codes, minlength=groups),
+               "n": np.stack([np.bincount(codes, weights=v, minlength=groups) for v in valid]),
+               "sum": np.stack([np.bincount(codes, weights=v, minlength=groups) for v in clean]),
+               "min": np.full((len(values), groups), np.inf), "max": np.full((len(values), groups), -np.inf)}
+    if groups == 1 and len(codes):
+        summary["min"][:, 0] = np.where(valid, values, np.inf).min(axis=1)
+        summary["max"][:, 0] = np.where(valid, values, -np.inf).max(axis=1)
+    elif len(codes):
+        # Sorting by group once and reducing each run is much cheaper than np.minimum.at on large tables
+        order = np.argsort(codes, kind="stable")
+        ordered = codes[order]
+        starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+        present = ordered[starts]
+        for m, v in enumerate(values):
+            v = v[order]
+            missing = np.isnan(v)
+            summary["min"][m, present] = np.minimum.reduceat(np.where(missing, np.inf, v), starts)
+            summary["max"][m, present] = np.maximum.reduceat(np.where(missing, -np.inf, v), starts)
+    return summary
+
+
+def _pad(summary: Dict[str, np.ndarray], groups: int) -> Dict[str, np.ndarray]:
+    extra = groups - len(summary["rows"])
+    if extra <= 0:
+        return summary
+    fill = {"rows": 0, "n": 0.0, "sum": 0.0, "min": np.inf, "max": -np.inf}
+    return {key: np.concatenate([array, np.full(array.shape[:-1] + (extra,), fill[key], dtype=array.dtype)], axis=-1)
+            for key, array in summary.items()}
+
+
+def _merge(a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    groups = max(len(a["rows"]), len(b["rows"]))
+    a, b = _pad(a, groups), _pad(b, groups)
+    return {"rows": a["rows"] + b["rows"], "n": a["n"] + b["n"], "sum": a["sum"] + b["sum"],
+            "min": np.minimum(a["min"], b["min"]), "max": np.maximum(a["max"], b["max"])}
+
+
+def _select(summary: Dict[str, np.ndarray], groups) -> Dict[str, np.ndarray]:
+    """The summary of the given groups taken together, as one group."""
+    reduce = {"rows": np.sum, "n": np.sum, "sum": np.sum, "min": np.min, "max": np.max}
+    return {key: reduce[key](array[..., groups], axis=-1, keepdims=True) for key, array in summary.items()}
+
+
+def _aggregate(summary: Dict[str, np.ndarray], agg: str, metric: int) -> np.ndarray:
+    if agg == "count":
+        return summary["rows"].astype(np.float64)
+    n = summary["n"][metric]
+    if agg == "mean":
+        return np.divide(summary["sum"][metric], n, out=np.full(n.shape, np.nan), where=n > 0)
+    return np.where(n > 0, summary[agg][metric], np.nan)
+
+
+def _format(value: float, metric: Optional[str]) -> str:
+    text = f"{value:,.0f}" if float(value).is_integer() else f"{value:,.2f}"
+    return text + "%" if metric == "attendance_pct" else text
+
+
+def _people(n) -> str:
+    return f"{int(n)} employee" + ("" if n == 1 else "s")
+
+
+class HRAnalytics:
+    """Typed columns and per-group summaries of the HR table. Immutable once built; extended() returns a new one."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.ids = df['employee_id'].astype(str).to_numpy(dtype=object)
+        self.names = df['full_name'].astype(str).to_numpy(dtype=object)
+        self.values = np.stack([pd.to_numeric(df[m], errors='coerce').to_numpy(dtype=np.float64) for m in METRICS])
+        self.codes: Dict[str, np.ndarray] = {}
+        self.labels: Dict[str, List[str]] = {}
+        for field in GROUP_FIELDS:
+            codes, uniques = pd.factorize(df[field].astype(str))
+            self.codes[field] = codes.astype(np.int64)
+            self.labels[field] = [str(label) for label in uniques]
+        self.summaries = {field: _summarize(self.codes[field], len(self.labels[field]), self.values)
+                          for field in GROUP_FIELDS}
+        self._compile()
+
+    def _compile(self):
+        self._value_patterns = {}
+        for field in GROUP_FIELDS:
+            labels = sorted({label.lower() for label in self.labels[field] if label}, key=len, reverse=True)
+            self._value_patterns[field] = re.compile(
+                r"\b(" + "|".join(re.escape(label) for label in labels) + r")s?\b") if labels else None
+        self._codes_by_label = {field: {label.lower(): code for code, label in enumerate(self.labels[field])}
+                                for field in GROUP_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def extended(self, rows: pd.DataFrame) -> "HRAnalytics":
+        """A new HRAnalytics with rows appended; only the new rows are summarized."""
+        new = object.__new__(HRAnalytics)
+        new.ids = np.concatenate([self.ids, rows['employee_id'].astype(str).to_numpy(dtype=object)])
+        new.names = np.concatenate([self.names, rows['full_name'].astype(str).to_numpy(dtype=object)])
+        values = np.stack([pd.to_numeric(rows[m], errors='coerce').to_numpy(dtype=np.float64) for m in METRICS])
+        new.values = np.concatenate([self.values, values], axis=1)
+        new.codes, new.labels, new.summaries = {}, {}, {}
+        for field in GROUP_FIELDS:
+            labels = list(self.labels[field])
+            lookup = {label: code for code, label in enumerate(labels)}
+            codes = np.empty(len(rows), dtype=np.int64)
+            for i, label in enumerate(rows[field].astype(str).tolist()):
+                code = lookup.get(label)
+                if code is None:
+                    code = lookup[label] = len(labels)
+                    labels.append(label)
+                codes[i] = code
+            new.codes[field] = np.concatenate([self.codes[field], codes])
+            new.labels[field] = labels
+            new.summaries[field] = _merge(self.summaries[field], _summarize(codes, len(labels), values))
+        new._compile()
+        return new
+
+    # -- questions -------------------------------------------------------------------
+
+    def answer(self, question: str) -> Optional[str]:
+        """The answer to an aggregate, threshold or top-N question about the table, or None if it isn't one."""
+        q = question.lower().strip().rstrip('?!. ')
+        threshold, q = self._threshold(q)
+        group_by = self._group_by(q)
+        filters, q = self._filters(q)
+        if not _understood(q):
+            return None
+        found = re.search(rf"\b(?:{_METRIC})\b", q)
+        metric = _metric_of(found.group(0)) if found else None
+        ranking = _RANKING.search(q)
+        if ranking and (metric or threshold):
+            return self._top(metric or threshold[0], ranking, filters, threshold)
+        agg = next((agg for pattern, agg in _AGGREGATES if pattern.search(q)), None)
+        people = _PEOPLE.search(q)
+        if agg in ("min", "max") and metric is None and people:
+            agg = "count"  # "which location has the most employees"
+        if agg == "count" and not (people or group_by):
+            agg = None  # "how many leaves can I take" is a policy question
+        if agg in ("mean", "sum", "min", "max"):
+            metric = metric or (threshold[0] if threshold else None)
+            if metric is None:
+                return None
+            return self._aggregate(agg, metric, group_by, filters, threshold)
+        if agg == "count":
+            return self._aggregate(agg, None, group_by, filters, threshold)
+        if threshold:
+            return self._list(filters, threshold)
+        return None
+
+    def _threshold(self, q: str) -> Tuple[Optional[Tuple[str, str, float]], str]:
+        """(metric, operator, value) of a numeric condition, and the question without it."""
+        match = _THRESHOLD.search(q) or _THRESHOLD_BEFORE.search(q)
+        if not match:
+            return None, q
+        value = float(match.group("value")) * UNITS.get(match.group("unit") or "", 1.0)
+        condition = (_metric_of(match.group("metric")), OPERATORS[match.group("op")], value)
+        return condition, q[:match.start()] + " " + q[match.end():]
+
+    @staticmethod
+    def _group_by(q: str) -> Optional[str]:
+        match = _GROUP_BY.search(q)
+        if not match:
+            return None
+        return next(field for field, words in GROUP_WORDS.items() if re.fullmatch(words, match.group("field")))
+
+    def _filters(self, q: str) -> Tuple[Dict[str, List[int]], str]:
+        """Department / location / role values named in the question (roles first: "HR Manager" before "HR")."""
+        filters: Dict[str, List[int]] = {}
+        for field in ("role", "department", "location"):
+            pattern = self._value_patterns[field]
+            if pattern is None:
+                continue
+            for match in pattern.finditer(q):
+                filters.setdefault(field, []).append(self._codes_by_label[field][match.group(1)])
+            q = pattern.sub(" ", q)
+        return filters, q
+
+    def _mask(self, filters: Dict[str, List[int]], threshold) -> Optional[np.ndarray]:
+        mask = None
+        for field, codes in filters.items():
+            selected = np.zeros(len(self.labels[field]), dtype=bool)
+            selected[codes] = True
+            condition = selected[self.codes[field]]
+            mask = condition if mask is None else mask & condition
+        if threshold:
+            metric, op, value = threshold
+            column = self.values[METRICS.index(metric)]
+            condition = COMPARE[op](column, value)
+            mask = condition if mask is None else mask & condition
+        return mask
+
+    def _describe(self, filters: Dict[str, List[int]], threshold) -> str:
+        parts = [f"{field} " + " or ".join(self.labels[field][code] for code in codes)
+                 for field, codes in filters.items()]
+        if threshold:
+            metric, op, value = threshold
+            parts.append(f"{METRIC_LABELS[metric]} {op} {_format(value, metric)}")
+        return f" ({', '.join(parts)})" if parts else ""
+
+    def _aggregate(self, agg: str, metric: Optional[str], group_by: Optional[str], filters, threshold) -> str:
+        m = METRICS.index(metric) if metric else 0
+        single_filter = len(filters) == 1 and not threshold and not group_by
+        if not filters and not threshold:
+            summary = self.summaries[group_by or "department"]
+            if group_by is None:
+                summary = _select(summary, slice(None))
+        elif single_filter:
+            field, codes = next(iter(filters.items()))
+            summary = _select(self.summaries[field], codes)
+        else:
+            mask = self._mask(filters, threshold)
+            codes = self.codes[group_by][mask] if group_by else np.zeros(int(mask.sum()), dtype=np.int64)
+            groups = len(self.labels[group_by]) if group_by else 1
+            if agg == "count":
+                summary = {"rows": np.bincount(codes, minlength=groups)}
+            else:  # only the asked metric is summarized
+                summary = _summarize(codes, groups, self.values[m:m + 1, mask])
+                m = 0
+        values = _aggregate(summary, agg, m)
+        title = AGGREGATE_LABELS[agg] + (f" {METRIC_LABELS[metric]}" if metric else "")
+        scope = self._describe(filters, threshold)
+        if group_by is None:
+            if summary["rows"][0] == 0 or np.isnan(values[0]):
+                return f"No employees found{scope}."
+            employees = "" if agg == "count" else f" ({_people(summary['rows'][0])})"
+            return f"{title}{scope}: {_format(values[0], metric)}{employees}"
+        groups = [g for g in np.argsort(-values, kind="stable") if summary["rows"][g] > 0 and not np.isnan(values[g])]
+        if not groups:
+            return f"No employees found{scope}."
+        lines = [f"{self.labels[group_by][g]}: {_format(values[g], metric)}"
+                 + ("" if agg == "count" else f" ({_people(summary['rows'][g])})") for g in groups]
+        return f"{title} by {group_by}{scope}:\n" + "\n".join(lines)
+
+    def _employees(self, rows: np.ndarray, metric: str) -> List[str]:
+        column = self.values[METRICS.index(metric)]
+        return [f"{self.names[row]} ({self.ids[row]}, {self.labels['department'][self.codes['department'][row]]}, "
+                f"{self.labels['location'][self.codes['location'][row]]}): {_format(column[row], metric)}"
+                for row in rows.tolist()]
+
+    def _top(self, metric: str, ranking: re.Match, filters, threshold) -> str:
+        word = ranking.group("word") or ranking.group("who")
+        descending = word in ("top", "best", "highest", "most")
+        n = min(int(ranking.group("n") or (TOP_DEFAULT if ranking.group("word") else 1)), LIST_LIMIT)
+        column = self.values[METRICS.index(metric)]
+        mask = self._mask(filters, threshold)
+        rows = np.flatnonzero(~np.isnan(column) if mask is None else mask & ~np.isnan(column))
+        if not len(rows):
+            return f"No employees found{self._describe(filters, threshold)}."
+        keys = -column[rows] if descending else column[rows]
+        if len(rows) > n:
+            # Partition first, then sort only the n best; ties keep table order
+            candidates = np.argpartition(keys, n - 1)[:n]
+            cutoff = keys[candidates].max()
+            candidates = np.flatnonzero(keys <= cutoff)
+            order = candidates[np.lexsort((candidates, keys[candidates]))][:n]
+        else:
+            order = np.lexsort((np.arange(len(rows)), keys))
+        title = f"{'Top' if descending else 'Bottom'} {len(order)} by {METRIC_LABELS[metric]}"
+        return f"{title}{self._describe(filters, threshold)}:\n" + "\n".join(
+            f"{i}. {line}" for i, line in enumerate(self._employees(rows[order], metric), 1))
+
+    def _list(self, filters, threshold) -> str:
+        metric = threshold[0]
+        rows = np.flatnonzero(self._mask(filters, threshold))
+        scope = self._describe(filters, threshold)
+        if not len(rows):
+            return f"No employees found{scope}."
+        shown = rows[np.argsort(self.values[METRICS.index(metric)][rows], kind="stable")[:LIST_LIMIT]]
+        more = f"\n... and {len(rows) - len(shown)} more" if len(rows) > len(shown) else ""
+        return f"{len(rows)} employees{scope}:\n" + "\n".join(self._employees(shown, metric)) + more
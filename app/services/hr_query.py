@@ -0,0 +1,237 @@
+"""Structured answers over hr_data.csv without the LLM.
+
+HRIndex is built once when the table is loaded: a hash map from employee_id to
+row, inverted token indexes over role / department / location / full_name, and
+manager -> direct reports adjacency. HRQueryEngine routes a question to one of
+a fixed list of precompiled intents and answers it from the index, so a lookup
+costs O(1) or O(matches) rather than a scan of the table. Aggregate, threshold
+and top-N questions go to HRAnalytics (see hr_analytics.py).
+"""
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .hr_analytics import HRAnalytics, TRIGGER
+
+SEARCH_FIELDS = ("role", "department", "location", "full_name")
+
+DETAIL_FIELDS = [
+    ("employee_id", "Employee ID"), ("full_name", "Full Name"), ("role", "Role"), ("department", "Department"),
+    ("email", "Email"), ("location", "Location"), ("date_of_birth", "Date of Birth"),
+    ("date_of_joining", "Date of Joining"), ("manager_id", "Manager ID"), ("salary", "Salary"),
+    ("leave_balance", "Leave Balance"), ("leaves_taken", "Leaves Taken"), ("attendance_pct", "Attendance %"),
+    ("performance_rating", "Performance Rating"), ("last_review_date", "Last Review Date"),
+]
+
+# Words a question wraps around the value it is asking about ("the role of", "department")
+FILLER_WORDS = {"a", "an", "the", "of", "role", "roles", "department", "departments", "dept", "location",
+                "locations", "city", "office", "team", "named", "called", "employee", "employees"}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_EMPLOYEE_ID = re.compile(r"finemp\d{4,}")
+_ROLE_PREFIX = re.compile(r"^(?:(?:the|roles?|of)\s+)+")  # "employees with the role of credit officer"
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(str(text).lower())
+
+
+def _listing_question(words: str) -> re.Pattern:
+    """A question asking for nothing but the list: "roles", "list all departments", "what are the locations"."""
+    return re.compile(r"^(?:(?:list|show(?: me)?|give me|name|what are|which are)\s+)?(?:all\s+)?(?:the\s+)?"
+                      rf"(?:{words})(?:\s+(?:available|are there|do we have))?$")
+
+
+class HRIndex:
+    """In-memory indexes over the HR table. Immutable once built."""
+
+    def __init__(self, df: pd.DataFrame):
+        df = df.reset_index(drop=True)
+        self.rows = len(df)
+        self.records: List[Dict] = df.to_dict('records')
+        self.by_id: Dict[str, int] = {}
+        for row, emp_id in enumerate(df['employee_id'].astype(str).tolist()):
+            self.by_id.setdefault(emp_id.upper(), row)
+        # field -> token -> sorted row numbers
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {field: self._postings(df[field]) for field in SEARCH_FIELDS}
+        self.reports: Dict[str, np.ndarray] = {
+            str(manager).upper(): np.asarray(rows, dtype=np.int64)
+            for manager, rows in df.groupby('manager_id', sort=False).indices.items()
+        }
+        self.distinct: Dict[str, List[str]] = {
+            field: df[field].drop_duplicates().astype(str).tolist()
+            for field in ("employee_id", "role", "department", "location", "full_name")
+        }
+
+    @staticmethod
+    def _postings(column: pd.Series, offset: int = 0) -> Dict[str, np.ndarray]:
+        # Tokenize each distinct value once; role / department / location have few of them
+        postings: Dict[str, List[np.ndarray]] = {}
+        for value, rows in column.astype(str).groupby(column.astype(str), sort=False).indices.items():
+            for token in set(tokenize(value)):
+                postings.setdefault(token, []).append(rows)
+        return {token: np.sort(np.concatenate(parts)) + offset for token, parts in postings.items()}
+
+    def extended(self, rows: pd.DataFrame) -> "HRIndex":
+        """A new HRIndex with rows appended; only the new rows are tokenized and grouped."""
+        rows = rows.reset_index(drop=True)
+        new = object.__new__(HRIndex)
+        new.rows = self.rows + len(rows)
+        new.records = self.records + rows.to_dict('records')
+        new.by_id = dict(self.by_id)
+        for row, emp_id in enumerate(rows['employee_id'].astype(str).tolist(), self.rows):
+            new.by_id.setdefault(emp_id.upper(), row)
+        # New row numbers all follow the old ones, so appending keeps every posting list sorted
+        new.postings = {}
+        for field in SEARCH_FIELDS:
+            postings = dict(self.postings[field])
+            for token, added in self._postings(rows[field], self.rows).items():
+                postings[token] = np.concatenate([postings[token], added]) if token in postings else added
+            new.postings[field] = postings
+        new.reports = dict(self.reports)
+        for manager, added in rows.groupby('manager_id', sort=False).indices.items():
+            manager = str(manager).upper()
+            added = np.asarray(added, dtype=np.int64) + self.rows
+            new.reports[manager] = np.concatenate([new.reports[manager], added]) if manager in new.reports else added
+        new.distinct = {}
+        for field, values in self.distinct.items():
+            seen = set(values)
+            new.distinct[field] = values + [value for value in rows[field].drop_duplicates().astype(str).tolist()
+                                            if value not in seen]
+        return new
+
+    def match(self, field: str, text: str) -> np.ndarray:
+        """Rows whose ``field`` contains every word of ``text`` (a trailing plural 's' is optional)."""
+        index = self.postings[field]
+        tokens = [t for t in tokenize(text) if t not in FILLER_WORDS]
+        if not tokens:
+            return np.zeros(0, dtype=np.int64)
+        lists = []
+        for token in tokens:
+            rows = index.get(token)
+            if rows is None and token.endswith('s'):
+                rows = index.get(token[:-1])
+            if rows is None:
+                return np.zeros(0, dtype=np.int64)
+            lists.append(rows)
+        lists.sort(key=len)
+        result = lists[0]
+        for rows in lists[1:]:
+            result = np.intersect1d(result, rows, assume_unique=True)
+            if len(result) == 0:
+                break
+        return result
+
+    def employee(self, emp_id: str) -> Optional[Dict]:
+        row = self.by_id.get(emp_id.upper())
+        return None if row is None else self.records[row]
+
+    def direct_reports(self, emp_id: str) -> np.ndarray:
+        return self.reports.get(emp_id.upper(), np.zeros(0, dtype=np.int64))
+
+    def names(self, rows: np.ndarray) -> List[str]:
+        """Distinct full names of the given rows, in table order."""
+        return list(dict.fromkeys(self.records[row]['full_name'] for row in rows.tolist()))
+
+
+def format_employee(record: Dict) -> str:
+    return "\n".join(f"{label}: {record[field]}" for field, label in DETAIL_FIELDS)
+
+
+class HRQueryEngine:
+    """Precompiled intent router over an HRIndex.
+
+    Intents are tried most specific first; the first whose pattern matches and
+    whose handler returns an answer wins. Returns None when no intent applies,
+    so the question falls through to retrieval and the LLM.
+    """
+
+    def __init__(self, index: HRIndex, analytics: Optional[HRAnalytics] = None):
+        self.index = index
+        self.analytics = analytics
+        self.intents: List[Tuple[re.Pattern, Callable[[re.Match], Optional[str]]]] = [
+            (_EMPLOYEE_ID, self._by_id),
+            (re.compile(r"(?:who is the manager of|manager of|who manages) ([\w\s]+)"), self._manager),
+            (re.compile(r"(?:who reports to|(?:employees?|people|staff) reports? to|direct reports of|reports of"
+                        r"|team of) ([\w\s]+)"), self._reports),
+            # Before the listings and role / place lookups: "average salary by department" is not a list of departments
+            (TRIGGER, self._analytics),
+            (re.compile(r"(?:employees? who (?:are|is)|employees? with|name (?:the )?employees? (?:who )?(?:are|is|with)?"
+                        r"|list (?:the )?employees? (?:who )?(?:are|is|with)) ([\w\s]+)"), self._by_role),
+            (re.compile(r"(?:employees? in|employees? based in|employees? from|who works in) ([\w\s]+)"), self._in),
+            (re.compile(r"(?:details for|show details for|info for|information for|find) ([\w\s]+)"), self._by_name),
+            # Whole-question matches only: "what is the relocation policy" is not a list of locations
+            (_listing_question(r"employee ids?"), self._listing("employee_id", "Employee IDs")),
+            (_listing_question(r"roles?"), self._listing("role", "Roles")),
+            (_listing_question(r"departments?"), self._listing("department", "Departments")),
+            (_listing_question(r"locations?"), self._listing("location", "Locations")),
+            (_listing_question(r"employees?(?: names?)?"), self._listing("full_name", "All Employees")),
+        ]
+
+    def answer(self, query: str) -> Optional[str]:
+        q = query.lower().strip().rstrip('?!. ')
+        for pattern, handler in self.intents:
+            match = pattern.search(q)
+            if match:
+                answer = handler(match)
+                if answer is not None:
+                    return answer
+        return None
+
+    # -- handlers ------------------------------------------------------------------
+
+    def _listing(self, field: str, title: str) -> Callable[[re.Match], str]:
+        return lambda match: f"{title}:\n" + "\n".join(self.index.distinct[field])
+
+    def _analytics(self, match: re.Match) -> Optional[str]:
+        return self.analytics.answer(match.string) if self.analytics is not None else None
+
+    def _by_id(self, match: re.Match) -> Optional[str]:
+        record = self.index.employee(match.group(0))
+        return format_employee(record) if record is not None else None
+
+    def _first_by_name(self, text: str) -> Optional[Dict]:
+        rows = self.index.match("full_name", text)
+        return self.index.records[int(rows[0])] if len(rows) else None
+
+    def _by_name(self, match: re.Match) -> Optional[str]:
+        record = self._first_by_name(match.group(1))
+        return format_employee(record) if record is not None else None
+
+    def _manager(self, match: re.Match) -> str:
+        name = match.group(1).strip()
+        record = self._first_by_name(name)
+        if record is None:
+            return f"No employee found with name '{name}'."
+        manager_id = record['manager_id']
+        manager = self.index.employee(str(manager_id))
+        if manager is None:
+            return f"Manager ID for {record['full_name']}: {manager_id} (not found in data)"
+        return f"Manager of {record['full_name']}: {manager['full_name']} (ID: {manager_id})"
+
+    def _reports(self, match: re.Match) -> str:
+        name = match.group(1).strip()
+        record = self._first_by_name(name)
+        if record is None:
+            return f"No employee found with name '{name}'."
+        names = self.index.names(self.index.direct_reports(str(record['employee_id'])))
+        if not names:
+            return f"No employees report to {record['full_name']}."
+        return f"Direct reports of {record['full_name']} ({len(names)}):\n" + "\n".join(names)
+
+    def _by_role(self, match: re.Match) -> str:
+        role = _ROLE_PREFIX.sub("", match.group(1).strip())
+        names = self.index.names(self.index.match("role", role))
+        if names:
+            return f"Employees with role '{role}':\n" + "\n".join(names)
+        return f"No employees found with role '{role}'."
+
+    def _in(self, match: re.Match) -> str:
+        place = match.group(1).strip()
+        names = self.index.names(self.index.match("department", place))
+        if names:
+            return f"Employees in department '{place}':\n" + "\n".join(names)
+        names = self.index.names(self.index.match("location", place))
+        if names:
+            return f"Employees in location '{place}':\n" + "\n".join(names)
+        return f"No employees found in department or location '{place}'."
@@ -0,0 +1,138 @@
+"""hr_data.csv behind the structured HR answers, reloaded when the file changes.
+
+``check()`` costs one stat() of the file. When the file changed, ``refresh()``
+runs on a background thread while questions are still answered from the
+previous HRQueryEngine, which is replaced whole once the new one is built. If
+the file only grew by rows appended at the end, just those rows are parsed and
+added to the lookup index and folded into the analytics' summaries; any other
+edit reloads the table.
+"""
+import io
+import logging
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import pandas as pd
+from .hr_analytics import HRAnalytics
+from .hr_query import HRIndex, HRQueryEngine
+
+logger = logging.getLogger(__name__)
+
+_READ_SIZE = 1 << 22
+
+
+def _crc(path: Path, size: int, start: int = 0, value: int = 0) -> int:
+    """crc32 of bytes [start, size) of the file, continuing from value."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = size - start
+        while remaining > 0:
+            block = f.read(min(_READ_SIZE, remaining))
+            if not block:
+                break
+            value = zlib.crc32(block, value)
+            remaining -= len(block)
+    return value
+
+
+class HRTable:
+    def __init__(self, path: Path, table_store=None):
+        self.path = Path(path)
+        self.table_store = table_store
+        self.df: Optional[pd.DataFrame] = None
+        self.engine: Optional[HRQueryEngine] = None
+        self.refreshes = 0
+        self.last: Optional[Dict] = None
+        self._stamp: Optional[Tuple[int, int]] = None  # (size, mtime_ns) of what was loaded
+        self._failed: Optional[Tuple[int, int]] = None  # stamp of a version that failed to load; not retried
+        self._crc = 0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        try:
+            self.load()
+        except Exception as e:
+            logger.error("Error loading %s: %s", self.path.name, e)
+            self._failed = self._stat()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def load(self):
+        """Load the whole table, from the typed copy in the table store if ingestion wrote one from this file.
+
+        Raises if the file can't be parsed into a table; what was loaded before stays in place.
+        """
+        stamp = self._stat()
+        if stamp is None:
+            return
+        source = self.path.as_posix()
+        if self.df is None and self.table_store is not None and self.table_store.exists(source) \
+                and self.table_store.source_stamp(source) == stamp:
+            df = self.table_store.to_pandas(source)
+        else:
+            df = pd.read_csv(self.path)
+        self._install(df, HRIndex(df), HRAnalytics(df), stamp, _crc(self.path, stamp[0]))
+
+    def _install(self, df: pd.DataFrame, index: HRIndex, analytics: HRAnalytics, stamp: Tuple[int, int], crc: int):
+        engine = HRQueryEngine(index, analytics)
+        self.df, self.engine, self._stamp, self._crc = df, engine, stamp, crc
+
+    def _appended(self, stamp: Tuple[int, int]) -> Optional[pd.DataFrame]:
+        """The rows added at the end of the file since it was loaded, or None if it changed otherwise."""
+        old_size = self._stamp[0] if self._stamp else 0
+        if self.df is None or stamp[0] <= old_size or _crc(self.path, old_size) != self._crc:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(old_size - 1)
+            tail = f.read(stamp[0] - old_size + 1)
+        if not tail.startswith(b"\n"):
+            return None  # the last line was extended, not followed
+        try:
+            rows = pd.read_csv(io.BytesIO(tail[1:]), header=None, names=list(self.df.columns))
+            return rows.astype(self.df.dtypes.to_dict())
+        except (ValueError, TypeError):
+            return None  # new rows don't fit the column types; reload them together
+
+    def refresh(self) -> Optional[Dict]:
+        """Reload the file if it changed since it was loaded. Returns what was done, None if nothing."""
+        with self._lock:
+            stamp = self._stat()
+            if stamp is None or stamp == self._stamp:
+                return None
+            start = time.perf_counter()
+            try:
+                rows = self._appended(stamp)
+                if rows is not None:
+                    df = pd.concat([self.df, rows], ignore_index=True)
+                    engine = self.engine
+                    self._install(df, engine.index.extended(rows), engine.analytics.extended(rows), stamp,
+                                  _crc(self.path, stamp[0], self._stamp[0], self._crc))
+                    self.last = {"mode": "append", "rows_added": len(rows)}
+                else:
+                    self.load()
+                    self.last = {"mode": "reload"}
+            except Exception as e:
+                logger.exception("Refreshing %s failed", self.path.name)
+                # Answers keep coming from the old table; check() retries once the file changes again
+                self._failed = stamp
+                self.last = {"mode": "failed", "error": str(e)}
+                return self.last
+            self._failed = None
+            self.refreshes += 1
+            self.last.update(rows=len(self.df), seconds=round(time.perf_counter() - start, 3))
+        logger.info("Reloaded %s: %s", self.path.name, self.last)
+        return self.last
+
+    def check(self):
+        """Start refresh() in the background if the file changed; answers keep using the loaded table meanwhile."""
+        stamp = self._stat()
+        if stamp in (self._stamp, self._failed) or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self.refresh, name="hr-refresh", daemon=True)
+        self._thread.start()
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IngestManifest:
+    """Record of what has been indexed: file path -> role, content hash, chunking parameters and chunk ids.
+
+    load_documents consults it to skip unchanged files, replace the chunks of
+    changed files and purge the chunks of deleted ones. Each file's size and
+    modification time are kept too, so unchanged files need not be re-hashed.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.files: Dict[str, Dict] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == self.VERSION:
+                    self.files = data.get("files", {})
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable manifest %s: %s", self.path, e)
+
+    @staticmethod
+    def fingerprint(content: bytes, **params) -> Dict:
+        """Content hash plus the parameters that shaped the chunks."""
+        return {"sha256": hashlib.sha256(content).hexdigest(), **params}
+
+    @staticmethod
+    def fingerprint_file(path: Path, sha256: Optional[str] = None, **params) -> Dict:
+        """fingerprint() of a file, hashed in blocks rather than read whole (unless its sha256 is given)."""
+        if sha256 is None:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            sha256 = digest.hexdigest()
+        return {"sha256": sha256, **params}
+
+    @staticmethod
+    def file_stat(path: Path) -> Dict:
+        stat = Path(path).stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def known_hash(self, path: str, stat: Dict) -> Optional[str]:
+        """The recorded content hash of a file, if its size and modification time are as recorded."""
+        entry = self.files.get(path)
+        if entry is not None and stat is not None and entry.get("stat") == stat:
+            return entry.get("sha256")
+        return None
+
+    def get(self, path: str) -> Optional[Dict]:
+        return self.files.get(path)
+
+    def is_current(self, path: str, role: str, fingerprint: Dict) -> bool:
+        entry = self.files.get(path)
+        return (
+            entry is not None
+            and entry.get("role") == role
+            and all(entry.get(k) == v for k, v in fingerprint.items())
+        )
+
+    def record(self, path: str, role: str, fingerprint: Dict, ids: List[str], stat: Optional[Dict] = None):
+        self.files[path] = {"role": role, **fingerprint, "ids": list(ids), "stat": stat}
+
+    def forget(self, path: str) -> Optional[Dict]:
+        return self.files.pop(path, None)
+
+    def paths(self) -> List[str]:
+        return list(self.files)
+
+    def save(self):
+        """Write the manifest atomically so a crash never leaves it half-written."""
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # One-shot dumps() without indent runs json's C encoder; the manifest lists every chunk id
+            f.write(json.dumps({"version": self.VERSION, "files": self.files}, sort_keys=True))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,208 @@
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from ..config import INGEST_BATCH_SIZE, INGEST_READERS, INGEST_CHECKPOINT_CHUNKS
+from .ingest_manifest import IngestManifest
+
+logger = logging.getLogger(__name__)
+
+
+class ParsedFile:
+    """A data file after the read / hash / chunk stage."""
+
+    def __init__(self, path: Path, role: str, fingerprint: Dict = None, stat: Dict = None, unchanged: bool = False,
+                 documents: List[str] = None, metadatas: List[Dict] = None, ids: List[str] = None,
+                 error: Optional[Exception] = None):
+        self.path = path
+        self.source = path.as_posix()
+        self.role = role
+        self.fingerprint = fingerprint
+        self.stat = stat
+        self.unchanged = unchanged
+        self.documents = documents or []
+        self.metadatas = metadatas or []
+        self.ids = ids or []
+        self.error = error
+        self.pending = len(self.documents)
+
+
+class IngestionPipeline:
+    """Streaming, incremental indexing of a DocumentProcessor's data directory.
+
+    Files are read, hashed against the ingest manifest and chunked on a thread
+    pool, a bounded number of files ahead of the embedding stage. Chunks from
+    any number of files are gathered into fixed-size batches so every encoder
+    call is full, and the vector store is only written at checkpoints and once
+    at the end.
+    """
+
+    def __init__(self, document_processor, batch_size: int = INGEST_BATCH_SIZE, readers: int = INGEST_READERS,
+                 checkpoint_chunks: int = INGEST_CHECKPOINT_CHUNKS):
+        self.processor = document_processor
+        self.vector_store = document_processor.vector_store
+        self.batch_size = batch_size
+        self.readers = max(1, readers)
+        self.checkpoint_chunks = checkpoint_chunks
+        self.manifest = IngestManifest(self.vector_store.persist_directory / "manifest.json")
+
+    def discover(self) -> Iterator[Tuple[Path, str]]:
+        """(file, role) for every supported file under the data directory."""
+        for role_dir in sorted(self.processor.data_dir.iterdir()):
+            if not role_dir.is_dir():
+                continue
+            if role_dir.name not in self.vector_store.roles:
+                logger.warning("Skipping %s: '%s' is not a known role", role_dir, role_dir.name)
+                continue
+            for file_path in sorted(role_dir.glob("**/*")):
+                if file_path.is_file() and file_path.suffix in self.processor.SUPPORTED_SUFFIXES:
+                    yield file_path, role_dir.name
+
+    def parse(self, file_path: Path, role: str) -> ParsedFile:
+        """Read, fingerprint and (unless unchanged) chunk one file. Runs on the reader pool."""
+        try:
+            source = file_path.as_posix()
+            stat = self.manifest.file_stat(file_path)
+            fingerprint = self.manifest.fingerprint_file(
+                file_path,
+                # Files whose size and modification time match the manifest are not read again
+                sha256=self.manifest.known_hash(source, stat),
+                chunk_size=self.processor.chunk_size,
+                chunk_overlap=self.processor.chunk_overlap,
+                chunker=self.processor.CHUNKER_VERSION,
+                embedding=self.vector_store.embedding_signature,
+            )
+            if self.manifest.is_current(source, role, fingerprint) and self.processor.artifacts_current(file_path):
+                return ParsedFile(file_path, role, fingerprint, stat=stat, unchanged=True)
+            documents, metadatas, ids = self.processor.chunk_document(file_path, role)
+            return ParsedFile(file_path, role, fingerprint, stat=stat, documents=documents, metadatas=metadatas,
+                              ids=ids)
+        except Exception as e:
+            return ParsedFile(file_path, role, error=e)
+
+    def parsed_files(self, files) -> Iterator[ParsedFile]:
+        """Parse files on the reader pool, in order, keeping a bounded window of work in flight."""
+        with ThreadPoolExecutor(max_workers=self.readers, thread_name_prefix="ingest-read") as pool:
+            window = deque()
+            for file_path, role in files:
+                window.append(pool.submit(self.parse, file_path, role))
+                if len(window) >= 2 * self.readers:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+
+    def run(self) -> Dict:
+        """Bring the vector store in line with the data directory. Returns counts and throughput.
+
+        Runs as one vector store update (see VectorStore.writing): searches
+        see each checkpoint whole or not at all, and other processes wait for
+        it rather than index the same files.
+        """
+        with self.vector_store.writing():
+            # Another process may have indexed files since the manifest was read
+            self.manifest = IngestManifest(self.manifest.path)
+            return self._run()
+
+    def _run(self) -> Dict:
+        start = time.perf_counter()
+        stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "failed": 0,
+                 "chunks": 0, "embed_seconds": 0.0}
+        self._dirty_roles = set()
+        self._batch: List[Tuple[ParsedFile, int]] = []
+        self._since_checkpoint = 0
+        seen = set()
+
+        for parsed in self.parsed_files(self.discover()):
+            seen.add(parsed.source)
+            if parsed.error is not None:
+                stats["failed"] += 1
+                logger.error("Error processing %s: %s", parsed.path, parsed.error)
+                continue
+            previous = self.manifest.get(parsed.source)
+            if parsed.unchanged and self.vector_store.contains(parsed.role, previous["ids"]):
+                stats["unchanged"] += 1
+                previous["stat"] = parsed.stat  # so a touched but unchanged file is not hashed again
+                continue
+            if parsed.unchanged:
+                # The manifest claims chunks the store no longer has; re-chunk and index them
+                documents, metadatas, ids = self.processor.chunk_document(parsed.path, parsed.role)
+                parsed = ParsedFile(parsed.path, parsed.role, parsed.fingerprint, stat=parsed.stat,
+                                    documents=documents, metadatas=metadatas, ids=ids)
+            if previous is not None:
+                self.vector_store.remove_documents(previous["role"], previous["ids"], save=False)
+                self._dirty_roles.add(previous["role"])
+            stats["updated" if previous is not None else "added"] += 1
+            if not parsed.documents:
+                self.manifest.record(parsed.source, parsed.role, parsed.fingerprint, [], stat=parsed.stat)
+                continue
+            for i in range(len(parsed.documents)):
+                self._batch.append((parsed, i))
+                if len(self._batch) >= self.batch_size:
+                    stats["embed_seconds"] += self._flush()
+            stats["chunks"] += len(parsed.documents)
+            if self.checkpoint_chunks and self._since_checkpoint >= self.checkpoint_chunks:
+                stats["embed_seconds"] += self._flush()
+                self._checkpoint()
+        stats["embed_seconds"] += self._flush()
+
+        # Purge chunks of files that no longer exist
+        for source in self.manifest.paths():
+            if source not in seen:
+                entry = self.manifest.forget(source)
+                self.processor.discard(source)
+                try:
+                    self.vector_store.remove_documents(entry["role"], entry["ids"], save=False)
+                    self._dirty_roles.add(entry["role"])
+                except ValueError as e:
+                    logger.error("Error purging %s: %s", source, e)
+                stats["removed"] += 1
+
+        self._checkpoint()
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        stats["embed_seconds"] = round(stats["embed_seconds"], 3)
+        stats["chunks_per_sec"] = round(stats["chunks"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+        return stats
+
+    def _flush(self) -> float:
+        """Embed the pending batch in one encoder call and hand the vectors to each role's index."""
+        if not self._batch:
+            return 0.0
+        batch, self._batch = self._batch, []
+        start = time.perf_counter()
+        embeddings = self.vector_store.encoder.encode(
+            [parsed.documents[i] for parsed, i in batch],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+        )
+        elapsed = time.perf_counter() - start
+
+        by_role: Dict[str, List[int]] = {}
+        for row, (parsed, _) in enumerate(batch):
+            by_role.setdefault(parsed.role, []).append(row)
+        for role, rows in by_role.items():
+            self.vector_store.add_embeddings(
+                role,
+                embeddings[rows],
+                [batch[r][0].documents[batch[r][1]] for r in rows],
+                [batch[r][0].metadatas[batch[r][1]] for r in rows],
+                [batch[r][0].ids[batch[r][1]] for r in rows],
+                save=False,
+            )
+            self._dirty_roles.add(role)
+
+        # A file is recorded in the manifest once all of its chunks are in the store
+        for parsed, _ in batch:
+            parsed.pending -= 1
+            if parsed.pending == 0:
+                self.manifest.record(parsed.source, parsed.role, parsed.fingerprint, parsed.ids, stat=parsed.stat)
+        self._since_checkpoint += len(batch)
+        return elapsed
+
+    def _checkpoint(self):
+        # Indices are written before the manifest so it never claims chunks that weren't saved
+        self.vector_store.save(sorted(self._dirty_roles))
+        self.manifest.save()
+        self._dirty_roles = set()
+        self._since_checkpoint = 0
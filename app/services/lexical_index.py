@@ -0,0 +1,270 @@
+import copy
+import hashlib
+import json
+import math
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+_TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+ARRAYS = ("keys", "lengths", "doc_offsets", "doc_terms", "doc_tf", "terms", "term_offsets", "post_rows", "post_tf")
+
+
+@lru_cache(maxsize=1 << 20)
+def term_hash(term: str) -> int:
+    """Stable 63-bit id of a term, so the vocabulary itself never has to be stored."""
+    digest = hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') & 0x7FFF_FFFF_FFFF_FFFF
+
+
+def analyze(text: str) -> List[int]:
+    """Term ids of a text: lowercased word tokens, minus stopwords. Identifiers like FINEMP1234 stay whole."""
+    return [term_hash(token) for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _term_counts(text: str) -> Tuple[np.ndarray, np.ndarray, int]:
+    ids = analyze(text)
+    terms, counts = np.unique(np.array(ids, dtype=np.int64), return_counts=True)
+    return terms, counts.astype(np.int32), len(ids)
+
+
+class LexicalIndex:
+    """BM25 over one collection's chunks, stored as memory-mapped arrays.
+
+    Files under ``directory``: ``{name}_bm25.json`` (header) and one
+    ``{name}_bm25.{gen}.{array}.npy`` per array of the generation:
+
+    - ``keys`` / ``lengths``: chunk key and token count of each row
+    - ``doc_offsets``, ``doc_terms``, ``doc_tf``: each row's distinct terms and
+      their counts, kept so later generations are built without re-tokenizing
+    - ``terms``, ``term_offsets``, ``post_rows``, ``post_tf``: the inverted
+      index, sorted term ids with their rows and counts
+
+    Like ChunkStore, additions and removals since the last save() are held in
+    memory and search sees them; document frequencies ignore pending removals,
+    and a replaced generation's files are deleted one save later.
+    """
+
+    VERSION = 1
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, directory: Path, name: str):
+        self.directory = Path(directory)
+        self.name = name
+        self.header_path = self.directory / f"{name}_bm25.json"
+        self._added: Dict[int, Tuple[np.ndarray, np.ndarray, int]] = {}
+        self._deleted = set()
+        self._load()
+
+    @classmethod
+    def exists(cls, directory: Path, name: str) -> bool:
+        return (Path(directory) / f"{name}_bm25.json").exists()
+
+    def _file(self, generation: int, array: str) -> Path:
+        return self.directory / f"{self.name}_bm25.{generation}.{array}.npy"
+
+    def _load(self):
+        self.generation = 0
+        self._rows = 0
+        self._total_length = 0
+        self._arrays = {"keys": np.zeros(0, np.int64), "lengths": np.zeros(0, np.int32),
+                        "doc_offsets": np.zeros(1, np.int64), "doc_terms": np.zeros(0, np.int64),
+                        "doc_tf": np.zeros(0, np.int32), "terms": np.zeros(0, np.int64),
+                        "term_offsets": np.zeros(1, np.int64), "post_rows": np.zeros(0, np.int32),
+                        "post_tf": np.zeros(0, np.int32)}
+        self._sorted_keys = None
+        if not self.header_path.exists():
+            return
+        with open(self.header_path, 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        if header.get("version") != self.VERSION:
+            raise ValueError(f"Unsupported lexical index version in {self.header_path}")
+        self.generation = header["generation"]
+        self._rows = header["rows"]
+        self._total_length = header["total_length"]
+        if self._rows:
+            self._arrays = {name: np.load(self._file(self.generation, name), mmap_mode='r') for name in ARRAYS}
+
+    def __len__(self) -> int:
+        return self._rows - len(self._deleted) + len(self._added)
+
+    def _in_base(self, keys: Sequence[int]) -> List[bool]:
+        """Whether each key has a row in the persisted generation."""
+        if self._sorted_keys is None:
+            self._sorted_keys = np.sort(np.asarray(self._arrays["keys"]))
+        keys = np.asarray(keys, dtype=np.int64)
+        if len(self._sorted_keys) == 0:
+            return [False] * len(keys)
+        pos = np.minimum(np.searchsorted(self._sorted_keys, keys), len(self._sorted_keys) - 1)
+        return (self._sorted_keys[pos] == keys).tolist()
+
+    # -- writes ------------------------------------------------------------------
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._added or self._deleted)
+
+    def copy(self) -> "LexicalIndex":
+        """An index sharing this one's mapped generation, whose changes and saves leave this one untouched."""
+        clone = copy.copy(self)
+        clone._added = dict(self._added)
+        clone._deleted = set(self._deleted)
+        return clone
+
+    def add(self, keys: Sequence[int], documents: Sequence[str]):
+        """Index chunks, replacing any indexed under the same keys."""
+        for key, document, in_base in zip(keys, documents, self._in_base(keys)):
+            if in_base:
+                self._deleted.add(key)
+            self._added[key] = _term_counts(document)
+
+    def remove(self, keys: Sequence[int]):
+        for key, in_base in zip(keys, self._in_base(keys)):
+            self._added.pop(key, None)
+            if in_base:
+                self._deleted.add(key)
+
+    def clear(self):
+        self._added.clear()
+        self._deleted = set(np.asarray(self._arrays["keys"]).tolist())
+
+    def save(self):
+        """Write pending changes as a new generation and publish it by swapping the header."""
+        if not self.dirty and self.header_path.exists():
+            return
+        a = self._arrays
+        keys = np.asarray(a["keys"])
+        kept = np.flatnonzero(~np.isin(keys, np.fromiter(self._deleted, np.int64))) if self._deleted \
+            else np.arange(len(keys))
+
+        # Forward index of surviving rows, gathered without a Python loop, then the added rows
+        starts = np.asarray(a["doc_offsets"])[kept]
+        counts = np.asarray(a["doc_offsets"])[kept + 1] - starts
+        gather = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts) + np.arange(counts.sum())
+        added = list(self._added.items())
+        doc_terms = np.concatenate([np.asarray(a["doc_terms"])[gather]] + [terms for _, (terms, _, _) in added])
+        doc_tf = np.concatenate([np.asarray(a["doc_tf"])[gather]] + [tf for _, (_, tf, _) in added])
+        row_counts = np.concatenate([counts, [len(terms) for _, (terms, _, _) in added]]).astype(np.int64)
+        doc_offsets = np.zeros(len(row_counts) + 1, dtype=np.int64)
+        np.cumsum(row_counts, out=doc_offsets[1:])
+        new_keys = np.concatenate([keys[kept], np.array([key for key, _ in added], dtype=np.int64)])
+        lengths = np.concatenate([np.asarray(a["lengths"])[kept],
+                                  np.array([length for _, (_, _, length) in added], dtype=np.int32)])
+
+        # Inverted index: postings sorted by term, then row
+        post_rows_unsorted = np.repeat(np.arange(len(row_counts), dtype=np.int32), row_counts)
+        order = np.lexsort((post_rows_unsorted, doc_terms))
+        sorted_terms = doc_terms[order]
+        terms, first = np.unique(sorted_terms, return_index=True)
+        term_offsets = np.append(first, len(sorted_terms)).astype(np.int64)
+
+        arrays = {"keys": new_keys, "lengths": lengths.astype(np.int32), "doc_offsets": doc_offsets,
+                  "doc_terms": doc_terms.astype(np.int64), "doc_tf": doc_tf.astype(np.int32), "terms": terms,
+                  "term_offsets": term_offsets, "post_rows": post_rows_unsorted[order],
+                  "post_tf": doc_tf[order].astype(np.int32)}
+        gen = self.generation + 1
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(self._file(gen, name), array)
+        header = {"version": self.VERSION, "generation": gen, "rows": int(len(new_keys)),
+                  "total_length": int(lengths.sum())}
+        tmp_path = self.header_path.with_suffix(".json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(header, f)
+        os.replace(tmp_path, self.header_path)
+
+        self._added.clear()
+        self._deleted.clear()
+        self._load()
+        # Keep the generation just replaced: a reader may have read the old header and not yet opened its files
+        prefix = f"{self.name}_bm25."
+        for path in self.directory.glob(f"{prefix}*.*.npy"):
+            generation = path.name[len(prefix):].split(".", 1)[0]
+            if generation.isdigit() and int(generation) < self.generation - 1:
+                path.unlink(missing_ok=True)
+
+    # -- search ------------------------------------------------------------------
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(keys, BM25 scores) of the top-k chunks for a query, best first."""
+        query_terms = np.unique(np.array(analyze(query), dtype=np.int64))
+        rows_total = len(self)
+        if k <= 0 or rows_total == 0 or len(query_terms) == 0:
+            return np.zeros(0, np.int64), np.zeros(0, np.float32)
+        total_length = self._total_length + sum(length for _, _, length in self._added.values())
+        avgdl = max(total_length / rows_total, 1.0)
+        a = self._arrays
+
+        added_df: Dict[int, int] = {}
+        for terms, _, _ in self._added.values():
+            for term in np.intersect1d(terms, query_terms, assume_unique=True).tolist():
+                added_df[term] = added_df.get(term, 0) + 1
+
+        rows, contributions, idf = [], [], {}
+        positions = np.searchsorted(a["terms"], query_terms)
+        for term, pos in zip(query_terms.tolist(), positions.tolist()):
+            base_df = 0
+            if pos < len(a["terms"]) and a["terms"][pos] == term:
+                start, end = int(a["term_offsets"][pos]), int(a["term_offsets"][pos + 1])
+                base_df = end - start
+            df = base_df + added_df.get(term, 0)
+            if df == 0:
+                continue
+            idf[term] = math.log(1 + (rows_total - df + 0.5) / (df + 0.5))
+            if base_df:
+                term_rows = np.asarray(a["post_rows"][start:end])
+                tf = np.asarray(a["post_tf"][start:end], dtype=np.float32)
+                norm = self.K1 * (1 - self.B + self.B * np.asarray(a["lengths"])[term_rows] / avgdl)
+                rows.append(term_rows)
+                contributions.append(idf[term] * tf * (self.K1 + 1) / (tf + norm))
+
+        keys_out, scores_out = [], []
+        if rows:
+            unique_rows, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(contributions)).astype(np.float32)
+            keys = np.asarray(a["keys"])[unique_rows]
+            if self._deleted:
+                live = ~np.isin(keys, np.fromiter(self._deleted, np.int64))
+                keys, scores = keys[live], scores[live]
+            keys_out.append(keys)
+            scores_out.append(scores)
+        if self._added and idf:
+            added_keys, added_scores = [], []
+            for key, (terms, tf, length) in self._added.items():
+                score = 0.0
+                norm = self.K1 * (1 - self.B + self.B * length / avgdl)
+                for term, count in zip(terms.tolist(), tf.tolist()):
+                    if term in idf:
+                        score += idf[term] * count * (self.K1 + 1) / (count + norm)
+                if score > 0:
+                    added_keys.append(key)
+                    added_scores.append(score)
+            keys_out.append(np.array(added_keys, dtype=np.int64))
+            scores_out.append(np.array(added_scores, dtype=np.float32))
+        if not keys_out:
+            return np.zeros(0, np.int64), np.zeros(0, np.float32)
+
+        keys, scores = np.concatenate(keys_out), np.concatenate(scores_out)
+        n = min(k, len(scores))
+        if n == 0:
+            return keys[:0], scores[:0]
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return keys[top], scores[top]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Tuple]], n_results: int, k: int = 60) -> List[Tuple]:
+    """Merge ranked (role, key, score) hit lists by summed 1 / (k + rank); scores become the fused scores."""
+    fused: Dict[Tuple, float] = {}
+    for hits in rankings:
+        for rank, (role, key, _) in enumerate(hits):
+            fused[(role, key)] = fused.get((role, key), 0.0) + 1.0 / (k + rank + 1)
+    ranked = sorted(fused.items(), key=lambda item: -item[1])[:n_results]
+    return [(role, key, score) for (role, key), score in ranked]
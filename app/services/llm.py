@@ -0,0 +1,27 @@
+import os
+from typing import Tuple
+from ..config import LLM_BACKEND, LLM_MAX_IN_FLIGHT, LLM_TIMEOUT, LLM_KEEPALIVE
+
+
+def create_llm_clients(backend: str = LLM_BACKEND) -> Tuple[object, object]:
+    """(sync client, async client) for the configured chat completions provider.
+
+    Both keep up to LLM_MAX_IN_FLIGHT connections alive and leave retries to
+    the LLMGateway, which paces them against its queue.
+    """
+    if backend == "fake":
+        from .fake_llm import FakeGroq, AsyncFakeGroq, ProviderLimits
+        limits = ProviderLimits()  # one provider behind both clients
+        return FakeGroq(limits=limits), AsyncFakeGroq(limits=limits)
+    if backend != "groq":
+        raise ValueError(f"Unknown LLM backend: {backend}")
+    import httpx
+    from groq import Groq, AsyncGroq, DefaultHttpxClient, DefaultAsyncHttpxClient
+    api_key = os.getenv("GROQ_API_KEY")
+    pool = httpx.Limits(max_connections=LLM_MAX_IN_FLIGHT, max_keepalive_connections=LLM_MAX_IN_FLIGHT,
+                        keepalive_expiry=LLM_KEEPALIVE)
+    timeout = httpx.Timeout(LLM_TIMEOUT, connect=5.0)
+    return (Groq(api_key=api_key, timeout=timeout, max_retries=0,
+                 http_client=DefaultHttpxClient(limits=pool, timeout=timeout)),
+            AsyncGroq(api_key=api_key, timeout=timeout, max_retries=0,
+                      http_client=DefaultAsyncHttpxClient(limits=pool, timeout=timeout)))
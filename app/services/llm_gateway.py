@@ -0,0 +1,437 @@
+"""Admission control, coalescing and retries between ChatService and the LLM provider.
+
+Every call goes through one scheduler: at most ``max_in_flight`` provider
+calls run at once, and with a ``tokens_per_minute`` budget each call first
+reserves its prompt tokens plus max_tokens from a token bucket (what it did
+not use is returned when it finishes). Sync and async callers wait in one FIFO
+queue, for at most ``queue_timeout`` seconds before LLMOverloaded is raised.
+Identical concurrent requests (same model, messages and sampling parameters)
+reach the provider once and share the answer, streamed or not. Rate limits,
+server errors, timeouts and connection errors are retried with full-jitter
+exponential backoff, added to the provider's Retry-After; a stream is only
+retried before its first token.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+from .telemetry import LLM_CALLS, LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT
+from ..config import (LLM_MAX_IN_FLIGHT, LLM_TOKENS_PER_MINUTE, LLM_QUEUE_TIMEOUT, LLM_MAX_RETRIES,
+                      LLM_BACKOFF_BASE, LLM_BACKOFF_MAX)
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429}
+RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError")  # the SDK's, matched by name so groq stays optional
+
+
+class LLMOverloaded(Exception):
+    """No gateway slot (or token budget) freed up within the queue timeout."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def request_key(params: Dict) -> str:
+    """Hash of a chat completions request; equal requests may share one provider call."""
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None  # an HTTP date; fall back to backoff
+
+
+class _Waiter:
+    __slots__ = ("cost", "wake", "granted", "timed")
+
+    def __init__(self, cost: float, wake: Callable[[], None]):
+        self.cost = cost
+        self.wake = wake
+        self.granted = False
+        self.timed = False  # told to wait for the token bucket to refill
+
+
+class _Scheduler:
+    """FIFO admission by in-flight slots and a token bucket, shared by threads and event loops."""
+
+    def __init__(self, max_in_flight: int, tokens_per_minute: int):
+        self.max_in_flight = max(1, max_in_flight)
+        self.capacity = float(max(0, tokens_per_minute))  # 0 = no token budget
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.in_flight = 0
+        self.rejected = 0
+        self._refilled = time.monotonic()
+        self._queue: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _admit(self):
+        """Grant waiters from the head of the queue while a slot and their tokens are free."""
+        while self._queue and self.in_flight < self.max_in_flight:
+            head = self._queue[0]
+            if self.capacity:
+                self._refill()
+                if self.tokens < head.cost:
+                    if not head.timed:
+                        head.timed = True
+                        head.wake()  # so it polls for how long the refill takes
+                    break
+                self.tokens -= head.cost
+            self._queue.popleft()
+            self.in_flight += 1
+            head.granted = True
+            head.wake()
+        LLM_QUEUE_DEPTH.set(len(self._queue))
+        LLM_IN_FLIGHT.set(self.in_flight)
+
+    def enqueue(self, cost: float, wake: Callable[[], None]) -> _Waiter:
+        # A call costlier than the whole budget waits for a full bucket rather than forever
+        waiter = _Waiter(min(cost, self.capacity), wake)
+        with self._lock:
+            self._queue.append(waiter)
+            self._admit()
+        return waiter
+
+    def poll(self, waiter: _Waiter) -> Optional[float]:
+        """None once the waiter holds a slot, else seconds until it should poll again (inf: until woken)."""
+        with self._lock:
+            self._admit()
+            if waiter.granted:
+                return None
+            if waiter.timed and self._queue[0] is waiter and self.in_flight < self.max_in_flight:
+                return max(0.001, (waiter.cost - self.tokens) / self.rate)
+            return math.inf
+
+    def release(self, waiter: _Waiter, used: Optional[float] = None):
+        """Give back a granted waiter's slot, and the tokens it reserved but did not use (none if unknown)."""
+        with self._lock:
+            if waiter.granted:
+                self.in_flight -= 1
+                if self.capacity and used is not None and used < waiter.cost:
+                    self._refill()
+                    self.tokens = min(self.capacity, self.tokens + waiter.cost - used)
+                waiter.granted = False
+            elif waiter in self._queue:
+                self._queue.remove(waiter)
+            self._admit()
+
+    def acquire(self, cost: float, timeout: float) -> _Waiter:
+        event = threading.Event()
+        waiter = self.enqueue(cost, event.set)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                event.clear()
+                delay = self.poll(waiter)
+                if delay is None:
+                    return waiter
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._overloaded(timeout)
+                event.wait(min(delay, remaining))
+        except BaseException:
+            self.release(waiter, used=0)
+            raise
+
+    async def aacquire(self, cost: float, timeout: float) -> _Waiter:
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = self.enqueue(cost, lambda: loop.call_soon_threadsafe(event.set))
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                event.clear()
+                delay = self.poll(waiter)
+                if delay is None:
+                    return waiter
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._overloaded(timeout)
+                try:
+                    await asyncio.wait_for(event.wait(), min(delay, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self.release(waiter, used=0)
+            raise
+
+    def _overloaded(self, timeout: float) -> LLMOverloaded:
+        self.rejected += 1
+        LLM_CALLS.inc("rejected")
+        return LLMOverloaded(f"LLM gateway queue full: waited {timeout:g}s for one of "
+                             f"{self.max_in_flight} slots ({len(self._queue)} queued)", retry_after=timeout)
+
+
+class _SharedStream:
+    """One provider stream fanned out to every subscriber, each reading from the start."""
+
+    __slots__ = ("parts", "done", "error", "subscribers", "changed", "task")
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class LLMGateway:
+    def __init__(self, client, async_client, max_in_flight: int = LLM_MAX_IN_FLIGHT,
+                 tokens_per_minute: int = LLM_TOKENS_PER_MINUTE, queue_timeout: float = LLM_QUEUE_TIMEOUT,
+                 max_retries: int = LLM_MAX_RETRIES, backoff_base: float = LLM_BACKOFF_BASE,
+                 backoff_max: float = LLM_BACKOFF_MAX):
+        self.client = client
+        self.async_client = async_client
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.scheduler = _Scheduler(max_in_flight, tokens_per_minute)
+        self.counts = {"calls": 0, "provider_calls": 0, "ok": 0, "coalesced": 0, "retried": 0, "failed": 0}
+        self.queue_wait_max = 0.0
+        self._flights: Dict[str, Future] = {}
+        self._aflights: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._streams: Dict[Tuple[int, str], _SharedStream] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+        if outcome not in ("calls", "provider_calls"):
+            LLM_CALLS.inc(outcome)
+
+    def _cost(self, params: Dict) -> int:
+        """Prompt tokens plus max_tokens; only counted when there is a token budget to charge."""
+        if not self.scheduler.capacity:
+            return 0
+        from .tokens import count_tokens
+        prompt = sum(count_tokens(message.get("content") or "") for message in params["messages"])
+        return prompt + params.get("max_tokens", 0)
+
+    def _waited(self, start: float):
+        waited = time.perf_counter() - start
+        LLM_QUEUE_WAIT.observe(waited)
+        self.queue_wait_max = max(self.queue_wait_max, waited)
+
+    def _backoff(self, attempt: int, error: Exception) -> Optional[float]:
+        """Seconds to wait before retrying after error, or None if it should be raised."""
+        if attempt >= self.max_retries or not _retryable(error):
+            self._count("failed")
+            return None
+        self._count("retried")
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        # Jitter on top of Retry-After too, or every caller told the same time retries at once
+        delay += _retry_after(error) or 0.0
+        logger.warning("LLM call failed (%s), retry %d in %.2fs", error, attempt + 1, delay)
+        return delay
+
+    @staticmethod
+    def _used(completion) -> Optional[int]:
+        usage = getattr(completion, "usage", None)
+        return getattr(usage, "total_tokens", None)
+
+    def complete(self, **params):
+        """client.chat.completions.create(**params), scheduled and retried; identical concurrent calls share one."""
+        self._count("calls")
+        key = request_key(params)
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = Future()
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+        try:
+            future.set_result(self._call(params))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._flights[key]
+        return future.result()
+
+    def _call(self, params: Dict):
+        start = time.perf_counter()
+        waiter = self.scheduler.acquire(self._cost(params), self.queue_timeout)
+        self._waited(start)
+        used = None
+        try:
+            for attempt in itertools.count():
+                self._count("provider_calls")
+                try:
+                    completion = self.client.chat.completions.create(**params)
+                except Exception as e:
+                    delay = self._backoff(attempt, e)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)  # holding the slot: a retry is not sent ahead of the queue
+                    continue
+                used = self._used(completion)
+                self._count("ok")
+                return completion
+        finally:
+            self.scheduler.release(waiter, used)
+
+    async def acomplete(self, **params):
+        """Async complete(); the shared call keeps running if one of its callers is cancelled."""
+        self._count("calls")
+        key = (id(asyncio.get_running_loop()), request_key(params))
+        task = self._aflights.get(key)
+        if task is None:
+            task = self._aflights[key] = asyncio.ensure_future(self._acall(params))
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self._count("coalesced")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Tuple[int, str], task: asyncio.Task):
+        if self._aflights.get(key) is task:
+            del self._aflights[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here, so a failure nobody awaits any more isn't logged as unhandled
+
+    async def _acall(self, params: Dict):
+        start = time.perf_counter()
+        waiter = await self.scheduler.aacquire(self._cost(params), self.queue_timeout)
+        self._waited(start)
+        used = None
+        try:
+            for attempt in itertools.count():
+                self._count("provider_calls")
+                try:
+                    completion = await self.async_client.chat.completions.create(**params)
+                except Exception as e:
+                    delay = self._backoff(attempt, e)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    continue
+                used = self._used(completion)
+                self._count("ok")
+                return completion
+        finally:
+            self.scheduler.release(waiter, used)
+
+    async def astream(self, **params) -> AsyncIterator[str]:
+        """The text of a streamed completion as it arrives; identical concurrent streams share one provider stream.
+
+        A subscriber that joins late first gets the parts already received. The
+        provider stream is cancelled once no subscriber is left.
+        """
+        self._count("calls")
+        key = (id(asyncio.get_running_loop()), request_key(params))
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = self._streams[key] = _SharedStream()
+            shared.task = asyncio.ensure_future(self._pump(key, shared, params))
+        else:
+            self._count("coalesced")
+        shared.subscribers += 1
+        try:
+            position = 0
+            while True:
+                changed = shared.changed
+                while position < len(shared.parts):
+                    position += 1
+                    yield shared.parts[position - 1]
+                if shared.done:
+                    if shared.error is not None:
+                        raise shared.error
+                    return
+                await changed.wait()
+        finally:
+            shared.subscribers -= 1
+            if not shared.subscribers and not shared.done:
+                if self._streams.get(key) is shared:
+                    del self._streams[key]
+                shared.task.cancel()
+
+    async def _pump(self, key: Tuple[int, str], shared: _SharedStream, params: Dict):
+        try:
+            async for part in self._astream_call(params):
+                shared.parts.append(part)
+                shared.notify()
+        except Exception as e:
+            shared.error = e
+        finally:
+            shared.done = True
+            shared.notify()
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+
+    async def _astream_call(self, params: Dict) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        cost = self._cost(params)
+        waiter = await self.scheduler.aacquire(cost, self.queue_timeout)
+        self._waited(start)
+        parts: List[str] = []
+        try:
+            for attempt in itertools.count():
+                self._count("provider_calls")
+                try:
+                    stream = await self.async_client.chat.completions.create(**params, stream=True)
+                    async for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            parts.append(chunk.choices[0].delta.content)
+                            yield chunk.choices[0].delta.content
+                except Exception as e:
+                    delay = self._backoff(attempt, e) if not parts else None
+                    if delay is None:
+                        if parts:
+                            self._count("failed")
+                        raise
+                    await asyncio.sleep(delay)
+                    continue
+                self._count("ok")
+                return
+        finally:
+            # The completion's usage isn't streamed: charge the prompt and the tokens received
+            used = None
+            if cost:
+                from .tokens import count_tokens
+                used = cost - params.get("max_tokens", 0) + count_tokens("".join(parts))
+            self.scheduler.release(waiter, used)
+
+    def stats(self) -> Dict:
+        scheduler = self.scheduler
+        return {**self.counts, "rejected": scheduler.rejected, "in_flight": scheduler.in_flight, "queued": scheduler.queued,
+                "max_in_flight": scheduler.max_in_flight, "tokens_per_minute": int(scheduler.capacity),
+                "tokens_available": int(scheduler.tokens) if scheduler.capacity else None,
+                "queue_wait_max_s": round(self.queue_wait_max, 3)}
@@ -0,0 +1,154 @@
+"""Micro-batched query embedding, with an LRU of recent queries in front.
+
+Encoding one short query costs nearly as much as encoding a batch of them:
+the model's per-call overhead dominates. Requests hand their query to
+``QueryEmbedder.submit`` (or block in ``embed``); a background thread takes the
+first waiting query, collects whatever else arrives within ``max_wait_ms`` up
+to ``max_batch`` queries, encodes them in one call and resolves each caller's
+future. A query arriving alone, with no batch in flight before it, is encoded
+straight away. Queries seen recently are answered from the LRU without queueing.
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+import numpy as np
+from . import faiss_index
+from .telemetry import EMBED_BATCH_SIZE, QUERY_EMBEDDINGS
+from ..config import QUERY_BATCH_SIZE, QUERY_BATCH_WAIT_MS, QUERY_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbedder:
+    def __init__(self, encoder: Callable[[], object], max_batch: int = QUERY_BATCH_SIZE,
+                 max_wait_ms: float = QUERY_BATCH_WAIT_MS, cache_size: int = QUERY_CACHE_SIZE):
+        # A callable returning the encoder, so the model still loads on first use
+        self._encoder = encoder
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._queue: "queue.SimpleQueue[Tuple[str, Future]]" = queue.SimpleQueue()
+        self._worker = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.counters = {"cache_hits": 0, "encoded": 0, "batches": 0}
+
+    def embed(self, query: str) -> np.ndarray:
+        """The normalized (1, d) float32 embedding of query; blocks until its batch is encoded."""
+        return self.submit(query).result()
+
+    async def aembed(self, query: str) -> np.ndarray:
+        return await asyncio.wrap_future(self.submit(query))
+
+    def embed_many(self, queries: List[str]) -> np.ndarray:
+        """The normalized (N, d) embeddings of queries: recent ones from the LRU, the rest in one encoder call.
+
+        For callers that already hold a batch, such as /chat/batch; it doesn't wait in the micro-batching queue.
+        """
+        vectors = [self._cached(query) for query in queries]
+        missing = [(query, Future()) for query in dict.fromkeys(q for q, v in zip(queries, vectors) if v is None)]
+        if missing:
+            self._encode(missing)
+            encoded = {query: future.result() for query, future in missing}
+            vectors = [encoded[query] if vector is None else vector for query, vector in zip(queries, vectors)]
+        return np.vstack(vectors)
+
+    def submit(self, query: str) -> Future:
+        """A future for the query's embedding, already resolved when it is cached."""
+        future: Future = Future()
+        cached = self._cached(query)
+        if cached is not None:
+            future.set_result(cached)
+        elif self.max_batch == 1:
+            self._encode([(query, future)])
+        else:
+            self._ensure_worker()
+            self._queue.put((query, future))
+        return future
+
+    def _cached(self, query: str):
+        if self.cache_size <= 0:
+            return None
+        with self._lock:
+            vector = self._cache.get(query)
+            if vector is not None:
+                self._cache.move_to_end(query)
+                self.counters["cache_hits"] += 1
+        if vector is not None:
+            QUERY_EMBEDDINGS.inc("cached")
+        return vector
+
+    def _remember(self, queries: List[str], vectors: np.ndarray):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            for i, query in enumerate(queries):
+                self._cache[query] = vectors[i:i + 1]
+                self._cache.move_to_end(query)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            # A forked worker process inherits the attribute but not the thread
+            if self._worker is None or self._pid != os.getpid():
+                self._queue = queue.SimpleQueue()
+                self._worker = threading.Thread(target=self._run, name="query-embedder", daemon=True)
+                self._pid = os.getpid()
+                self._worker.start()
+
+    def _run(self):
+        previous = 1
+        while True:
+            batch = [self._queue.get()]
+            # A lone query when the last batch was lone too means no concurrent load: don't make it wait
+            waiting = previous > 1 or not self._queue.empty()
+            deadline = time.perf_counter() + (self.max_wait if waiting else 0.0)
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.perf_counter()
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._encode(batch)
+            previous = len(batch)
+
+    def _encode(self, batch: List[Tuple[str, Future]]):
+        # The same query from several requests in one batch is encoded once
+        queries = list(dict.fromkeys(query for query, _ in batch))
+        try:
+            vectors = faiss_index.normalize(self._encoder().encode(queries))
+        except Exception as e:
+            logger.error("Query embedding failed for a batch of %d: %s", len(queries), e)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        # Cached rows are shared between requests, so nobody may modify them in place
+        vectors.setflags(write=False)
+        self._remember(queries, vectors)
+        rows = {query: i for i, query in enumerate(queries)}
+        for query, future in batch:
+            future.set_result(vectors[rows[query]:rows[query] + 1])
+        EMBED_BATCH_SIZE.observe(len(queries))
+        QUERY_EMBEDDINGS.inc("encoded", amount=len(queries))
+        with self._lock:
+            self.counters["encoded"] += len(queries)
+            self.counters["batches"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            cached = len(self._cache)
+        batches = counters["batches"]
+        return {**counters, "cached_queries": cached, "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "mean_batch": round(counters["encoded"] / batches, 2) if batches else 0.0}
@@ -0,0 +1,98 @@
+"""Live corpus reload: index changed documents in the background and swap them in.
+
+``reload()`` runs an incremental ingestion (only new, changed and removed
+files cost anything) as one VectorStore update, so searches keep reading the
+previous snapshots until the new ones are published. ``request()`` starts it on
+a background thread; ``start_watching()`` polls instead, also adopting indices
+that other processes (app.ingest, other API workers) saved.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from ..config import RELOAD_POLL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class CorpusReloader:
+    def __init__(self, document_processor, poll_seconds: float = RELOAD_POLL_SECONDS):
+        self.processor = document_processor
+        self.poll_seconds = poll_seconds
+        self.state = "idle"  # -> "reloading" -> "idle" or "failed"
+        self.error: Optional[str] = None
+        self.last: Optional[Dict] = None
+        self.reloads = 0
+        self._signature: Optional[Tuple] = None
+        self._thread: Optional[threading.Thread] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def data_signature(self) -> Tuple:
+        """(path, size, mtime) of every data file; changes whenever a file is added, edited or removed."""
+        suffixes = self.processor.SUPPORTED_SUFFIXES
+        files = []
+        for path in sorted(self.processor.data_dir.glob("*/**/*")):
+            if path.suffix in suffixes and path.is_file():
+                stat = path.stat()
+                files.append((path.as_posix(), stat.st_size, stat.st_mtime_ns))
+        return tuple(files)
+
+    def reload(self) -> Optional[Dict]:
+        """Index what changed in the data directory and publish it. Returns the ingestion stats, None on failure."""
+        with self._lock:
+            self.state = "reloading"
+            try:
+                signature = self.data_signature()
+                stats = self.processor.load_documents()
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                logger.exception("Corpus reload failed")
+                return None
+            self._signature = signature
+            self.reloads += 1
+            self.last = {**stats, "finished_at": time.time(),
+                         "versions": self.processor.vector_store.versions}
+            self.state, self.error = "idle", None
+        logger.info("Corpus reloaded: %s", stats)
+        return stats
+
+    def request(self) -> bool:
+        """Start reload() on a background thread. False if one is already running."""
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        self._thread = threading.Thread(target=self.reload, name="corpus-reload", daemon=True)
+        self._thread.start()
+        return True
+
+    def poll(self):
+        """Adopt indices other processes saved, then reload if the data directory changed since the last reload."""
+        self.processor.vector_store.refresh()
+        if self.data_signature() != self._signature:
+            self.reload()
+
+    def start_watching(self) -> Optional[threading.Thread]:
+        """Call poll() every poll_seconds on a background thread (not at all if poll_seconds <= 0)."""
+        if self.poll_seconds <= 0 or self._watcher is not None:
+            return None
+
+        def watch():
+            while not self._stop.wait(self.poll_seconds):
+                try:
+                    self.poll()
+                except Exception:
+                    logger.exception("Corpus watcher error")
+
+        self._watcher = threading.Thread(target=watch, name="corpus-watcher", daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> Dict:
+        return {"state": self.state, "error": self.error, "reloads": self.reloads, "last": self.last,
+                "watching": self._watcher is not None, "poll_seconds": self.poll_seconds,
+                "versions": self.processor.vector_store.versions}
@@ -0,0 +1,189 @@
+"""Second-stage reranking of retrieved chunks under a time budget.
+
+Retrieval returns ``candidates`` chunks ranked by fused dense / BM25 rank; the
+Reranker re-scores (query, chunk) pairs and keeps only the best ``top_n``, so
+the prompt carries a few strong chunks instead of every one that fits. Scorers:
+
+- "cross-encoder": a sentence-transformers CrossEncoder (RERANK_MODEL) reading
+  query and chunk together; far better at relevance than either retriever,
+  but it costs a transformer pass per pair
+- "lexical": the fraction of the query's distinct terms the chunk contains;
+  no model, microseconds per pair, ties keep the retrieval order
+
+Pairs are scored in retrieval order, ``batch_size`` at a time. A batch starts
+only if, at the measured seconds per pair, it will finish within
+``budget_ms``; candidates left unscored follow the scored ones in retrieval
+order. Scores are cached per (query hash, chunk id), with a checksum of the
+chunk text so a re-ingested chunk is scored again.
+"""
+import hashlib
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from .lexical_index import analyze
+from .telemetry import RERANK_PAIRS, span
+from ..config import (RERANK_BACKEND, RERANK_MODEL, RERANK_CANDIDATES, RERANK_TOP_N, RERANK_BUDGET_MS,
+                      RERANK_BATCH_SIZE, RERANK_CACHE_SIZE)
+
+logger = logging.getLogger(__name__)
+
+# One CrossEncoder per model name for the whole process, loaded on first use
+_models: Dict[str, object] = {}
+_models_lock = threading.Lock()
+
+
+class CrossEncoderScorer:
+    def __init__(self, model_name: str = RERANK_MODEL):
+        self.model_name = model_name
+
+    @property
+    def model(self):
+        model = _models.get(self.model_name)
+        if model is None:
+            with _models_lock:
+                model = _models.get(self.model_name)
+                if model is None:
+                    try:
+                        from sentence_transformers import CrossEncoder
+                    except ImportError as e:
+                        raise RuntimeError("RERANK_BACKEND=cross-encoder needs sentence-transformers: "
+                                           "pip install sentence-transformers") from e
+                    model = _models[self.model_name] = CrossEncoder(self.model_name)
+        return model
+
+    def score(self, query: str, documents: List[str]) -> np.ndarray:
+        pairs = [(query, document) for document in documents]
+        return np.asarray(self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False),
+                          dtype=np.float32)
+
+
+class LexicalScorer:
+    def score(self, query: str, documents: List[str]) -> np.ndarray:
+        terms = set(analyze(query))
+        if not terms:
+            return np.zeros(len(documents), dtype=np.float32)
+        return np.array([len(terms.intersection(analyze(document))) / len(terms) for document in documents],
+                        dtype=np.float32)
+
+
+# RERANK_BACKEND -> scorer factory; "off" disables reranking
+SCORERS: Dict[str, Callable[[], object]] = {
+    "cross-encoder": CrossEncoderScorer,
+    "lexical": LexicalScorer,
+}
+
+
+def chunk_id(doc: Dict) -> str:
+    metadata = doc['metadata']
+    return f"{metadata['source']}::chunk_{metadata.get('chunk_index', 0)}"
+
+
+class Reranker:
+    def __init__(self, backend: str = RERANK_BACKEND, candidates: int = RERANK_CANDIDATES, top_n: int = RERANK_TOP_N,
+                 budget_ms: float = RERANK_BUDGET_MS, batch_size: int = RERANK_BATCH_SIZE,
+                 cache_size: int = RERANK_CACHE_SIZE, scorer=None):
+        if backend != "off" and backend not in SCORERS and scorer is None:
+            raise ValueError(f"Unknown RERANK_BACKEND {backend!r}; expected off or one of {sorted(SCORERS)}")
+        self.backend = backend
+        self.scorer = scorer or (SCORERS[backend]() if backend in SCORERS else None)
+        self.candidates = candidates
+        self.top_n = max(1, top_n)
+        self.budget = max(0.0, budget_ms) / 1000
+        self.batch_size = max(1, batch_size)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[bytes, str, int], float]" = OrderedDict()
+        self._pair_seconds: Optional[float] = None  # moving average of scoring time per pair
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "scored": 0, "cached": 0, "skipped": 0, "over_budget": 0, "errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.scorer is not None
+
+    def warm(self):
+        """Load the scorer's model now rather than on the first request."""
+        if self.enabled:
+            self.scorer.score("warm up", ["warm up"])
+
+    def rerank(self, query: str, candidates: List[Dict]) -> List[Dict]:
+        """The top_n candidates by reranker score, best first, scoring only what the budget allows.
+
+        Returned chunks are copies whose 'score' is their new rank (top_n for the
+        best, down to 1), so the context packer keeps this order; the retrieval
+        score is kept as 'retrieval_score' and the reranker's as 'rerank_score'
+        (None if it was not scored in time).
+        """
+        if not self.enabled or not candidates:
+            return candidates
+        with span("rerank"):
+            scores = self._scores(query, candidates)
+        scored = sorted((i for i in range(len(candidates)) if scores[i] is not None), key=lambda i: -scores[i])
+        unscored = [i for i in range(len(candidates)) if scores[i] is None]
+        order = (scored + unscored)[:self.top_n]
+        return [{**candidates[i], "score": float(len(order) - rank), "retrieval_score": candidates[i].get('score'),
+                 "rerank_score": scores[i]} for rank, i in enumerate(order)]
+
+    def _scores(self, query: str, candidates: List[Dict]) -> List[Optional[float]]:
+        deadline = time.perf_counter() + self.budget
+        query_hash = hashlib.blake2b(query.encode('utf-8'), digest_size=16).digest()
+        keys = [(query_hash, chunk_id(doc), zlib.crc32(doc['document'].encode('utf-8'))) for doc in candidates]
+        with self._lock:
+            scores = [self._cache.get(key) for key in keys]
+            for key, score in zip(keys, scores):
+                if score is not None:
+                    self._cache.move_to_end(key)
+        pending = [i for i, score in enumerate(scores) if score is None]
+        scored = 0
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            now = time.perf_counter()
+            estimate = self._pair_seconds * len(batch) if self._pair_seconds is not None else 0.0
+            if now + estimate > deadline:
+                self._count(over_budget=1)
+                # Nothing is measured while batches are skipped, so let one slow spell's estimate fade
+                self._pair_seconds = self._pair_seconds * 0.9 if self._pair_seconds is not None else None
+                break
+            try:
+                values = self.scorer.score(query, [candidates[i]['document'] for i in batch])
+            except Exception as e:
+                self._count(errors=1)
+                logger.warning("Reranking failed, keeping the retrieval order: %s", e)
+                break
+            elapsed = (time.perf_counter() - now) / len(batch)
+            self._pair_seconds = elapsed if self._pair_seconds is None else 0.8 * self._pair_seconds + 0.2 * elapsed
+            for i, value in zip(batch, values):
+                scores[i] = float(value)
+            scored += len(batch)
+            self._remember([(keys[i], scores[i]) for i in batch])
+        cached = len(candidates) - len(pending)
+        skipped = len(pending) - scored
+        self._count(requests=1, scored=scored, cached=cached, skipped=skipped)
+        RERANK_PAIRS.inc("scored", amount=scored)
+        RERANK_PAIRS.inc("cached", amount=cached)
+        RERANK_PAIRS.inc("skipped", amount=skipped)
+        return scores
+
+    def _count(self, **amounts: int):
+        with self._lock:
+            for name, amount in amounts.items():
+                self.counters[name] += amount
+
+    def _remember(self, entries: List[Tuple[Tuple[bytes, str, int], float]]):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            for key, score in entries:
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def stats(self) -> Dict:
+        return {"backend": self.backend, "candidates": self.candidates, "top_n": self.top_n,
+                "budget_ms": self.budget * 1000, "cache_entries": len(self._cache),
+                "pair_ms": round(self._pair_seconds * 1000, 3) if self._pair_seconds is not None else None,
+                **self.counters}
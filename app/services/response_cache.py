@@ -0,0 +1,156 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+from ..config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, RESPONSE_CACHE_SIMILARITY
+
+Scope = Tuple[str, ...]
+
+
+def normalize_query(query: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a query."""
+    return re.sub(r'\s+', ' ', query.lower()).strip(' ?!.')
+
+
+class _Entry:
+    __slots__ = ("scope", "response", "embedding", "versions", "expires")
+
+    def __init__(self, scope: Scope, response: str, embedding: Optional[np.ndarray], versions: Tuple, expires: float):
+        self.scope = scope
+        self.response = response
+        self.embedding = embedding
+        self.versions = versions
+        self.expires = expires
+
+
+class ResponseCache:
+    """LRU + TTL cache of LLM answers per retrieval scope.
+
+    Entries are found first by a hash of the normalized query and then, if that
+    misses, by cosine similarity of the query embedding to cached queries in
+    the same scope. Each entry remembers the version of every collection in its
+    scope; once any of them is re-ingested the entry is stale and dropped.
+    """
+
+    def __init__(self, versions: Callable[[Scope], Tuple], max_entries: int = RESPONSE_CACHE_SIZE,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL, similarity: float = RESPONSE_CACHE_SIMILARITY):
+        self.versions = versions
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # scope -> (keys, stacked embeddings) for the semantic tier, rebuilt lazily
+        self._matrices: Dict[Scope, Tuple[list, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0,
+                         "evictions": 0, "expired": 0, "invalidated": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def key(scope: Scope, query: str) -> str:
+        return hashlib.sha256(("|".join(scope) + "\x00" + normalize_query(query)).encode('utf-8')).hexdigest()
+
+    def _live(self, key: str, entry: _Entry, now: float) -> bool:
+        if entry.expires < now:
+            self._drop(key, "expired")
+            return False
+        if entry.versions != self.versions(entry.scope):
+            self._drop(key, "invalidated")
+            return False
+        return True
+
+    def _drop(self, key: str, reason: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._matrices.pop(entry.scope, None)
+            self.counters[reason] += 1
+
+    def get_exact(self, scope: Scope, query: str) -> Optional[str]:
+        """Cached answer for the same normalized query in the same scope."""
+        if not self.enabled:
+            return None
+        key = self.key(scope, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._live(key, entry, time.monotonic()):
+                self._entries.move_to_end(key)
+                self.counters["exact_hits"] += 1
+                return entry.response
+        return None
+
+    def get_similar(self, scope: Scope, embedding: np.ndarray) -> Optional[str]:
+        """Cached answer for the most similar query in the scope, if above the similarity threshold.
+
+        Counts a miss when nothing qualifies, so call it after get_exact.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self.similarity < 1.0:
+                keys, matrix = self._matrix(scope)
+                if keys:
+                    scores = matrix @ np.asarray(embedding, dtype=np.float32).reshape(-1)
+                    candidates = np.flatnonzero(scores >= self.similarity)
+                    now = time.monotonic()
+                    # Most similar first; a stale or expired entry is dropped and the next one tried
+                    for best in candidates[np.argsort(-scores[candidates], kind="stable")].tolist():
+                        key = keys[best]
+                        entry = self._entries.get(key)
+                        if entry is not None and self._live(key, entry, now):
+                            self._entries.move_to_end(key)
+                            self.counters["semantic_hits"] += 1
+                            return entry.response
+            self.counters["misses"] += 1
+        return None
+
+    def _matrix(self, scope: Scope):
+        cached = self._matrices.get(scope)
+        if cached is None:
+            keys = [k for k, e in self._entries.items() if e.scope == scope and e.embedding is not None]
+            matrix = (np.stack([self._entries[k].embedding for k in keys]) if keys
+                      else np.zeros((0, 0), dtype=np.float32))
+            cached = self._matrices[scope] = (keys, matrix)
+        return cached
+
+    def put(self, scope: Scope, query: str, response: str, embedding: Optional[np.ndarray] = None,
+            versions: Optional[Tuple] = None):
+        """Store an answer.
+
+        ``versions`` are the scope's collection versions from when its context
+        was retrieved (default: the current ones), so an answer built from
+        chunks replaced since is stale at once.
+        """
+        if not self.enabled or not response:
+            return
+        key = self.key(scope, query)
+        if embedding is not None:
+            embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if versions is None:
+            versions = self.versions(scope)
+        entry = _Entry(scope, response, embedding, versions, time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._matrices.pop(scope, None)
+            self.counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest, "evictions")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.counters["exact_hits"] + self.counters["semantic_hits"] + self.counters["misses"]
+            hits = lookups - self.counters["misses"]
+            return {**self.counters, "entries": len(self._entries), "lookups": lookups,
+                    "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.ipc as ipc
+
+CSV_BLOCK_BYTES = 1 << 20
+
+
+def read_csv_batches(path: Path, all_strings: bool = False,
+                     block_size: int = CSV_BLOCK_BYTES) -> Iterator[pa.RecordBatch]:
+    """Stream a CSV as record batches, one block of the file in memory at a time.
+
+    Column types are inferred from the first block. A later block that
+    disagrees raises pyarrow.ArrowInvalid; read again with ``all_strings``.
+    """
+    read_options = pa_csv.ReadOptions(block_size=block_size)
+    convert_options = None
+    if all_strings:
+        names = pa_csv.open_csv(path, read_options=read_options).schema.names
+        convert_options = pa_csv.ConvertOptions(column_types={name: pa.string() for name in names})
+    return iter(pa_csv.open_csv(path, read_options=read_options, convert_options=convert_options))
+
+
+class TableStore:
+    """Parsed CSV tables, one memory-mapped Arrow IPC file per source file.
+
+    Tables are written while a CSV is chunked for indexing, so answering a
+    question about retrieved rows reads them by row number from the mapped
+    file instead of re-parsing chunk text. Each table records the size and
+    mtime of the source file it was read from, see source_stamp().
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._open: Dict[Path, Tuple[int, pa.Table]] = {}
+        self._lock = threading.Lock()
+
+    def path(self, source: str) -> Path:
+        digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+        return self.directory / f"{Path(source).stem}-{digest}.arrow"
+
+    def exists(self, source: str) -> bool:
+        return self.path(source).exists()
+
+    def write(self, source: str, batches: Iterable[pa.RecordBatch]) -> Iterator[Tuple[int, pa.RecordBatch]]:
+        """Store the batches as ``source``'s table, passing each through with its first row number.
+
+        The table is published atomically once the batches are exhausted.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Stat before reading: a file changed while it is read must not look current afterwards
+        stat = Path(source).stat()
+        metadata = {"source_size": str(stat.st_size), "source_mtime_ns": str(stat.st_mtime_ns)}
+        path = self.path(source)
+        tmp_path = path.with_suffix(f".arrow.{os.getpid()}.{threading.get_ident()}.tmp")
+        writer = None
+        row = 0
+        try:
+            for batch in batches:
+                if writer is None:
+                    writer = ipc.new_file(str(tmp_path), batch.schema.with_metadata(metadata))
+                writer.write_batch(batch)
+                yield row, batch
+                row += batch.num_rows
+            if writer is None:
+                return
+            writer.close()
+            writer = None
+            os.replace(tmp_path, path)
+        finally:
+            if writer is not None:
+                writer.close()
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def table(self, source: str) -> pa.Table:
+        """The whole table, memory-mapped; reopened if the file has been rewritten."""
+        path = self.path(source)
+        mtime = path.stat().st_mtime_ns
+        with self._lock:
+            cached = self._open.get(path)
+            if cached is None or cached[0] != mtime:
+                cached = self._open[path] = (mtime, ipc.open_file(pa.memory_map(str(path))).read_all())
+            return cached[1]
+
+    def source_stamp(self, source: str) -> Optional[Tuple[int, int]]:
+        """(size, mtime_ns) of the source file when its table was written, or None if not recorded."""
+        metadata = self.table(source).schema.metadata or {}
+        try:
+            return int(metadata[b"source_size"]), int(metadata[b"source_mtime_ns"])
+        except (KeyError, ValueError):
+            return None
+
+    def rows(self, source: str, start: int, end: int) -> List[Dict]:
+        """Rows [start, end) as dicts."""
+        return self.table(source).slice(start, end - start).to_pylist()
+
+    def to_pandas(self, source: str) -> pd.DataFrame:
+        return self.table(source).to_pandas()
+
+    def remove(self, source: str):
+        path = self.path(source)
+        with self._lock:
+            self._open.pop(path, None)
+        if path.exists():
+            path.unlink()
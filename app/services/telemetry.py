@@ -0,0 +1,278 @@
+"""Request timing spans, Prometheus-style metrics and non-blocking logging.
+
+A request opens a RequestTrace (see ``request_trace``); code on its path
+wraps each stage in ``span("stage")``. Every span is observed in the
+``finsolve_stage_seconds`` histogram by stage and role, and the trace keeps a
+per-request breakdown for the sampled request log. The trace travels in a
+context variable, so it follows the request into run_in_threadpool; work
+handed to other executors must be submitted under ``contextvars.copy_context()``.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+from ..config import LOG_LEVEL, LOG_SAMPLE_RATE, LOG_SLOW_REQUEST_MS
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+request_logger = logging.getLogger("app.requests")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Gauge:
+    """A value that goes up and down, such as a queue depth."""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge",
+                f"{self.name} {self.value:g}"]
+
+
+class Histogram:
+    """Fixed-bucket histogram per label combination."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bucket] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((labels, list(counts), total, count)
+                              for labels, (counts, total, count) in self._series.items())
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = _labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total:g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[object] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        metric = Gauge(name, documentation)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """The Prometheus text exposition format (version 0.0.4) of every metric."""
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+REQUEST_SECONDS = REGISTRY.histogram("finsolve_request_seconds", "End-to-end request latency.",
+                                     ("endpoint", "role"))
+STAGE_SECONDS = REGISTRY.histogram("finsolve_stage_seconds", "Latency of each stage of answering a request.",
+                                   ("stage", "role"))
+LLM_TOKENS = REGISTRY.histogram("finsolve_llm_tokens", "Prompt and completion tokens per LLM call.",
+                                ("kind", "role"), TOKEN_BUCKETS)
+RESPONSES = REGISTRY.counter("finsolve_responses_total", "Answers by where they came from (llm, cache, hr).",
+                             ("source", "role"))
+EMBED_BATCH_SIZE = REGISTRY.histogram("finsolve_embed_batch_size", "Distinct queries per query-encoder call.",
+                                      buckets=BATCH_BUCKETS)
+QUERY_EMBEDDINGS = REGISTRY.counter("finsolve_query_embeddings_total",
+                                    "Query embeddings by outcome (cached, encoded).", ("outcome",))
+LLM_QUEUE_DEPTH = REGISTRY.gauge("finsolve_llm_queue_depth", "LLM calls waiting for a gateway slot or token budget.")
+LLM_IN_FLIGHT = REGISTRY.gauge("finsolve_llm_in_flight", "LLM calls the gateway is running.")
+LLM_QUEUE_WAIT = REGISTRY.histogram("finsolve_llm_queue_wait_seconds", "Time LLM calls waited in the gateway queue.")
+LLM_CALLS = REGISTRY.counter("finsolve_llm_calls_total",
+                             "LLM gateway calls by outcome (ok, retried, failed, rejected, coalesced).", ("outcome",))
+RERANK_PAIRS = REGISTRY.counter("finsolve_rerank_pairs_total",
+                                "Reranker (query, chunk) pairs by outcome (scored, cached, skipped).", ("outcome",))
+
+
+class RequestTrace:
+    __slots__ = ("endpoint", "role", "user", "start", "stages", "tokens", "source", "error")
+
+    def __init__(self, endpoint: str, role: str, user: str = ""):
+        self.endpoint = endpoint
+        self.role = role
+        self.user = user
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.tokens: Dict[str, int] = {}
+        self.source = "llm"
+        self.error = False  # set by handlers that turn a failure into a normal response
+
+    def finish(self):
+        seconds = time.perf_counter() - self.start
+        REQUEST_SECONDS.observe(seconds, self.endpoint, self.role)
+        RESPONSES.inc("error" if self.error else self.source, self.role)
+        if seconds * 1000 >= LOG_SLOW_REQUEST_MS or random.random() < LOG_SAMPLE_RATE:
+            request_logger.info(json.dumps({
+                "endpoint": self.endpoint, "user": self.user, "role": self.role, "source": self.source,
+                "error": self.error, "ms": round(seconds * 1000, 2), "tokens": self.tokens,
+                "stages_ms": {stage: round(value * 1000, 2) for stage, value in self.stages.items()},
+            }))
+
+
+_current: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+@contextmanager
+def request_trace(endpoint: str, role: str, user: str = ""):
+    """Trace the enclosed request; stages timed with span() inside it are attributed to it."""
+    trace = RequestTrace(endpoint, role, user)
+    # Restored by value: a streamed response's generator may be closed from another context
+    previous = _current.get()
+    _current.set(trace)
+    try:
+        yield trace
+    except BaseException:
+        trace.error = True
+        raise
+    finally:
+        _current.set(previous)
+        trace.finish()
+
+
+def record(stage: str, seconds: float, role: Optional[str] = None):
+    trace = _current.get()
+    STAGE_SECONDS.observe(seconds, stage, role or (trace.role if trace else "none"))
+    if trace is not None:
+        trace.stages[stage] = trace.stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as one stage of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def record_tokens(kind: str, tokens: int):
+    """Prompt or completion tokens of the current request's LLM call."""
+    trace = _current.get()
+    LLM_TOKENS.observe(tokens, kind, trace.role if trace else "none")
+    if trace is not None:
+        trace.tokens[kind] = trace.tokens.get(kind, 0) + tokens
+
+
+def set_source(source: str):
+    """Where the current request's answer came from, when not the LLM."""
+    trace = _current.get()
+    if trace is not None:
+        trace.source = source
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_listening = False
+
+
+def _start_listener():
+    global _listening
+    if _listener is not None and not _listening:
+        _listener.start()
+        _listening = True
+
+
+def _stop_listener():
+    global _listening
+    if _listener is not None and _listening:
+        _listener.stop()
+        _listening = False
+
+
+def configure_logging(level: str = LOG_LEVEL):
+    """Send log records through a queue to a background thread that writes them to stderr."""
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, handler)
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(level)
+    _start_listener()
+    atexit.register(_stop_listener)
+    # The listener thread doesn't survive os.fork(): stop it around the fork and start one on each side.
+    # Windows has no fork (nor register_at_fork).
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(before=_stop_listener, after_in_parent=_start_listener, after_in_child=_start_listener)
@@ -0,0 +1,27 @@
+import threading
+from typing import List
+from ..config import TOKENIZER_MODEL
+
+_tokenizer = None
+_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """The process-wide tiktoken encoding used to budget prompts, loaded on first use."""
+    global _tokenizer
+    if _tokenizer is None:
+        with _lock:
+            if _tokenizer is None:
+                import tiktoken
+                _tokenizer = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    # encode_ordinary: document text may legitimately contain strings like "<|endoftext|>"
+    return len(get_tokenizer().encode_ordinary(text))
+
+
+def count_tokens_batch(texts: List[str]) -> List[int]:
+    """count_tokens for many texts in one call (tiktoken encodes the batch on its own threads)."""
+    return [len(tokens) for tokens in get_tokenizer().encode_ordinary_batch(texts)]
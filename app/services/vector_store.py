@@ -1,112 +1,663 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from contextlib import ExitStack, contextmanager
 import faiss
+import hashlib
+import json
+import logging
 import numpy as np
 import pickle
 import os
+import threading
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking of the store directory
+    fcntl = None
+from ..config import (VECTOR_STORE_DIR, ROLES, EMBEDDING_MODEL, EMBEDDING_BACKEND, EMBEDDING_PARITY_MIN_COSINE,
+                      INDEX_PARAMS, index_type_for, RRF_K)
+from .embeddings import get_encoder
+from .chunk_store import ChunkStore
+from .lexical_index import LexicalIndex, reciprocal_rank_fusion
+from .query_embedder import QueryEmbedder
+from .telemetry import span
+from . import faiss_index
+
+logger = logging.getLogger(__name__)
+
+# Records the embedding signature of the vectors in a store directory
+ENCODER_RECORD = "encoder.json"
+# Held exclusively by a process writing the store directory, shared while adopting what another wrote
+LOCK_FILE = "store.lock"
+
+
+class RoleSnapshot:
+    """A role's FAISS index, chunk store and BM25 index as of one version.
+
+    Never changed once published: writers change a copy and publish it by
+    swapping the reference (see VectorStore.writing), so a search holding a
+    snapshot is neither blocked nor sees a half-applied update.
+    """
+
+    __slots__ = ("index", "chunks", "lexical", "version", "mapped", "stamp")
+
+    def __init__(self, index: faiss.Index, chunks: ChunkStore, lexical: LexicalIndex, version: int = 0,
+                 mapped: bool = False, stamp: Optional[Tuple] = None):
+        self.index = index
+        self.chunks = chunks
+        self.lexical = lexical
+        # Bumped whenever the role's contents change, so caches can detect stale answers
+        self.version = version
+        # Whether the index is still a read-only memory map of the file on disk
+        self.mapped = mapped
+        # Identity of the files on disk this snapshot was loaded from or saved to
+        self.stamp = stamp
+
 
 class VectorStore:
-    def __init__(self, persist_directory: str = "resources/vector_store"):
+    def __init__(self, persist_directory: str = VECTOR_STORE_DIR, encoder=None, dimension: Optional[int] = None,
+                 roles: Optional[List[str]] = None, backend: str = EMBEDDING_BACKEND):
         self.persist_directory = Path(persist_directory)
-        self.persist_directory.mkdir(exist_ok=True)
-        
-        # Initialize sentence transformer
-        self.encoder = SentenceTransformer('all-MiniLM-L6-v2')
-        
-        # Initialize FAISS indices and document storage for each role
-        self.indices = {}
-        self.documents = {}
-        self.metadatas = {}
-        self._initialize_indices()
-
-    def _initialize_indices(self):
-        """Initialize FAISS indices for each role"""
-        roles = ["engineering", "finance", "hr", "marketing", "general"]
-        
-        for role in roles:
-            index_path = self.persist_directory / f"{role}_index.faiss"
-            docs_path = self.persist_directory / f"{role}_docs.pkl"
-            meta_path = self.persist_directory / f"{role}_meta.pkl"
-            
-            if index_path.exists() and docs_path.exists() and meta_path.exists():
-                # Load existing index
-                self.indices[role] = faiss.read_index(str(index_path))
-                with open(docs_path, 'rb') as f:
-                    self.documents[role] = pickle.load(f)
-                with open(meta_path, 'rb') as f:
-                    self.metadatas[role] = pickle.load(f)
-            else:
-                # Create new index
-                dimension = self.encoder.get_sentence_embedding_dimension()
-                self.indices[role] = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
-                self.documents[role] = []
-                self.metadatas[role] = []
+        self.persist_directory.mkdir(parents=True, exist_ok=True)
+        self.roles = list(roles or ROLES)
 
-    def _save_index(self, role: str):
-        """Save FAISS index and documents to disk"""
-        index_path = self.persist_directory / f"{role}_index.faiss"
+        # The encoder is shared process-wide and only loaded when first needed
+        self._encoder = encoder
+        self._dimension = dimension
+        # Encoder backend (see embeddings.BACKENDS); a caller-supplied encoder is taken as is
+        self.backend = backend if encoder is None else "custom"
+        self._signature = None
+        self._signature_lock = threading.Lock()
+        # Queries of concurrent requests are encoded in micro-batches, behind an LRU
+        self.query_embedder = QueryEmbedder(lambda: self.encoder)
+
+        # Index type per role, see faiss_index.INDEX_TYPES
+        self.index_types = {role: index_type_for(role) for role in self.roles}
+        self.index_params = dict(INDEX_PARAMS)
+
+        # Published snapshot of each role, loaded lazily; a search reads one per role (see view())
+        self._snapshots: Dict[str, RoleSnapshot] = {}
+        # Copies being changed by the writer, published on save() or when writing() ends
+        self._staged: Dict[str, RoleSnapshot] = {}
+        # role -> HNSW removals recorded in the writer's copy, applied with one rebuild when it is published
+        self._deferred: Dict[str, List] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._writing = 0
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            self._encoder = get_encoder(backend=self.backend)
+        return self._encoder
+
+    @property
+    def indices(self) -> Dict[str, faiss.Index]:
+        """Published FAISS index of each loaded role."""
+        return {role: snapshot.index for role, snapshot in self._snapshots.items()}
+
+    @property
+    def chunks(self) -> Dict[str, ChunkStore]:
+        """Published chunk store of each loaded role."""
+        return {role: snapshot.chunks for role, snapshot in self._snapshots.items()}
+
+    @property
+    def lexical(self) -> Dict[str, LexicalIndex]:
+        """Published BM25 index over each loaded role's chunks."""
+        return {role: snapshot.lexical for role, snapshot in self._snapshots.items()}
+
+    @property
+    def versions(self) -> Dict[str, int]:
+        """Content version of every role."""
+        return {role: self._snapshots[role].version if role in self._snapshots else 0 for role in self.roles}
+
+    @property
+    def own_signature(self) -> str:
+        """The signature of vectors this store's encoder produces."""
+        if self.backend in ("torch", "custom"):
+            return f"{EMBEDDING_MODEL}:l2"
+        return f"{EMBEDDING_MODEL}@{self.backend}:l2"
+
+    @property
+    def embedding_signature(self) -> str:
+        """Identifies how stored vectors were produced; ingestion re-embeds every file when it changes.
+
+        A backend other than the one that built the store adopts the stored
+        signature if it reproduces the stored vectors (see check_parity), so
+        e.g. switching torch -> onnx keeps the indices. Otherwise it uses its
+        own and the next ingestion re-embeds everything.
+        """
+        if self._signature is None:
+            with self._signature_lock:
+                if self._signature is None:
+                    self._signature = self._resolve_signature()
+        return self._signature
+
+    def _stored_signature(self) -> Optional[str]:
+        record = self.persist_directory / ENCODER_RECORD
+        if record.exists():
+            return json.loads(record.read_text(encoding='utf-8'))["signature"]
+        # Stores written before the record existed were all embedded with the torch backend
+        if any(self._index_path(role).exists() for role in self.roles):
+            return f"{EMBEDDING_MODEL}:l2"
+        return None
+
+    def _resolve_signature(self) -> str:
+        own, stored = self.own_signature, self._stored_signature()
+        if stored is None or stored == own:
+            return own
+        parity = self.check_parity()
+        if parity is None and not any(len(self.chunks[role]) for role in self.roles):
+            return own
+        if parity is not None and parity >= EMBEDDING_PARITY_MIN_COSINE:
+            logger.info("Encoder backend '%s' reproduces the stored vectors (min cosine %.4f); keeping them",
+                        self.backend, parity)
+            return stored
+        logger.warning("Encoder backend '%s' does not reproduce the vectors in %s (min cosine %s, needs %s); "
+                       "the next ingestion re-embeds every file", self.backend, self.persist_directory,
+                       "n/a" if parity is None else f"{parity:.4f}", EMBEDDING_PARITY_MIN_COSINE)
+        return own
+
+    def check_parity(self, sample: int = 16) -> Optional[float]:
+        """Lowest cosine between stored vectors and the current encoder's embedding of the same chunks.
+
+        Compares up to `sample` chunks per role, from indices that keep exact
+        vectors (flat and HNSW; IVF-PQ codes are lossy). None when there is nothing to compare.
+        """
+        documents, stored = [], []
+        for snapshot in self.view(self.roles).values():
+            index = snapshot.index
+            if not len(snapshot.chunks) or faiss_index.index_kind(index) == "ivfpq":
+                continue
+            inner = faiss.downcast_index(index.index)
+            keys = faiss.vector_to_array(index.id_map)
+            for position in np.unique(np.linspace(0, len(keys) - 1, min(sample, len(keys))).astype(int)):
+                chunk = snapshot.chunks.get(int(keys[position]))
+                if chunk is not None:
+                    documents.append(chunk[0])
+                    stored.append(inner.reconstruct(int(position)))
+        if not documents:
+            return None
+        current = faiss_index.normalize(self.encoder.encode(documents))
+        return float(np.min(np.sum(current * faiss_index.normalize(np.array(stored)), axis=1)))
+
+    def _ensure_role(self, role: str):
+        """Load (or create) the FAISS index and document storage for a role on first access."""
+        if role not in self.roles:
+            raise ValueError(f"Invalid role: {role}")
+        if role in self._snapshots:
+            return
+        with self._lock:
+            if role not in self._snapshots:
+                self._snapshots[role] = self._load_role(role)
+
+    def _index_path(self, role: str) -> Path:
+        return self.persist_directory / f"{role}_index.faiss"
+
+    def _disk_stamp(self, role: str) -> Tuple:
+        """Identity of a role's index file and chunk store / BM25 headers on disk, which saving replaces."""
+        stamp = []
+        for path in (self._index_path(role), self.persist_directory / f"{role}_chunks.json",
+                     self.persist_directory / f"{role}_bm25.json"):
+            try:
+                stat = path.stat()
+                stamp.append((stat.st_ino, stat.st_mtime_ns))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _load_role(self, role: str) -> RoleSnapshot:
+        snapshot = self._open_role(role)
+        snapshot.stamp = self._disk_stamp(role)
+        return snapshot
+
+    def _open_role(self, role: str) -> RoleSnapshot:
+        index_path = self._index_path(role)
+        if ChunkStore.exists(self.persist_directory, role) and index_path.exists():
+            # Load existing index and chunk store, both memory-mapped
+            chunks = ChunkStore(self.persist_directory, role)
+            index = faiss_index.read_index(index_path, self.index_types[role])
+            if isinstance(index, faiss.IndexIDMap) and index.ntotal == len(chunks):
+                conformed = self._conform_index(role, index)
+                return RoleSnapshot(conformed, chunks, self._load_lexical(role, chunks), mapped=conformed is index)
+            logger.warning("Index and chunk store for role '%s' disagree; starting over", role)
+        else:
+            migrated = self._migrate_pickles(role)
+            if migrated is not None:
+                return migrated
+        if index_path.exists() and not ChunkStore.exists(self.persist_directory, role):
+            # Indices written before chunk ids were tracked can't be updated
+            # incrementally; start the role over and let ingestion refill it.
+            logger.warning("Discarding legacy index for role '%s'", role)
+            for suffix in ("docs", "meta"):
+                (self.persist_directory / f"{role}_{suffix}.pkl").unlink(missing_ok=True)
+
+        # Create new index
+        dimension = self._dimension or self.encoder.get_sentence_embedding_dimension()
+        chunks = ChunkStore(self.persist_directory, role)
+        chunks.clear()
+        lexical = LexicalIndex(self.persist_directory, role)
+        lexical.clear()
+        return RoleSnapshot(faiss_index.new_index(self.index_types[role], dimension, params=self.index_params),
+                            chunks, lexical)
+
+    def _migrate_pickles(self, role: str) -> Optional[RoleSnapshot]:
+        """Convert the pickled id -> document / metadata dicts of earlier releases into a chunk store."""
+        index_path = self._index_path(role)
         docs_path = self.persist_directory / f"{role}_docs.pkl"
         meta_path = self.persist_directory / f"{role}_meta.pkl"
-        
-        faiss.write_index(self.indices[role], str(index_path))
-        with open(docs_path, 'wb') as f:
-            pickle.dump(self.documents[role], f)
-        with open(meta_path, 'wb') as f:
-            pickle.dump(self.metadatas[role], f)
-
-    def add_documents(self, role: str, documents: List[str], metadatas: List[Dict], ids: List[str]):
+        if not (index_path.exists() and docs_path.exists() and meta_path.exists()):
+            return None
+        with open(docs_path, 'rb') as f:
+            documents = pickle.load(f)
+        with open(meta_path, 'rb') as f:
+            metadatas = pickle.load(f)
+        index = faiss.read_index(str(index_path))
+        if not (isinstance(documents, dict) and isinstance(index, faiss.IndexIDMap)):
+            return None
+        logger.info("Migrating pickled chunks for role '%s' to the chunk store", role)
+        chunks = ChunkStore(self.persist_directory, role)
+        keys = list(documents)
+        chunks.add(keys, [documents[k] for k in keys], [metadatas[k] for k in keys])
+        chunks.save()
+        snapshot = RoleSnapshot(self._conform_index(role, index), chunks, self._load_lexical(role, chunks))
+        for path in (docs_path, meta_path):
+            path.unlink()
+        return snapshot
+
+    def _load_lexical(self, role: str, chunks: ChunkStore) -> LexicalIndex:
+        """Open a role's BM25 index, building it from the chunk store if it is missing or out of step."""
+        lexical = LexicalIndex(self.persist_directory, role)
+        if len(lexical) != len(chunks):
+            logger.info("Building BM25 index for role '%s' from %d chunks", role, len(chunks))
+            lexical.clear()
+            items = list(chunks.items())
+            lexical.add([key for key, _, _ in items], [document for _, document, _ in items])
+            lexical.save()
+        return lexical
+
+    def _conform_index(self, role: str, index: faiss.Index) -> faiss.Index:
+        """Rebuild a persisted index whose type no longer matches the configured one."""
+        wanted = self.index_types[role]
+        current = faiss_index.index_kind(index)
+        if current != wanted and not (wanted == "ivfpq" and current == "flat"):
+            logger.info("Rebuilding '%s' index: %s -> %s", role, current, wanted)
+            index = faiss_index.rebuild(index, wanted, params=self.index_params)
+        else:
+            faiss_index.configure_search(index, self.index_params)
+        return self._maybe_train(role, index)
+
+    def _maybe_train(self, role: str, index: faiss.Index) -> faiss.Index:
+        """Upgrade a role configured for IVF-PQ from its interim flat index once there is enough data to train."""
+        if (self.index_types[role] == "ivfpq" and faiss_index.index_kind(index) == "flat"
+                and index.ntotal >= self.index_params["ivf_min_train"]):
+            logger.info("Training IVF-PQ index for '%s' on %d vectors", role, index.ntotal)
+            index = faiss_index.rebuild(index, "ivfpq", params=self.index_params)
+        return index
+
+    def load_roles(self):
+        """Load every role's index and chunk store up front."""
+        for role in self.roles:
+            self._ensure_role(role)
+
+    def warm(self):
+        """Load every role's index and the encoder up front."""
+        self.load_roles()
+        return self.encoder
+
+    # -- writes ------------------------------------------------------------------
+
+    @contextmanager
+    def writing(self):
+        """Group changes to the store into one update that searches see all at once or not at all.
+
+        Changes go to copies of the roles they touch (copying a role's FAISS
+        index; the chunk store and BM25 index only copy their pending changes).
+        save() inside the block publishes the saved roles; the rest are
+        published when the outermost block ends, and dropped if it raises.
+        Searches keep reading the published snapshots throughout. The
+        outermost block also locks the store directory against other
+        processes and first adopts whatever they saved (see refresh()).
+        Blocks nest, and a single add or remove outside one is its own update.
+        """
+        with self._write_lock, ExitStack() as stack:
+            if self._writing == 0:
+                stack.enter_context(_store_lock(self.persist_directory / LOCK_FILE, exclusive=True))
+                self._adopt_saved()
+            self._writing += 1
+            try:
+                yield
+                if self._writing == 1:
+                    self._publish()
+            finally:
+                self._writing -= 1
+                if self._writing == 0:
+                    self._staged.clear()
+                    self._deferred.clear()
+
+    def _current(self, role: str) -> RoleSnapshot:
+        """The writer's view of a role: its copy if it has changed it, else the published snapshot."""
+        return self._staged.get(role) or self._snapshots[role]
+
+    def _stage(self, role: str) -> RoleSnapshot:
+        """The writer's copy of a role, made on its first change."""
+        staged = self._staged.get(role)
+        if staged is None:
+            current = self._snapshots[role]
+            if current.mapped:
+                # The snapshot maps the file on disk as it is (writing() adopts newer files first)
+                index = faiss_index.read_index(self._index_path(role), self.index_types[role], mmap=False)
+                faiss_index.configure_search(index, self.index_params)
+            else:
+                index = faiss_index.copy_index(current.index, self.index_params)
+            staged = RoleSnapshot(index, current.chunks.copy(), current.lexical.copy(), current.version + 1,
+                                  stamp=current.stamp)
+            self._staged[role] = staged
+        return staged
+
+    def _compact(self, role: str, staged: RoleSnapshot):
+        staged.index = faiss_index.compact(staged.index, self._deferred.pop(role, []), self.index_params)
+
+    def _publish(self):
+        for role, staged in list(self._staged.items()):
+            self._compact(role, staged)
+            self._snapshots[role] = staged
+        self._staged.clear()
+
+    def _save_index(self, role: str):
+        """Save a role's FAISS index and chunk store to disk and publish them, memory-mapped."""
+        staged = self._staged.pop(role, None)
+        if staged is None:
+            current = self._snapshots[role]
+            if current.mapped and not current.chunks.dirty and not current.lexical.dirty:
+                return  # Nothing changed since it was loaded
+            staged = RoleSnapshot(current.index, current.chunks.copy(), current.lexical.copy(), current.version)
+        self._compact(role, staged)
+        index_path = self._index_path(role)
+        tmp_path = index_path.with_suffix(".faiss.tmp")
+        faiss.write_index(staged.index, str(tmp_path))
+        os.replace(tmp_path, index_path)
+        staged.chunks.save()
+        staged.lexical.save()
+        index = faiss_index.read_index(index_path, self.index_types[role])
+        faiss_index.configure_search(index, self.index_params)
+        self._snapshots[role] = RoleSnapshot(index, staged.chunks, staged.lexical, staged.version, mapped=True,
+                                             stamp=self._disk_stamp(role))
+        self._write_record()
+
+    def _write_record(self):
+        record = self.persist_directory / ENCODER_RECORD
+        if self._stored_signature() != self.embedding_signature or not record.exists():
+            tmp_path = record.with_suffix(".json.tmp")
+            tmp_path.write_text(json.dumps({"signature": self.embedding_signature}), encoding='utf-8')
+            os.replace(tmp_path, record)
+
+    def save(self, roles: Optional[List[str]] = None):
+        """Persist and publish the given roles (default: every loaded role)."""
+        with self.writing():
+            for role in roles if roles is not None else list(self._snapshots):
+                self._ensure_role(role)
+                self._save_index(role)
+
+    def refresh(self) -> List[str]:
+        """Swap in the roles another process (app.ingest, another API worker) saved since they were loaded.
+
+        Opening a saved role only maps its files, so this is cheap. Never
+        waits: while a writer holds the store it returns [] at once, and a
+        later call picks the changes up. Returns the roles swapped in.
+        """
+        if not self._write_lock.acquire(blocking=False):
+            return []
+        try:
+            with _store_lock(self.persist_directory / LOCK_FILE, exclusive=False, blocking=False) as locked:
+                return self._adopt_saved() if locked else []
+        finally:
+            self._write_lock.release()
+
+    def _adopt_saved(self) -> List[str]:
+        adopted = []
+        for role, current in list(self._snapshots.items()):
+            if self._disk_stamp(role) != current.stamp and ChunkStore.exists(self.persist_directory, role):
+                snapshot = self._load_role(role)
+                snapshot.version = current.version + 1
+                self._snapshots[role] = snapshot
+                adopted.append(role)
+        if adopted:
+            logger.info("Adopted indices saved by another process: %s", ", ".join(adopted))
+        return adopted
+
+    def add_documents(self, role: str, documents: List[str], metadatas: List[Dict], ids: List[str], save: bool = True):
         """Add document chunks to the specified role's index. Each chunk has its own metadata (including source and chunk index)."""
-        if role not in self.indices:
-            raise ValueError(f"Invalid role: {role}")
-        
+        self._ensure_role(role)
+
         # Encode documents
         embeddings = self.encoder.encode(documents, show_progress_bar=True)
-        
-        # Add to FAISS index
-        self.indices[role].add(embeddings.astype('float32'))
-        
-        # Store documents and metadata
-        for doc, meta, id_ in zip(documents, metadatas, ids):
-            self.documents[role].append(doc)
-            self.metadatas[role].append(meta)
-        
-        # Save to disk
-        self._save_index(role)
+        self.add_embeddings(role, embeddings, documents, metadatas, ids, save=save)
+
+    def add_embeddings(self, role: str, embeddings: np.ndarray, documents: List[str], metadatas: List[Dict],
+                       ids: List[str], save: bool = True):
+        """Add already-encoded document chunks to the specified role's index."""
+        self._ensure_role(role)
+        keys = np.array([chunk_key(id_) for id_ in ids], dtype='int64')
+
+        with self.writing():
+            # Chunks that are already indexed are replaced rather than duplicated
+            self.remove_documents(role, ids, save=False)
+            staged = self._stage(role)
+
+            # Add to FAISS index
+            staged.index.add_with_ids(faiss_index.normalize(embeddings), keys)
+            staged.index = self._maybe_train(role, staged.index)
+
+            # Store documents and metadata
+            staged.chunks.add(keys.tolist(), documents, metadatas)
+            staged.lexical.add(keys.tolist(), documents)
+
+            if save:
+                self._save_index(role)
+
+    def remove_documents(self, role: str, ids: List[str], save: bool = True) -> int:
+        """Remove chunks by chunk id from the specified role's index. Returns the number removed."""
+        self._ensure_role(role)
+        with self.writing():
+            chunks = self._current(role).chunks
+            keys = [key for key in (chunk_key(id_) for id_ in ids) if key in chunks]
+            if keys:
+                staged = self._stage(role)
+                # HNSW removals are applied once per update (see faiss_index.compact), not once per call
+                staged.index = faiss_index.remove_ids(staged.index, np.array(keys, dtype='int64'),
+                                                      self._deferred.setdefault(role, []))
+                staged.chunks.remove(keys)
+                staged.lexical.remove(keys)
+            if save:
+                self._save_index(role)
+        return len(keys)
+
+    def contains(self, role: str, ids: List[str]) -> bool:
+        """Whether every chunk id is present in the specified role's index."""
+        self._ensure_role(role)
+        return self._current(role).chunks.contains_all([chunk_key(id_) for id_ in ids])
+
+    # -- reads -------------------------------------------------------------------
+
+    def versions_for(self, roles) -> tuple:
+        """Current content version of each role, in the given order."""
+        return tuple(self._snapshots[role].version if role in self._snapshots else 0 for role in roles)
+
+    def view(self, roles) -> Dict[str, RoleSnapshot]:
+        """The published snapshot of each role. Searching and fetching through one view is consistent
+        even while an update is being published."""
+        for role in roles:
+            self._ensure_role(role)
+        return {role: self._snapshots[role] for role in roles}
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Encode a query once into a normalized (1, d) float32 matrix usable by every role's index."""
+        with span("embed"):
+            return self.query_embedder.embed(query)
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode many queries in one encoder call (recent ones come from the LRU) into a normalized (N, d) matrix."""
+        with span("embed"):
+            return self.query_embedder.embed_many(queries)
 
     def search(self, role: str, query: str, n_results: int = 5) -> List[Dict]:
         """Search for relevant document chunks in the specified role's index. Returns chunk metadata."""
-        if role not in self.indices:
-            raise ValueError(f"Invalid role: {role}")
-        if len(self.documents[role]) == 0:
+        return self.search_roles([role], query, n_results=n_results)
+
+    def search_roles(self, roles: List[str], query: str, n_results: int = 5,
+                     query_embedding: Optional[np.ndarray] = None) -> List[Dict]:
+        """Search several roles' indices with a single query embedding and merge the global top-k by score."""
+        view = self.view(roles)
+        return self.fetch(self.dense_hits(roles, query, n_results, query_embedding, view=view), view=view)
+
+    def lexical_search_roles(self, roles: List[str], query: str, n_results: int = 5) -> List[Dict]:
+        """BM25 search over several roles' chunks, merged into the global top-k by rank."""
+        view = self.view(roles)
+        return self.fetch(self.lexical_hits(roles, query, n_results, view=view), view=view)
+
+    def dense_hits(self, roles: List[str], query: str, n_results: int,
+                   query_embedding: Optional[np.ndarray] = None,
+                   view: Optional[Dict[str, RoleSnapshot]] = None) -> List[Tuple[str, int, float]]:
+        """(role, chunk key, cosine score) of the global top-k by embedding similarity, best first."""
+        view = view or self.view(roles)
+        roles = [role for role in roles if len(view[role].chunks) > 0]
+        if not roles or n_results <= 0:
             return []  # No documents to search!
-        query_embedding = self.encoder.encode([query])
-        k = min(n_results, len(self.documents[role]))
-        if k == 0:
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        else:
+            query_embedding = faiss_index.normalize(query_embedding)
+
+        all_scores = []
+        all_keys = []
+        with span("dense_search"):
+            for role in roles:
+                k = min(n_results, len(view[role].chunks))
+                scores, keys = view[role].index.search(query_embedding, k)
+                all_scores.append(scores[0])
+                all_keys.append(keys[0])
+            return _merge_top(roles, all_keys, all_scores, n_results)
+
+    def dense_hits_batch(self, roles: List[str], query_embeddings: np.ndarray, n_results: int,
+                         view: Optional[Dict[str, RoleSnapshot]] = None) -> List[List[Tuple[str, int, float]]]:
+        """dense_hits for N queries at once: one search per role's index with the (N, d) query matrix."""
+        view = view or self.view(roles)
+        roles = [role for role in roles if len(view[role].chunks) > 0]
+        if not roles or n_results <= 0:
+            return [[] for _ in range(len(query_embeddings))]
+        query_embeddings = faiss_index.normalize(query_embeddings)
+        with span("dense_search"):
+            results = [view[role].index.search(query_embeddings, min(n_results, len(view[role].chunks)))
+                       for role in roles]
+            return [_merge_top(roles, [keys[row] for _, keys in results], [scores[row] for scores, _ in results],
+                               n_results)
+                    for row in range(len(query_embeddings))]
+
+    def lexical_hits(self, roles: List[str], query: str, n_results: int,
+                     view: Optional[Dict[str, RoleSnapshot]] = None) -> List[Tuple[str, int, float]]:
+        """(role, chunk key, fused score) of the global top-k, best first.
+
+        Each role's BM25 index has its own idf and document count, so raw
+        scores are not comparable across roles; the per-role rankings are
+        merged by reciprocal-rank fusion instead.
+        """
+        view = view or self.view(roles)
+        if not roles or n_results <= 0:
             return []
-        scores, indices = self.indices[role].search(
-            query_embedding.astype('float32'),
-            k
-        )
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.documents[role]):
-                results.append({
-                    "document": self.documents[role][idx],
-                    "metadata": self.metadatas[role][idx],
-                    "score": float(score)
-                })
-        return results
+        with span("bm25_search"):
+            rankings = []
+            for role in roles:
+                keys, scores = view[role].lexical.search(query, n_results)
+                rankings.append([(role, int(key), float(score)) for key, score in zip(keys, scores)])
+            return reciprocal_rank_fusion(rankings, n_results, RRF_K)
+
+    def fetch(self, hits: List[Tuple[str, int, float]],
+              view: Optional[Dict[str, RoleSnapshot]] = None) -> List[Dict]:
+        """Documents and metadata for (role, chunk key, score) hits, in order."""
+        return self.fetch_batch([hits], view=view)[0]
+
+    def fetch_batch(self, hit_lists: List[List[Tuple[str, int, float]]],
+                    view: Optional[Dict[str, RoleSnapshot]] = None) -> List[List[Dict]]:
+        """fetch() for several hit lists; a chunk that several of them hit is read once and shared."""
+        view = view or self.view({role for hits in hit_lists for role, _, _ in hits})
+        chunks = {}
+        with span("fetch"):
+            for hits in hit_lists:
+                for role, key, _ in hits:
+                    if (role, key) not in chunks:
+                        chunks[role, key] = view[role].chunks.get(key)
+        return [[{"document": chunks[role, key][0], "metadata": chunks[role, key][1], "score": score}
+                 for role, key, score in hits if chunks[role, key] is not None]
+                for hits in hit_lists]
 
     def get_all_documents(self, role: str) -> List[Dict]:
         """Get all documents for a specific role"""
-        if role not in self.indices:
-            raise ValueError(f"Invalid role: {role}")
-        
+        chunks = self.view([role])[role].chunks
+
         return [
             {
-                "document": doc,
-                "metadata": meta
+                "document": document,
+                "metadata": metadata
             }
-            for doc, meta in zip(self.documents[role], self.metadatas[role])
-        ] 
\ No newline at end of file
+            for _, document, metadata in chunks.items()
+        ]
+
+
+def _merge_top(roles: List[str], all_keys, all_scores, n: int) -> List[Tuple[str, int, float]]:
+    """Global top-n (role, key, score) across per-role result arrays."""
+    if not roles:
+        return []
+    scores = np.concatenate(all_scores)
+    keys = np.concatenate(all_keys)
+    owners = np.repeat(np.arange(len(roles)), [len(s) for s in all_scores])
+
+    # Missing hits come back as id -1; rank them last
+    scores = np.where(keys >= 0, scores, -np.inf)
+    n = min(n, len(scores))
+    if n == 0:
+        return []
+    top = np.argpartition(-scores, n - 1)[:n]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    top = top[keys[top] >= 0]
+    return [(roles[owners[i]], int(keys[i]), float(scores[i])) for i in top]
+
+
+@contextmanager
+def _store_lock(path: Path, exclusive: bool, blocking: bool = True):
+    """flock() a store directory's lock file; yields whether the lock is held."""
+    if fcntl is None:
+        yield True
+        return
+    with open(path, 'a') as f:
+        try:
+            fcntl.flock(f, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def chunk_key(chunk_id: str) -> int:
+    """Stable 63-bit FAISS id for a chunk id such as '{file_path}::chunk_{i}'."""
+    digest = hashlib.blake2b(chunk_id.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') & 0x7FFFFFFFFFFFFFFF
+
+
+_stores: Dict[str, VectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(persist_directory: str = VECTOR_STORE_DIR) -> VectorStore:
+    """Return the process-wide VectorStore for persist_directory, creating it on first use."""
+    key = str(Path(persist_directory).resolve())
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = VectorStore(persist_directory)
+                _stores[key] = store
+    return store
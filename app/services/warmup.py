@@ -0,0 +1,124 @@
+"""Lazily built API services and their background warm-up.
+
+Importing app.main builds nothing heavy: ``Services.chat_service`` imports and
+constructs the ChatService and DocumentProcessor (torch, faiss, pandas,
+tiktoken) on first access. The startup hook calls ``start_warm_up()``, which
+on a background thread ingests changed documents (WARMUP_INGEST), opens every
+index, runs one query embedding and loads the reranker model if there is one,
+so the server answers /healthz at once and /readyz only when a query would
+not pay for any of that. Once ready, the
+corpus reloader starts polling for changed documents if RELOAD_POLL_SECONDS is set.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from ..config import WARMUP_INGEST
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], key: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[key] = round(time.perf_counter() - start, 3)
+
+
+class Services:
+    def __init__(self, ingest: bool = WARMUP_INGEST):
+        self.ingest = ingest
+        self.state = "starting"  # -> "warming" -> "ready" or "failed"
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self.created = time.perf_counter()
+        self._chat_service = None
+        self._reloader = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    @property
+    def chat_service(self):
+        """The ChatService and its DocumentProcessor, imported and built on first access."""
+        if self._chat_service is None:
+            with self._lock:
+                if self._chat_service is None:
+                    with _timed(self.timings, "build_s"):
+                        from .chat_service import ChatService
+                        from .document_processor import DocumentProcessor
+                        self._chat_service = ChatService(DocumentProcessor())
+        return self._chat_service
+
+    @property
+    def document_processor(self):
+        return self.chat_service.document_processor
+
+    @property
+    def reloader(self):
+        """The CorpusReloader of the document processor, built on first access."""
+        if self._reloader is None:
+            processor = self.document_processor
+            with self._lock:
+                if self._reloader is None:
+                    from .reloader import CorpusReloader
+                    self._reloader = CorpusReloader(processor)
+        return self._reloader
+
+    def preload(self):
+        """Build the services, open every index and load torch encoder weights, without running inference.
+
+        For a parent process that forks workers: nothing here starts a thread
+        pool, so the preloaded pages are shared copy-on-write and each worker
+        only has to run the warm-up embedding.
+        """
+        store = self.document_processor.vector_store
+        with _timed(self.timings, "preload_indices_s"):
+            store.load_roles()
+        if store.backend == "torch":
+            # ONNX Runtime sessions start their thread pool when created, so those load in each worker
+            with _timed(self.timings, "preload_encoder_s"):
+                store.encoder
+
+    def warm_up(self):
+        """Ingest (if enabled), open the indices and embed one query; sets state to ready or failed."""
+        self.state = "warming"
+        try:
+            processor = self.document_processor
+            if self.ingest:
+                with _timed(self.timings, "ingest_s"):
+                    stats = processor.load_documents()
+                logger.info("Document indexing complete: %s", stats)
+            with _timed(self.timings, "indices_s"):
+                processor.vector_store.load_roles()
+            with _timed(self.timings, "encoder_s"):
+                processor.vector_store.encoder
+            with _timed(self.timings, "encode_s"):
+                processor.vector_store.embed_query("warm up")
+            if self.chat_service.reranker.enabled:
+                with _timed(self.timings, "reranker_s"):
+                    self.chat_service.reranker.warm()
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.exception("Warm-up failed")
+            return
+        self.timings["ready_s"] = round(time.perf_counter() - self.created, 3)
+        self.state = "ready"
+        logger.info("Ready in %.2fs: %s", self.timings["ready_s"], self.timings)
+        self.reloader.start_watching()
+
+    def start_warm_up(self) -> threading.Thread:
+        thread = threading.Thread(target=self.warm_up, name="warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict:
+        return {"state": self.state, "error": self.error, "pid": os.getpid(), "timings": dict(self.timings),
+                "uptime_s": round(time.perf_counter() - self.created, 3)}
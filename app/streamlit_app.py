@@ -11,6 +11,22 @@ st.set_page_config(
 )
 
 
+def stream_tokens(response):
+    """Yield answer tokens from the /chat/stream server-sent events as they arrive."""
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            event = None
+        elif line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            data = json.loads(line[len("data: "):])
+            if event == "error":
+                yield data["error"]
+            elif event is None and "token" in data:
+                yield data["token"]
+
+
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
@@ -34,7 +50,8 @@ with st.sidebar:
             )
             if response.status_code == 200:
                 data = response.json()
-                if "username" in data and "role" in data:
+                if "username" in data and "role" in data and "access_token" in data:
+                    # Later requests send the token, so the password is checked once per session
                     st.session_state.user = data
                     st.success("Login successful!")
                 else:
@@ -64,17 +81,21 @@ if "user" in st.session_state and "username" in st.session_state.user and "role"
   
         try:
             response = requests.post(
-                "http://localhost:8000/chat",
-                auth=HTTPBasicAuth(username, password),
-                json={"message": prompt}
+                "http://localhost:8000/chat/stream",
+                headers={"Authorization": f"Bearer {st.session_state.user['access_token']}"},
+                json={"message": prompt},
+                stream=True
             )
-            
-            if response.status_code == 200:
-                response_data = response.json()
-                
-                st.session_state.messages.append({"role": "assistant", "content": response_data["response"]})
+
+            if response.status_code == 401:
+                del st.session_state.user
+                st.error("Your session has expired. Please log in again.")
+            elif response.status_code == 200:
                 with st.chat_message("assistant"):
-                    st.markdown(response_data["response"])
+                    answer = st.write_stream(stream_tokens(response))
+                st.session_state.messages.append({"role": "assistant", "content": answer})
+            elif response.status_code == 503:
+                st.warning("The assistant is still starting up. Please try again in a few seconds.")
             else:
                 st.error("Error getting response from server")
         except Exception as e:
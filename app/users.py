@@ -0,0 +1,50 @@
+"""Manage the users that may log in to the API.
+
+    python -m app.users add NAME ROLE      # prompts for the password; ROLE must be in ROLES or the role policy
+    python -m app.users remove NAME
+    python -m app.users list
+
+Users live in USER_STORE (resources/users.json unless set); passwords are
+stored as scrypt hashes only.
+"""
+import argparse
+import getpass
+import sys
+from dotenv import load_dotenv
+from .config import USER_STORE, ROLES, ROLE_POLICY_FILE
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Manage FinSolve chatbot users.")
+    parser.add_argument("--store", default=USER_STORE, help="JSON file, or .db / .sqlite for SQLite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="add a user or reset their password and role")
+    add.add_argument("username")
+    add.add_argument("role")
+    add.add_argument("--password", help="read from a prompt when omitted")
+    remove = commands.add_parser("remove", help="delete a user")
+    remove.add_argument("username")
+    commands.add_parser("list", help="print every username and role")
+    args = parser.parse_args()
+
+    from .services.access_policy import AccessPolicy
+    from .services.auth import hash_password, open_user_store
+
+    store = open_user_store(args.store)
+    if args.command == "add":
+        roles = set(ROLES) | set(AccessPolicy.load_policy(ROLE_POLICY_FILE))
+        if args.role not in roles:
+            sys.exit(f"Unknown role {args.role!r}; expected one of: {', '.join(sorted(roles))}")
+        password = args.password or getpass.getpass(f"Password for {args.username}: ")
+        store.set(args.username, args.role, hash_password(password))
+    elif args.command == "remove":
+        if not store.remove(args.username):
+            sys.exit(f"No such user: {args.username}")
+    else:
+        for username in store.usernames():
+            print(f"{username}\t{store.get(username)['role']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Offline benchmarks for the FinSolve chatbot. Run from the repository root, e.g. ``python -m benchmarks.startup``."""
@@ -0,0 +1,82 @@
+import json
+import re
+import resource
+import sys
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, List
+
+import numpy as np
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MiB (Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except OSError:
+        return peak_rss_mb()
+
+
+def rss_breakdown_mb() -> Dict[str, float]:
+    """Anonymous (private heap) vs file-backed (page cache, shareable) resident memory in MiB (Linux)."""
+    fields = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("RssAnon:", "RssFile:")):
+                    name, value = line.split(":")
+                    fields[name.lower()] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return {"rss_anon_mb": fields.get("rssanon"), "rss_file_mb": fields.get("rssfile")}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+@contextmanager
+def timed(results: Dict, key: str):
+    """Record the wall time of the block, in seconds, under results[key]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        results[key] = round(time.perf_counter() - start, 4)
+
+
+def emit(name: str, results: Dict):
+    """Print a benchmark result as a single JSON line."""
+    print(json.dumps({"benchmark": name, **results}, default=str))
+
+
+class HashingEncoder:
+    """Stand-in for the SentenceTransformer: hashed, signed bag-of-words vectors.
+
+    Orders of magnitude faster than the model, so ingestion, index size and
+    cold start can be measured at millions of chunks. Retrieval quality is that
+    of a lexical model, so compare recall only between runs using the same encoder.
+    """
+
+    _WORD = re.compile(r"\w+")
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts: List[str], **_) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in self._WORD.findall(text.lower()):
+                h = zlib.crc32(word.encode('utf-8'))
+                vectors[row, h % self.dimension] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
@@ -0,0 +1,81 @@
+"""Recall@k and latency of each VectorStore index type against the exact flat baseline.
+
+    python -m benchmarks.ann_index --vectors 200000 --nprobe 8 16 32 --ef-search 32 64 128
+
+Vectors are drawn from a Gaussian mixture so that they cluster like sentence
+embeddings do; no encoder is loaded.
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from ._common import emit
+
+
+def clustered(n: int, dimension: int, rng, centers: np.ndarray) -> np.ndarray:
+    assignment = rng.integers(0, len(centers), n)
+    vectors = centers[assignment] + 0.35 * rng.standard_normal((n, dimension), dtype=np.float32)
+    return vectors.astype(np.float32)
+
+
+def measure(index, queries: np.ndarray, k: int, truth: np.ndarray):
+    timings = []
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        timings.append((time.perf_counter() - start) * 1000)
+        found[i] = ids[0]
+    recall = np.mean([len(np.intersect1d(f, t)) / k for f, t in zip(found, truth)])
+    timings = np.array(timings)
+    return {"recall_at_k": round(float(recall), 4),
+            "p50_ms": round(float(np.percentile(timings, 50)), 3),
+            "p99_ms": round(float(np.percentile(timings, 99)), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.config import INDEX_PARAMS
+    from app.services import faiss_index
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((1000, args.dimension), dtype=np.float32)
+    vectors = faiss_index.normalize(clustered(args.vectors, args.dimension, rng, centers))
+    queries = faiss_index.normalize(clustered(args.queries, args.dimension, rng, centers))
+    ids = np.arange(args.vectors, dtype=np.int64)
+    params = dict(INDEX_PARAMS, ivf_min_train=min(INDEX_PARAMS["ivf_min_train"], args.vectors))
+
+    results = {"vectors": args.vectors, "dimension": args.dimension, "k": args.k}
+    truth = None
+    for kind in faiss_index.INDEX_TYPES:
+        start = time.perf_counter()
+        index = faiss_index.new_index(kind, args.dimension, training=vectors, params=params)
+        index.add_with_ids(vectors, ids)
+        entry = {"build_s": round(time.perf_counter() - start, 3),
+                 "index_mb": round(len(faiss.serialize_index(index)) / (1024 * 1024), 1)}
+        if truth is None:
+            _, truth = index.search(queries, args.k)
+        knob, values = {"flat": (None, [None]), "hnsw": ("ef_search", args.ef_search),
+                        "ivfpq": ("nprobe", args.nprobe)}[kind]
+        for value in values:
+            if knob is not None:
+                faiss_index.configure_search(index, dict(params, hnsw_ef_search=value, ivf_nprobe=value))
+            label = kind if knob is None else f"{knob}={value}"
+            entry[label] = measure(index, queries, args.k, truth)
+        results[kind] = entry
+    emit("ann_index", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Per-request authentication cost under concurrent requests.
+
+    python -m benchmarks.auth --concurrency 1 8 32 --requests 20000
+
+Each mode authenticates requests from --users distinct users on a thread
+pool, in process, so only the auth check is timed:
+
+- plaintext: the old users_db dict lookup and string compare
+- scrypt: a hashed password verified on every request (no sessions)
+- basic_cached: Basic credentials, verified once and then served from the cache
+- token: bearer tokens from /login, served from the LRU of verified tokens
+- token_uncached: bearer tokens with the LRU disabled (one HMAC per request)
+
+The caches are warmed with one pass over the users first, and scrypt runs
+only --slow-requests requests per level. Reports requests/sec and p50 / p99
+latency in microseconds.
+"""
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from ._common import emit
+
+
+def measure(check, requests, concurrency: int):
+    def timed(request):
+        start = time.perf_counter()
+        if check(request) is None:
+            raise RuntimeError("authentication failed")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        timings = np.array(list(pool.map(timed, requests, chunksize=max(1, len(requests) // (concurrency * 8)))))
+        elapsed = time.perf_counter() - start
+    timings *= 1e6
+    return {"requests_per_sec": round(len(requests) / elapsed, 1),
+            "p50_us": round(float(np.percentile(timings, 50)), 2),
+            "p99_us": round(float(np.percentile(timings, 99)), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=20000, help="requests per mode and concurrency level")
+    parser.add_argument("--slow-requests", type=int, default=64, help="requests per level for the scrypt mode")
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    from app.services.auth import Authenticator, JsonUserStore, hash_password
+
+    users = [(f"user{i}", f"password-{i}", "engineering") for i in range(args.users)]
+    plaintext = {name: {"password": password, "role": role} for name, password, role in users}
+
+    def legacy_check(request):
+        name, password = request
+        user = plaintext.get(name)
+        if not user or user["password"] != password:
+            return None
+        return {"username": name, "role": user["role"]}
+
+    with tempfile.TemporaryDirectory() as directory:
+        # One hash shared by every user keeps setup fast; verification cost is the same
+        password_hash = hash_password("shared-password")
+        store = JsonUserStore(Path(directory) / "users.json")
+        for name, _, role in users:
+            store.set(name, role, password_hash)
+        authenticator = Authenticator(store, secret=b"benchmark")
+        uncached = Authenticator(store, secret=b"benchmark", cache_size=0)
+        credentials = [(name, "shared-password") for name, _, _ in users]
+        tokens = [authenticator.issue_token({"username": name, "role": role})[0] for name, _, role in users]
+
+        def requests_of(items, count):
+            return [items[i % len(items)] for i in range(count)]
+
+        modes = {
+            "plaintext": (legacy_check, [(name, password) for name, password, _ in users], args.requests),
+            "scrypt": (lambda r: authenticator.login(*r), credentials, args.slow_requests),
+            "basic_cached": (lambda r: authenticator.verify_credentials(*r), credentials, args.requests),
+            "token": (authenticator.verify_token, tokens, args.requests),
+            "token_uncached": (uncached.verify_token, tokens, args.requests),
+        }
+        results = {"users": args.users, "requests": args.requests, "modes": {}}
+        for mode, (check, items, count) in modes.items():
+            if mode != "scrypt":
+                for item in items:
+                    check(item)
+            results["modes"][mode] = {str(c): measure(check, requests_of(items, count), c)
+                                      for c in args.concurrency}
+    emit("auth", results)
+
+
+if __name__ == "__main__":
+    main()
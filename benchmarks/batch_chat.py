@@ -0,0 +1,101 @@
+"""Throughput of one /chat/batch request vs the same messages sent as sequential /chat calls.
+
+    python -m benchmarks.batch_chat --messages 64
+    python -m benchmarks.batch_chat --messages 256 --scale 10 --llm-ttft-ms 300
+
+Unless --url is given, an API server is started on a free port with
+LLM_BACKEND=fake (FAKE_LLM_TTFT_MS / FAKE_LLM_TOKEN_MS from --llm-ttft-ms and
+--llm-token-ms) and the response cache off, so every message is retrieved and
+answered. Messages are distinct, so neither mode gains from coalescing. Reports
+the wall time and messages/sec of each mode, the batch's time to its first
+NDJSON result and the speedup.
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from ._common import emit
+from .chat_load import QUERIES, api_server, free_port, wait_until_up
+from .corpus import synthesize
+
+
+def messages(count: int):
+    return [f"{QUERIES[i % len(QUERIES)]} Request {i}." for i in range(count)]
+
+
+async def sequential(client, url: str, auth, batch):
+    start = time.perf_counter()
+    for message in batch:
+        response = await client.post(f"{url}/chat", json={"message": message}, headers=auth)
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def batched(client, url: str, auth, batch, concurrency: int):
+    start = time.perf_counter()
+    first, results, errors = None, 0, 0
+    payload = {"messages": batch, "concurrency": concurrency}
+    async with client.stream("POST", f"{url}/chat/batch", json=payload, headers=auth) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            result = json.loads(line)
+            if "index" in result:
+                first = first or time.perf_counter() - start
+                results += 1
+                errors += "error" in result
+    return time.perf_counter() - start, first, results, errors
+
+
+async def run(args, url: str):
+    import httpx
+
+    batch = messages(args.messages)
+    async with httpx.AsyncClient(timeout=600) as client:
+        auth = await wait_until_up(client, url, (args.username, args.password), args.startup_timeout)
+        await client.post(f"{url}/chat", json={"message": "warm up"}, headers=auth)
+        batch_s, first_s, results, errors = await batched(client, url, auth, batch, args.concurrency)
+        sequential_s = await sequential(client, url, auth, batch)
+    return {"messages": args.messages, "concurrency": args.concurrency,
+            "sequential": {"seconds": round(sequential_s, 3),
+                           "messages_per_sec": round(args.messages / sequential_s, 2)},
+            "batch": {"seconds": round(batch_s, 3), "messages_per_sec": round(args.messages / batch_s, 2),
+                      "first_result_ms": round(first_s * 1000, 1) if first_s else None,
+                      "results": results, "errors": errors},
+            "speedup": round(sequential_s / batch_s, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--messages", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM calls in flight for the batch")
+    parser.add_argument("--llm-ttft-ms", type=float, default=50)
+    parser.add_argument("--llm-token-ms", type=float, default=1)
+    parser.add_argument("--username", default="Tony")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--scale", type=int, default=0, help="serve a synthetic corpus of N copies of resources/data")
+    args = parser.parse_args()
+
+    if args.url:
+        results = asyncio.run(run(args, args.url))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            env = {"LLM_BACKEND": "fake", "RESPONSE_CACHE_SIZE": "0", "FAKE_LLM_TTFT_MS": str(args.llm_ttft_ms),
+                   "FAKE_LLM_TOKEN_MS": str(args.llm_token_ms), "BATCH_CONCURRENCY": str(args.concurrency)}
+            if args.scale:
+                synthesize(Path(directory) / "data", args.scale)
+                env.update(DATA_DIR=f"{directory}/data", VECTOR_STORE_DIR=f"{directory}/store")
+            with api_server(free_port(), env) as url:
+                results = asyncio.run(run(args, url))
+        results.update(llm_backend="fake", scale=args.scale, llm_ttft_ms=args.llm_ttft_ms)
+    emit("batch_chat", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Latency and throughput of /chat and /chat/stream under concurrent users.
+
+    python -m benchmarks.chat_load --concurrency 1 8 32 --requests 64
+
+Unless --url is given, an API server is started on a free port with
+LLM_BACKEND=fake, so the numbers exclude the network and provider. With
+--scale N it serves a benchmarks.corpus copy of resources/data N times over,
+indexed at startup, instead of resources/data. The response cache is off
+unless --response-cache is given, so every request reaches retrieval and the
+LLM. Reports time-to-first-token (TTFT), total latency and requests/sec for
+each endpoint.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from ._common import emit
+from .corpus import synthesize
+
+QUERIES = [
+    "What is the leave policy?",
+    "Summarize the Q4 2024 marketing performance.",
+    "What were the quarterly revenue figures?",
+    "Describe the system architecture.",
+    "What benefits do employees receive?",
+    "What is the reimbursement process?",
+]
+
+
+@contextmanager
+def api_server(port: int, env: dict):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env={**os.environ, **env},
+    )
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_until_up(client, url: str, credentials, timeout: float):
+    """Log in once the API has warmed up; returns the bearer auth header sent with every request."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            ready = await client.get(f"{url}/readyz")
+            response = await client.get(f"{url}/login", auth=credentials)
+            if ready.status_code == 200 and response.status_code == 200:
+                return {"Authorization": f"Bearer {response.json()['access_token']}"}
+        except Exception:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"API at {url} did not come up within {timeout}s")
+
+
+async def one_request(client, url: str, endpoint: str, auth, query: str):
+    start = time.perf_counter()
+    first = None
+    async with client.stream("POST", f"{url}{endpoint}", json={"message": query}, headers=auth) as response:
+        response.raise_for_status()
+        async for _ in response.aiter_bytes():
+            if first is None:
+                first = time.perf_counter()
+    end = time.perf_counter()
+    return (first or end) - start, end - start
+
+
+async def drive(url: str, endpoint: str, auth, concurrency: int, requests: int):
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def task(i):
+            async with semaphore:
+                return await one_request(client, url, endpoint, auth, QUERIES[i % len(QUERIES)])
+
+        start = time.perf_counter()
+        timings = await asyncio.gather(*(task(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+    ttft, total = np.array(timings).T * 1000
+    return {"requests_per_sec": round(requests / elapsed, 2),
+            "ttft_p50_ms": round(float(np.percentile(ttft, 50)), 1),
+            "ttft_p99_ms": round(float(np.percentile(ttft, 99)), 1),
+            "latency_p50_ms": round(float(np.percentile(total, 50)), 1),
+            "latency_p99_ms": round(float(np.percentile(total, 99)), 1)}
+
+
+async def run(args, url: str):
+    import httpx
+
+    async with httpx.AsyncClient() as client:
+        auth = await wait_until_up(client, url, (args.username, args.password), args.startup_timeout)
+    results = {"requests": args.requests, "endpoints": {}}
+    for endpoint in args.endpoints:
+        results["endpoints"][endpoint] = {
+            str(c): await drive(url, endpoint, auth, c, args.requests) for c in args.concurrency
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--endpoints", nargs="+", default=["/chat", "/chat/stream"])
+    parser.add_argument("--username", default="Tony")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--scale", type=int, default=0, help="serve a synthetic corpus of N copies of resources/data")
+    parser.add_argument("--response-cache", action="store_true", help="keep the server's response cache enabled")
+    args = parser.parse_args()
+
+    if args.url:
+        results = asyncio.run(run(args, args.url))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            env = {"LLM_BACKEND": "fake"}
+            if not args.response_cache:
+                env["RESPONSE_CACHE_SIZE"] = "0"
+            if args.scale:
+                synthesize(Path(directory) / "data", args.scale)
+                env.update(DATA_DIR=f"{directory}/data", VECTOR_STORE_DIR=f"{directory}/store")
+            with api_server(free_port(), env) as url:
+                results = asyncio.run(run(args, url))
+        results["llm_backend"] = "fake"
+        results["scale"] = args.scale
+        results["response_cache"] = args.response_cache
+    emit("chat_load", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Text chunking: the previous word-count chunker vs TextChunker.
+
+    python -m benchmarks.chunking --scale 100
+
+The markdown / text files under --data-dir are repeated --scale times to
+form the corpus. Legacy timings include counting each chunk's tokens, as
+ingestion did for its metadata. Reports throughput, chunk count, chunk sizes in tokens,
+how many chunks exceed the encoder's input limit (and so are truncated when
+embedded), and the share of tokens that are repeats of the previous chunk.
+"""
+import argparse
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ._common import emit
+
+ENCODER_MAX_TOKENS = 256
+
+
+def legacy_chunk_text(text: str, chunk_size: int = 500, overlap: int = 50):
+    """DocumentProcessor.chunk_text as it was before TextChunker (chunk_size / overlap in words)."""
+    paragraphs = re.split(r'\n{2,}', text)
+    chunks = []
+    current_chunk = []
+    current_len = 0
+    for para in paragraphs:
+        words = para.split()
+        if current_len + len(words) > chunk_size and current_chunk:
+            chunks.append(' '.join(current_chunk))
+            if overlap > 0:
+                current_chunk = current_chunk[-overlap:]
+                current_len = len(current_chunk)
+            else:
+                current_chunk = []
+                current_len = 0
+        current_chunk.extend(words)
+        current_len += len(words)
+    if current_chunk:
+        chunks.append(' '.join(current_chunk))
+    return chunks
+
+
+def load_corpus(data_dir: Path, scale: int):
+    texts = [path.read_text(encoding='utf-8') for path in sorted(data_dir.glob("*/*"))
+             if path.suffix in ('.md', '.txt')]
+    return [text for text in texts for _ in range(scale)]
+
+
+def repeated_share(chunks, count_tokens) -> float:
+    """Tokens of each chunk's longest prefix that ends the previous chunk, over all tokens."""
+    repeated = 0
+    for previous, chunk in zip(chunks, chunks[1:]):
+        words = chunk.split()
+        for n in range(min(len(words), len(previous.split())), 0, -1):
+            prefix = " ".join(words[:n])
+            if previous.endswith(prefix):
+                repeated += count_tokens(prefix)
+                break
+    total = sum(count_tokens(chunk) for chunk in chunks)
+    return round(repeated / total, 4) if total else 0.0
+
+
+def describe(chunks, seconds: float, corpus_bytes: int, count_tokens):
+    tokens = np.array([count_tokens(chunk) for chunk in chunks])
+    return {"seconds": round(seconds, 3),
+            "mb_per_sec": round(corpus_bytes / 1e6 / seconds, 2) if seconds else None,
+            "chunks": len(chunks),
+            "tokens_mean": round(float(tokens.mean()), 1), "tokens_max": int(tokens.max()),
+            "tokens_total": int(tokens.sum()),
+            "over_encoder_limit": int((tokens > ENCODER_MAX_TOKENS).sum()),
+            "repeated_token_share": repeated_share(chunks, count_tokens)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="resources/data")
+    parser.add_argument("--scale", type=int, default=100)
+    args = parser.parse_args()
+
+    from app.services.chunker import TextChunker
+    from app.services.tokens import count_tokens
+
+    texts = load_corpus(Path(args.data_dir), args.scale)
+    corpus_bytes = sum(len(text.encode('utf-8')) for text in texts)
+    count_tokens("warm up the tokenizer")
+
+    start = time.perf_counter()
+    legacy = [chunk for text in texts for chunk in legacy_chunk_text(text)]
+    # Ingestion then counted each chunk's tokens for its metadata; TextChunker's counts come with the chunks
+    for chunk in legacy:
+        count_tokens(chunk)
+    legacy_seconds = time.perf_counter() - start
+
+    chunker = TextChunker()
+    start = time.perf_counter()
+    current = [chunk for text in texts for chunk, _ in chunker.chunks(text.splitlines())]
+    current_seconds = time.perf_counter() - start
+
+    # Token statistics over one copy of the corpus; the scaled copies are identical
+    legacy_one = [chunk for text in texts[::args.scale] for chunk in legacy_chunk_text(text)]
+    current_one = [chunk for text in texts[::args.scale] for chunk, _ in chunker.chunks(text.splitlines())]
+    results = {"files": len(texts), "corpus_mb": round(corpus_bytes / 1e6, 2),
+               "chunk_tokens": chunker.max_tokens, "overlap_tokens": chunker.overlap_tokens,
+               "legacy": describe(legacy_one, legacy_seconds, corpus_bytes, count_tokens),
+               "token_aware": describe(current_one, current_seconds, corpus_bytes, count_tokens)}
+    for name, chunks in (("legacy", legacy), ("token_aware", current)):
+        results[name]["chunks"] = len(chunks)
+        results[name]["tokens_total"] *= args.scale
+    emit("chunking", results)
+
+
+if __name__ == "__main__":
+    main()
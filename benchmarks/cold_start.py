@@ -0,0 +1,82 @@
+"""Cold-start time and resident memory of the vector store as the corpus grows.
+
+    python -m benchmarks.cold_start --chunks 10000 100000 500000
+
+For each size a synthetic store is written once, then a fresh interpreter opens
+it (indices and chunk stores, no encoder) and reads a sample of chunks, so the
+figures reflect what an API worker pays at boot.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from ._common import emit
+
+_CHILD = r"""
+import json, sys, time
+import numpy as np
+from benchmarks._common import rss_breakdown_mb, rss_mb
+directory, dimension = sys.argv[1], int(sys.argv[2])
+before = rss_mb()
+start = time.perf_counter()
+from app.services.vector_store import VectorStore
+store = VectorStore(directory, dimension=dimension)
+store.load_roles()
+open_s = time.perf_counter() - start
+rng = np.random.default_rng(0)
+start = time.perf_counter()
+for role in store.roles:
+    queries = rng.standard_normal((20, dimension), dtype=np.float32)
+    for query in queries:
+        store.search_roles([role], "", n_results=10, query_embedding=query[None, :])
+search_ms = (time.perf_counter() - start) * 1000 / (20 * len(store.roles))
+print(json.dumps({"open_s": round(open_s, 3), "search_ms": round(search_ms, 3),
+                  "rss_mb": round(rss_mb(), 1), "rss_delta_mb": round(rss_mb() - before, 1), **rss_breakdown_mb()}))
+"""
+
+
+def build(directory: str, chunks: int, dimension: int, words: int):
+    from app.services.vector_store import VectorStore
+
+    store = VectorStore(directory, dimension=dimension)
+    rng = np.random.default_rng(0)
+    vocabulary = np.array([f"term{i}" for i in range(5000)])
+    per_role = chunks // len(store.roles)
+    for role in store.roles:
+        for start in range(0, per_role, 10_000):
+            n = min(10_000, per_role - start)
+            vectors = rng.standard_normal((n, dimension), dtype=np.float32)
+            ids = [f"synthetic/{role}.md::chunk_{i}" for i in range(start, start + n)]
+            texts = [" ".join(vocabulary[rng.integers(0, len(vocabulary), words)]) for _ in range(n)]
+            metadatas = [{"source": f"synthetic/{role}.md", "role": role, "chunk_index": i}
+                         for i in range(start, start + n)]
+            store.add_embeddings(role, vectors, texts, metadatas, ids, save=False)
+    store.save(store.roles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--words", type=int, default=300, help="words per synthetic chunk")
+    args = parser.parse_args()
+
+    results = {"dimension": args.dimension, "words_per_chunk": args.words}
+    for chunks in args.chunks:
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            build(directory, chunks, args.dimension, args.words)
+            build_s = round(time.perf_counter() - start, 2)
+            child = subprocess.run([sys.executable, "-c", _CHILD, directory, str(args.dimension)],
+                                   capture_output=True, text=True, check=True)
+            results[str(chunks)] = {"build_s": build_s, **json.loads(child.stdout.strip().splitlines()[-1])}
+    emit("cold_start", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Prompt packing cost: the previous re-tokenize-and-trim loop vs ContextPacker.
+
+    python -m benchmarks.context_packing --candidates 10 50 200
+
+Candidates are ~500-word chunks cut from resources/data; ContextPacker gets the
+token_count that ingestion stores with each chunk.
+"""
+import argparse
+import time
+from pathlib import Path
+
+from ._common import emit
+
+
+def legacy_pack(query, context, count_tokens, max_tokens):
+    """generate_response's packing before ContextPacker, kept for comparison."""
+    context_str = ""
+    total_tokens = 0
+    for doc in context:
+        doc_str = f"Source: {doc['metadata']['source']} (chunk {doc['metadata'].get('chunk_index', 0)})\nContent: {doc['document']}\n\n"
+        doc_tokens = count_tokens(doc_str)
+        if total_tokens + doc_tokens > max_tokens:
+            break
+        context_str += doc_str
+        total_tokens += doc_tokens
+    template = "You are an AI assistant for FinSolve Technologies. You have access to the following context:\n\n{}\nUser Query: {}\n\nPlease provide a helpful response based on the context above. If the context doesn't contain relevant information, please say so. Cite the source file(s) and chunk(s) you used."
+    prompt = template.format(context_str, query)
+    while count_tokens(prompt) > max_tokens and '\n\n' in context_str:
+        context_str = '\n\n'.join(context_str.strip().split('\n\n')[:-1]) + '\n\n'
+        prompt = template.format(context_str, query)
+    return prompt
+
+
+def corpus_chunks(words_per_chunk: int):
+    words = []
+    for path in sorted(Path("resources/data").glob("**/*.md")):
+        words.extend(path.read_text(encoding="utf-8").split())
+    return [" ".join(words[i:i + words_per_chunk]) for i in range(0, len(words), words_per_chunk)]
+
+
+def timed_ms(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return round((time.perf_counter() - start) * 1000 / repeat, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--budget", type=int, default=3500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from app.services.chat_service import SYSTEM_PROMPT, PROMPT_TEMPLATE
+    from app.services.context_packer import ContextPacker
+    from app.services.tokens import count_tokens
+
+    texts = corpus_chunks(500)
+    query = "What were the key marketing results and financial figures in 2024?"
+    results = {"budget": args.budget}
+    for n in args.candidates:
+        candidates = [{"document": texts[i % len(texts)],
+                       "metadata": {"source": f"doc{i % 7}.md", "chunk_index": i,
+                                    "token_count": count_tokens(texts[i % len(texts)])},
+                       "score": 1.0 - i / n}
+                      for i in range(n)]
+        entry = {"legacy_ms": timed_ms(lambda: legacy_pack(query, candidates, count_tokens, args.budget), args.repeat)}
+        for strategy in ("greedy", "mmr"):
+            packer = ContextPacker(args.budget, SYSTEM_PROMPT, PROMPT_TEMPLATE, strategy=strategy)
+            entry[f"{strategy}_ms"] = timed_ms(lambda: packer.pack(query, candidates), args.repeat)
+            prompt, used, estimate = packer.pack(query, candidates)
+            entry[f"{strategy}_chunks"] = len(used)
+            entry[f"{strategy}_prompt_tokens"] = count_tokens(SYSTEM_PROMPT) + count_tokens(prompt)
+            entry[f"{strategy}_estimated_tokens"] = estimate
+        results[str(n)] = entry
+    emit("context_packing", results)
+
+
+if __name__ == "__main__":
+    main()
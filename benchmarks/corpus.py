@@ -0,0 +1,109 @@
+"""Synthetic multi-role corpus built from resources/data, at any scale.
+
+    python -m benchmarks.corpus --out /tmp/finsolve-corpus --scale 1000
+
+Every source file is written ``--scale`` times under the same role directory.
+Each copy has its numbers perturbed and employee ids renumbered, so no two
+copies hash or chunk identically. Each markdown copy also carries one planted
+fact: a made-up programme name with a unique reference code, placed in a
+random section. ``facts.jsonl`` at the top of the output lists
+(role, query, marker) for every fact. A retrieval hit is a result whose text
+contains the marker, which gives recall@k without labelling chunks. At the
+default chunk size one copy of resources/data is about 85 chunks, so
+``--scale 12000`` is about a million.
+"""
+import argparse
+import json
+import random
+import re
+from pathlib import Path
+from typing import Dict, List
+
+SYLLABLES = ["ka", "lo", "ver", "min", "tas", "quo", "ri", "zen", "pal", "dro", "fi", "nex", "su", "bar", "tel"]
+_NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w])")
+_EMPLOYEE_ID = re.compile(r"FINEMP(\d+)")
+
+
+def programme_name(rng: random.Random, serial: int) -> str:
+    """A made-up single word, unique by its serial number spelled in letters (0 -> 'a', 26 -> 'ba')."""
+    suffix = ""
+    while True:
+        serial, digit = divmod(serial, 26)
+        suffix = chr(ord("a") + digit) + suffix
+        if not serial:
+            break
+    return ("".join(rng.choice(SYLLABLES) for _ in range(2)) + suffix).capitalize()
+
+
+def perturb_numbers(text: str, copy: int) -> str:
+    """Scale every number by a per-copy factor, keeping its number of decimals."""
+    if copy == 0:
+        return text
+    factor = 1 + (copy % 97) / 100
+
+    def scaled(match):
+        value = match.group(0)
+        decimals = len(value.split(".")[1]) if "." in value else 0
+        return f"{float(value) * factor:.{decimals}f}"
+
+    return _NUMBER.sub(scaled, text)
+
+
+def plant_fact(text: str, rng: random.Random, name: str, marker: str) -> str:
+    """Append the fact sentence to a random paragraph of the text."""
+    paragraphs = text.split("\n\n")
+    candidates = [i for i, p in enumerate(paragraphs) if p.strip() and p.lstrip()[0].isalpha()] or [0]
+    i = rng.choice(candidates)
+    paragraphs[i] = paragraphs[i].rstrip() + f" The {name} programme is tracked under reference {marker}."
+    return "\n\n".join(paragraphs)
+
+
+def synthesize(out_dir: Path, scale: int, source_dir: Path = Path("resources/data"), seed: int = 0) -> Dict:
+    """Write the corpus and facts.jsonl under out_dir; returns file, byte and fact counts."""
+    out_dir = Path(out_dir)
+    rng = random.Random(seed)
+    sources = sorted(path for path in Path(source_dir).glob("*/*") if path.suffix in ('.md', '.txt', '.csv'))
+    texts = {path: path.read_text(encoding='utf-8') for path in sources}
+    facts: List[Dict] = []
+    files = size = 0
+    for copy in range(scale):
+        for path, text in texts.items():
+            role = path.parent.name
+            target = out_dir / role / f"{path.stem}_{copy:06d}{path.suffix}"
+            if path.suffix == '.csv':
+                offset = copy * 1_000_000
+                text = _EMPLOYEE_ID.sub(lambda m: f"FINEMP{int(m.group(1)) + offset}", text)
+            else:
+                text = perturb_numbers(text, copy)
+                name = programme_name(rng, len(facts))
+                marker = f"REF-{rng.getrandbits(40):010X}"
+                text = plant_fact(text, rng, name, marker)
+                facts.append({"role": role, "query": f"Which reference is the {name} programme tracked under?",
+                              "marker": marker, "source": target.as_posix()})
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(text, encoding='utf-8')
+            files += 1
+            size += len(text.encode('utf-8'))
+    with open(out_dir / "facts.jsonl", "w", encoding='utf-8') as f:
+        for fact in facts:
+            f.write(json.dumps(fact) + "\n")
+    return {"files": files, "bytes": size, "facts": len(facts)}
+
+
+def load_facts(out_dir: Path) -> List[Dict]:
+    with open(Path(out_dir) / "facts.jsonl", encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--scale", type=int, default=100, help="copies of every source file")
+    parser.add_argument("--source-dir", default="resources/data")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(synthesize(Path(args.out), args.scale, Path(args.source_dir), args.seed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Encoder backends compared: torch vs ONNX Runtime vs int8-quantized ONNX.
+
+    python -m benchmarks.encoder_backends
+    python -m benchmarks.encoder_backends --backends torch onnx-int8 --texts 512
+
+Each backend runs in a fresh interpreter, so imports and memory are its own.
+Reports per backend:
+
+- import_s: importing the backend's libraries (torch + sentence-transformers, or onnxruntime + tokenizers)
+- load_s: building the encoder (int8 includes the one-off quantization unless already cached)
+- rss_mb: resident memory after loading and encoding
+- encode_per_sec: chunks/sec embedding document paragraphs in batches of --batch-size
+- query_ms: median latency of embedding one short query
+- parity vs the first backend: min / mean cosine of the same texts' embeddings,
+  the check VectorStore runs against EMBEDDING_PARITY_MIN_COSINE
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from ._common import emit
+
+_CHILD = r"""
+import importlib, json, sys, time
+import numpy as np
+from benchmarks._common import rss_mb
+backend, texts_path, out_path, batch_size = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+libraries = ["sentence_transformers"] if backend == "torch" else ["onnxruntime", "tokenizers"]
+before = rss_mb()
+start = time.perf_counter()
+for library in libraries:
+    importlib.import_module(library)
+import_s = time.perf_counter() - start
+from app.services.embeddings import get_encoder
+start = time.perf_counter()
+encoder = get_encoder(backend=backend)
+load_s = time.perf_counter() - start
+texts = json.load(open(texts_path))
+encoder.encode(texts[:batch_size], batch_size=batch_size)
+start = time.perf_counter()
+vectors = encoder.encode(texts, batch_size=batch_size)
+encode_s = time.perf_counter() - start
+timings = []
+for i in range(50):
+    start = time.perf_counter()
+    encoder.encode([f"What is the leave policy for team {i}?"])
+    timings.append((time.perf_counter() - start) * 1000)
+np.save(out_path, np.asarray(vectors, dtype=np.float32))
+print(json.dumps({"import_s": round(import_s, 3), "load_s": round(load_s, 3),
+                  "rss_mb": round(rss_mb(), 1), "rss_delta_mb": round(rss_mb() - before, 1),
+                  "encode_per_sec": round(len(texts) / encode_s, 1),
+                  "query_ms": round(float(np.median(timings)), 3)}))
+"""
+
+
+def paragraphs(data_dir: Path, count: int):
+    texts = [p.strip() for path in sorted(data_dir.glob("*/*.md"))
+             for p in path.read_text(encoding='utf-8').split("\n\n") if len(p.split()) >= 8]
+    return [texts[i % len(texts)] for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--data-dir", default="resources/data")
+    parser.add_argument("--texts", type=int, default=1024)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    results = {"texts": args.texts, "batch_size": args.batch_size, "model": os.getenv("EMBEDDING_MODEL", "default")}
+    with tempfile.TemporaryDirectory() as directory:
+        texts_path = Path(directory) / "texts.json"
+        texts_path.write_text(json.dumps(paragraphs(Path(args.data_dir), args.texts)), encoding='utf-8')
+        reference = None
+        for backend in args.backends:
+            out_path = Path(directory) / f"{backend}.npy"
+            child = subprocess.run([sys.executable, "-c", _CHILD, backend, str(texts_path), str(out_path),
+                                    str(args.batch_size)], capture_output=True, text=True)
+            if child.returncode != 0:
+                results[backend] = {"error": (child.stderr.strip().splitlines() or ["failed"])[-1]}
+                continue
+            results[backend] = json.loads(child.stdout.strip().splitlines()[-1])
+            vectors = np.load(out_path)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            if reference is None:
+                reference = (backend, vectors)
+            else:
+                cosines = np.sum(reference[1] * vectors, axis=1)
+                results[backend][f"parity_vs_{reference[0]}"] = {"min_cosine": round(float(cosines.min()), 5),
+                                                                 "mean_cosine": round(float(cosines.mean()), 5)}
+    emit("encoder_backends", results)
+
+
+if __name__ == "__main__":
+    main()
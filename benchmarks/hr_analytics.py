@@ -0,0 +1,113 @@
+"""Aggregate, threshold and top-N HR questions: pandas per question vs HRAnalytics.
+
+    python -m benchmarks.hr_analytics --rows 1000000 --repeats 20
+
+A synthetic hr_data.csv-shaped table is generated (see benchmarks.hr_query).
+The baseline answers each question the straightforward way, with a pandas
+filter / groupby / nlargest over the DataFrame. HRAnalytics answers from the
+group summaries precomputed at load, or one vectorized pass over its typed
+columns. Reports the one-off build time, per-intent p50 / p99 latency of both
+and whether every number the baseline computed appears in the answer. Then --append
+percent more rows are added the way HRTable does for an appended CSV,
+extended() vs rebuilding from the whole table, for HRAnalytics and for the
+HRIndex behind the lookups, and the results are compared.
+"""
+import argparse
+import re
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from ._common import emit, rss_mb
+from .hr_query import latency, synthetic_hr
+
+_NUMBER = re.compile(r"(?<![\w.])-?\d[\d,]*(?:\.\d+)?")
+
+
+def questions(df: pd.DataFrame):
+    """intent -> (question, the numbers its answer should contain, computed with pandas)."""
+    location = df["location"].iloc[0]
+    return {
+        "mean_by_department": ("Average salary by department",
+                               lambda: df.groupby("department", sort=False)["salary"].agg(["mean", "size"])),
+        "headcount_by_location": ("Headcount per location", lambda: df.groupby("location", sort=False).size()),
+        "filtered_sum": (f"Total salary in {location}",
+                         lambda: df.loc[df["location"] == location, "salary"].agg(["sum", "size"])),
+        "two_filters": (f"Average attendance of data scientists in {location}",
+                        lambda: df.loc[(df["role"] == "Data Scientist") & (df["location"] == location),
+                                       "attendance_pct"].agg(["mean", "size"])),
+        "threshold_count": ("How many employees have performance rating above 4",
+                            lambda: pd.Series([int((df["performance_rating"] > 4).sum())])),
+        "top_n": ("Top 10 salaries",
+                  lambda: df.nlargest(10, "salary", keep="first")[["employee_id", "salary"]]),
+    }
+
+
+def numbers(value) -> list:
+    """The numbers in an answer, or in a pandas result, rounded the way answers are."""
+    if isinstance(value, str):
+        found = [float(n.replace(",", "")) for n in _NUMBER.findall(re.sub(r"FINEMP(\d+)", r"\1", value))]
+    else:
+        frame = value.to_frame() if isinstance(value, pd.Series) else value
+        found = [float(str(v).replace("FINEMP", "")) for v in frame.to_numpy().ravel()]
+    return [round(n, 2) for n in found]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--append", type=float, default=1.0, help="percent of rows appended for the refresh")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.services.hr_analytics import HRAnalytics
+    from app.services.hr_query import HRIndex
+
+    df = synthetic_hr(args.rows, args.seed)
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    analytics = HRAnalytics(df)
+    build_seconds = time.perf_counter() - start
+
+    intents = {}
+    for intent, (question, baseline) in questions(df).items():
+        expected, old = latency(lambda _: baseline(), question, args.repeats)
+        answer, new = latency(analytics.answer, question, args.repeats)
+        intents[intent] = {"pandas": old, "analytics": new,
+                           "same_answer": answer is not None and not Counter(numbers(expected)) - Counter(numbers(answer)),
+                           "speedup": round(old["p50_ms"] / new["p50_ms"], 1) if new["p50_ms"] else None}
+
+    appended = max(1, int(args.rows * args.append / 100))
+    base, rows = df.iloc[:-appended], df.iloc[-appended:]
+    analytics = HRAnalytics(base)
+    start = time.perf_counter()
+    extended = analytics.extended(rows)
+    extend_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    rebuilt = HRAnalytics(df)
+    rebuild_seconds = time.perf_counter() - start
+    same = all(extended.answer(question) == rebuilt.answer(question) for question, _ in questions(df).values())
+    index = HRIndex(base)
+    start = time.perf_counter()
+    index_extended = index.extended(rows)
+    index_extend_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    index_rebuilt = HRIndex(df)
+    index_rebuild_seconds = time.perf_counter() - start
+    same = same and index_extended.by_id == index_rebuilt.by_id and index_extended.distinct == index_rebuilt.distinct
+
+    emit("hr_analytics", {"rows": args.rows, "build_seconds": round(build_seconds, 3),
+                          "rss_mb": round(rss_mb() - rss_before, 1), "intents": intents,
+                          "append": {"rows": appended, "extend_seconds": round(extend_seconds, 3),
+                                     "rebuild_seconds": round(rebuild_seconds, 3),
+                                     "speedup": round(rebuild_seconds / extend_seconds, 1) if extend_seconds else None,
+                                     "index_extend_seconds": round(index_extend_seconds, 3),
+                                     "index_rebuild_seconds": round(index_rebuild_seconds, 3),
+                                     "same_answers": same}})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Structured HR lookups: the previous regex + pandas-scan cascade vs HRQueryEngine.
+
+    python -m benchmarks.hr_query --rows 100000 --repeats 20
+
+A synthetic hr_data.csv-shaped table is generated, so no data files are read.
+Reports the one-off index build time and per-intent p50 / p99 latency of
+both implementations, and whether their answers agree. They are expected to
+differ for location queries, which the old cascade could never reach, and for
+employee ids past FINEMP9999, which its four-digit pattern truncated.
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from ._common import emit, rss_mb
+
+FIRST = ["Aadhya", "Isha", "Sakshi", "Krishna", "Shaurya", "Sara", "Prisha", "Sai", "Vihaan", "Arjun", "Avni",
+         "Diya", "Reyansh", "Ishaan", "Ananya", "Vivaan", "Kabir", "Meera", "Rohan", "Tara"]
+LAST = ["Patel", "Chowdhury", "Malhotra", "Saxena", "Joshi", "Sharma", "Mehta", "Gupta", "Desai", "Verma",
+        "Chopra", "Singh", "Banerjee", "Reddy", "Bhat", "Iyer", "Nair", "Kapoor"]
+ROLES = ["Sales Manager", "Credit Officer", "Business Analyst", "Marketing Manager", "QA Engineer",
+         "Operations Manager", "HR Manager", "Software Engineer", "Compliance Officer", "Data Scientist",
+         "Risk Analyst", "Product Manager", "UX Designer"]
+DEPARTMENTS = ["Sales", "Finance", "Business", "Marketing", "Quality Assurance", "Operations", "HR", "Technology",
+               "Compliance", "Data", "Risk", "Product", "Design"]
+LOCATIONS = ["Ahmedabad", "Pune", "Mumbai", "Delhi", "Bangalore", "Chennai", "Hyderabad", "Kolkata"]
+
+
+def synthetic_hr(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ids = np.array([f"FINEMP{1000 + i}" for i in range(rows)])
+    first, last = rng.choice(FIRST, rows), rng.choice(LAST, rows)
+    # Unique surnames for a few rows so name lookups have a single answer
+    names = np.char.add(np.char.add(first, " "), last).astype(object)
+    names[::997] = [f"{f} Q{i}" for i, f in enumerate(first[::997])]
+    role_ix = rng.integers(0, len(ROLES), rows)
+    return pd.DataFrame({
+        "employee_id": ids,
+        "full_name": names,
+        "role": np.array(ROLES)[role_ix],
+        "department": np.array(DEPARTMENTS)[role_ix],
+        "email": [f"emp{i}@fintechco.com" for i in range(rows)],
+        "location": rng.choice(LOCATIONS, rows),
+        "date_of_birth": "1990-01-01",
+        "date_of_joining": "2020-01-01",
+        "manager_id": ids[rng.integers(0, max(1, rows // 50), rows)],
+        "salary": rng.uniform(3e5, 3e6, rows).round(2),
+        "leave_balance": rng.integers(0, 30, rows),
+        "leaves_taken": rng.integers(0, 30, rows),
+        "attendance_pct": rng.uniform(70, 100, rows).round(2),
+        "performance_rating": rng.integers(1, 6, rows),
+        "last_review_date": "2024-01-01",
+    })
+
+
+def legacy_answer(df: pd.DataFrame, query: str):
+    """ChatService.answer_hr_query as it was before HRQueryEngine."""
+    q = query.lower()
+    details = ("Employee ID: {employee_id}\nFull Name: {full_name}\nRole: {role}\nDepartment: {department}\n"
+               "Email: {email}\nLocation: {location}\nDate of Birth: {date_of_birth}\n"
+               "Date of Joining: {date_of_joining}\nManager ID: {manager_id}\nSalary: {salary}\n"
+               "Leave Balance: {leave_balance}\nLeaves Taken: {leaves_taken}\nAttendance %: {attendance_pct}\n"
+               "Performance Rating: {performance_rating}\nLast Review Date: {last_review_date}")
+    if re.search(r'(all )?employee id(s)?', q):
+        return 'Employee IDs:\n' + '\n'.join(df['employee_id'].drop_duplicates().tolist())
+    if re.search(r'(all )?role(s)?( available)?', q):
+        return 'Roles:\n' + '\n'.join(df['role'].drop_duplicates().tolist())
+    if re.search(r'(all )?department(s)?', q):
+        return 'Departments:\n' + '\n'.join(df['department'].drop_duplicates().tolist())
+    match = re.search(r'(?:employees? who (?:are|is)|employees? with|name (?:the )?employees? (?:who )?(?:are|is|with)?|'
+                      r'list (?:the )?employees? (?:who )?(?:are|is|with)?) ([\w\s]+)', q)
+    if match:
+        role_query = match.group(1).strip().lower()
+        names = df.loc[df['role'].str.lower().str.contains(role_query), 'full_name'].drop_duplicates().tolist()
+        if names:
+            return f"Employees with role '{role_query}':\n" + '\n'.join(names)
+        return f"No employees found with role '{role_query}'."
+    match = re.search(r'(?:employees? in|list employees? in|show employees? in|who works in) ([\w\s]+)', q)
+    if match:
+        dept_query = match.group(1).strip().lower()
+        names = df.loc[df['department'].str.lower().str.contains(dept_query), 'full_name'].drop_duplicates().tolist()
+        if names:
+            return f"Employees in department '{dept_query}':\n" + '\n'.join(names)
+        return f"No employees found in department '{dept_query}'."
+    match = re.search(r'(?:manager of|who manages|who is the manager of) ([\w\s]+)', q)
+    if match:
+        emp_query = match.group(1).strip().lower()
+        row = df[df['full_name'].str.lower().str.contains(emp_query)]
+        if row.empty:
+            return f"No employee found with name '{emp_query}'."
+        manager_id = row.iloc[0]['manager_id']
+        manager_row = df[df['employee_id'] == manager_id]
+        if not manager_row.empty:
+            return f"Manager of {row.iloc[0]['full_name']}: {manager_row.iloc[0]['full_name']} (ID: {manager_id})"
+        return f"Manager ID for {row.iloc[0]['full_name']}: {manager_id} (not found in data)"
+    match = re.search(r'finemp\d{4}', q)
+    if match:
+        row = df[df['employee_id'] == match.group(0).upper()]
+        if not row.empty:
+            return details.format(**row.iloc[0].to_dict())
+    match = re.search(r'(?:details for|show details for|info for|information for|find) ([\w\s]+)', q)
+    if match:
+        row = df[df['full_name'].str.lower().str.contains(match.group(1).strip().lower())]
+        if not row.empty:
+            return details.format(**row.iloc[0].to_dict())
+    if re.search(r'(all )?employees?$', q) or re.search(r'list (all )?employees?', q):
+        return 'All Employees:\n' + '\n'.join(df['full_name'].drop_duplicates().tolist())
+    return None
+
+
+def queries(df: pd.DataFrame):
+    unique_name = df['full_name'].iloc[997]
+    last_id = df['employee_id'].iloc[-1]
+    return {
+        "employee_id": f"Show the record of {last_id}",
+        "name": f"Show details for {unique_name}",
+        "manager": f"Who is the manager of {unique_name}?",
+        "role": "List employees with credit officer",
+        "department": "Employees in quality assurance",
+        "location": "Employees in Pune",
+        "no_intent": "What is the leave policy?",
+    }
+
+
+def latency(fn, query: str, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        answer = fn(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings = np.array(timings)
+    return answer, {"p50_ms": round(float(np.percentile(timings, 50)), 3),
+                    "p99_ms": round(float(np.percentile(timings, 99)), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.services.hr_query import HRIndex, HRQueryEngine
+
+    df = synthetic_hr(args.rows, args.seed)
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    engine = HRQueryEngine(HRIndex(df))
+    build_seconds = time.perf_counter() - start
+
+    results = {}
+    for intent, query in queries(df).items():
+        old_answer, old = latency(lambda q: legacy_answer(df, q), query, args.repeats)
+        new_answer, new = latency(engine.answer, query, args.repeats)
+        results[intent] = {"legacy": old, "indexed": new, "same_answer": old_answer == new_answer,
+                           "speedup": round(old["p50_ms"] / new["p50_ms"], 1) if new["p50_ms"] else None}
+    emit("hr_query", {"rows": args.rows, "index_build_seconds": round(build_seconds, 3),
+                      "index_rss_mb": round(rss_mb() - rss_before, 1), "intents": results})
+
+
+if __name__ == "__main__":
+    main()
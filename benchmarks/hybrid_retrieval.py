@@ -0,0 +1,91 @@
+"""Dense vs BM25 vs hybrid (reciprocal-rank fusion) retrieval on the document corpus.
+
+    python -m benchmarks.hybrid_retrieval --k 4 --queries 200
+
+The corpus under --data-dir is indexed into a temporary store. Each query is
+a known-item lookup built from the rarest words of one chunk (identifiers,
+quarter names, product names, ...), and a hit means that chunk is in the top
+k results. Reports hit rate, MRR and search latency for each mode at the
+same k, so no extra context reaches the LLM.
+"""
+import argparse
+import random
+import re
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+from ._common import emit
+
+WORD = re.compile(r"\w+")
+
+
+def known_item_queries(items, count: int, terms: int, seed: int):
+    """(query, target id) pairs: each target chunk's rarest words, in their order of appearance."""
+    df = Counter(word for _, document, _ in items for word in set(WORD.findall(document.lower())))
+    rng = random.Random(seed)
+    sample = rng.sample(items, min(count, len(items)))
+    queries = []
+    for _, document, metadata in sample:
+        words = list(dict.fromkeys(w for w in WORD.findall(document.lower()) if len(w) > 2))
+        rarest = sorted(words, key=lambda w: df[w])[:terms]
+        queries.append((" ".join(w for w in words if w in rarest), (metadata["source"], metadata["chunk_index"])))
+    return queries
+
+
+def evaluate(search, queries, k: int):
+    hits, reciprocal, timings = 0, 0.0, []
+    for query, target in queries:
+        start = time.perf_counter()
+        results = search(query, k)
+        timings.append((time.perf_counter() - start) * 1000)
+        found = [(r["metadata"]["source"], r["metadata"]["chunk_index"]) for r in results]
+        if target in found:
+            hits += 1
+            reciprocal += 1.0 / (found.index(target) + 1)
+    timings = np.array(timings)
+    return {"hit_rate": round(hits / len(queries), 4), "mrr": round(reciprocal / len(queries), 4),
+            "p50_ms": round(float(np.percentile(timings, 50)), 3),
+            "p99_ms": round(float(np.percentile(timings, 99)), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="resources/data")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--terms", type=int, default=3, help="rare words per query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.services.access_policy import AccessPolicy
+    from app.services.document_processor import DocumentProcessor
+    from app.services.vector_store import VectorStore
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = VectorStore(directory)
+        # A policy role that sees every collection, so each query can find its chunk
+        policy = AccessPolicy({"benchmark": list(store.roles)}, collections=store.roles)
+        processor = DocumentProcessor(args.data_dir, vector_store=store, access_policy=policy)
+        processor.load_documents()
+        items = [item for role in store.roles for item in store.chunks[role].items()]
+        queries = known_item_queries(items, args.queries, args.terms, args.seed)
+        store.encoder.encode(["warm up"])
+
+        def dense_or_hybrid(mode):
+            def search(query, k):
+                processor.retrieval_mode = mode
+                return processor.get_relevant_documents('benchmark', query, n_results=k)
+            return search
+
+        results = {"chunks": len(items), "queries": len(queries), "k": args.k,
+                   "dense": evaluate(dense_or_hybrid("dense"), queries, args.k),
+                   "bm25": evaluate(lambda q, k: store.lexical_search_roles(store.roles, q, k), queries, args.k),
+                   "hybrid": evaluate(dense_or_hybrid("hybrid"), queries, args.k)}
+    emit("hybrid_retrieval", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Query latency while the corpus is reloaded, and reload time against the number of changed files.
+
+    python -m benchmarks.live_reload --scale 20 --changed 1 10 100
+    python -m benchmarks.live_reload --encoder hashing --scale 200
+
+A synthetic corpus (see benchmarks.corpus) is indexed, then --threads threads
+run hybrid retrieval against it non-stop, with precomputed query embeddings
+so they measure the index rather than the encoder. Meanwhile, for each
+--changed count, that many markdown files are edited and
+CorpusReloader.reload() indexes them and publishes the new snapshots. Reports
+each reload's time and stats, the query p50 / p99 while idle and during each
+reload, and failed or empty searches (where a torn read would show up). The
+time to index the whole corpus is included for comparison.
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ._common import HashingEncoder, emit
+from .corpus import load_facts, synthesize
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {"queries": 0}
+    latencies = np.array(latencies) * 1000
+    return {"queries": len(latencies), "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=20, help="copies of resources/data")
+    parser.add_argument("--source-dir", default="resources/data")
+    parser.add_argument("--encoder", choices=["model", "hashing"], default="model")
+    parser.add_argument("--changed", type=int, nargs="+", default=[1, 10, 100], help="files edited per reload")
+    parser.add_argument("--threads", type=int, default=4, help="concurrent searching threads")
+    parser.add_argument("--idle-seconds", type=float, default=3)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.services.document_processor import DocumentProcessor
+    from app.services.reloader import CorpusReloader
+    from app.services.vector_store import VectorStore
+
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir, store_dir = Path(directory) / "data", Path(directory) / "store"
+        corpus = synthesize(data_dir, args.scale, Path(args.source_dir), args.seed)
+        store = VectorStore(store_dir, encoder=HashingEncoder() if args.encoder == "hashing" else None)
+        processor = DocumentProcessor(data_dir, vector_store=store)
+        reloader = CorpusReloader(processor)
+        full = reloader.reload()
+
+        facts = load_facts(data_dir)
+        embeddings = store.encoder.encode([fact["query"] for fact in facts])
+        samples, failures = [], []  # (finish time, latency), (time, error)
+        stopping = threading.Event()
+
+        def search(worker: int):
+            rng = random.Random(worker)
+            while not stopping.is_set():
+                i = rng.randrange(len(facts))
+                start = time.perf_counter()
+                try:
+                    results = processor.get_relevant_documents(facts[i]["role"], facts[i]["query"], args.k,
+                                                               query_embedding=embeddings[i:i + 1])
+                    if not results:
+                        failures.append((start, "no results"))
+                except Exception as e:
+                    failures.append((start, repr(e)))
+                end = time.perf_counter()
+                samples.append((end, end - start))
+
+        def window(start: float, end: float):
+            return {**percentiles([latency for finished, latency in list(samples) if start <= finished <= end]),
+                    "failed": sum(1 for at, _ in list(failures) if start <= at <= end)}
+
+        threads = [threading.Thread(target=search, args=(i,), daemon=True) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        start = time.perf_counter()
+        time.sleep(args.idle_seconds)
+        results = {"scale": args.scale, "encoder": args.encoder, "threads": args.threads,
+                   "files": full["added"], "chunks": full["chunks"], "full_index_s": full["seconds"],
+                   "idle": window(start, time.perf_counter()), "reloads": {}}
+
+        markdown = sorted(data_dir.glob("*/**/*.md"))
+        rng = random.Random(args.seed)
+        for serial, changed in enumerate(args.changed):
+            for path in rng.sample(markdown, min(changed, len(markdown))):
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(f"\n\nRevision {serial}: figures in this document were restated.\n")
+            start = time.perf_counter()
+            stats = reloader.reload()
+            end = time.perf_counter()
+            results["reloads"][str(changed)] = {
+                "reload_s": round(end - start, 3), "updated": stats["updated"], "unchanged": stats["unchanged"],
+                "chunks": stats["chunks"], "embed_s": stats["embed_seconds"], "during": window(start, end)}
+        stopping.set()
+        for thread in threads:
+            thread.join()
+        results["errors"] = sorted({error for _, error in failures})[:5]
+        results["corpus_mb"] = round(corpus["bytes"] / 1e6, 1)
+    emit("live_reload", results)
+
+
+if __name__ == "__main__":
+    main()
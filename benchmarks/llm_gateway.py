@@ -0,0 +1,117 @@
+"""A burst of LLM calls against a rate-limited provider, direct vs through the LLMGateway.
+
+    python -m benchmarks.llm_gateway --requests 256 --provider-in-flight 8
+    python -m benchmarks.llm_gateway --duplicates 0.5 --stream
+
+The provider is the fake LLM with ProviderLimits: beyond --provider-in-flight
+concurrent requests (and --provider-tpm tokens per minute, if set) it answers
+429 with Retry-After, as Groq does. --requests calls start at once; a
+--duplicates fraction of them repeats one popular prompt, as after a
+company-wide announcement. Modes:
+
+- direct: ``async_client.chat.completions.create`` per request, the path before the gateway
+- gateway: LLMGateway with --gateway-in-flight slots, single-flight and retries
+
+Reports failed calls, calls that reached the provider, 429s it returned,
+retries, coalesced calls, p50 / p99 latency and the longest queue wait.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from ._common import emit
+
+
+def prompts(requests: int, duplicates: float, seed: int):
+    """One conversation per request; a duplicates fraction of them is the same popular question."""
+    rng = random.Random(seed)
+    popular = "What did the announcement say about the office move?"
+    return [[{"role": "user", "content": popular if rng.random() < duplicates else f"Summarize report {i}."}]
+            for i in range(requests)]
+
+
+async def burst(call, conversations, params):
+    latencies, errors = [], []
+
+    async def one(messages):
+        start = time.perf_counter()
+        try:
+            await call(messages=messages, **params)
+        except Exception as e:
+            errors.append(type(e).__name__)
+            return
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(messages) for messages in conversations])
+    wall = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {"ok": len(conversations) - len(errors), "failed": len(errors), "errors": sorted(set(errors)),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 1), "wall_s": round(wall, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--duplicates", type=float, default=0.25, help="fraction of requests for one popular prompt")
+    parser.add_argument("--provider-in-flight", type=int, default=8, help="concurrent requests the provider accepts")
+    parser.add_argument("--provider-tpm", type=int, default=0, help="tokens per minute the provider accepts")
+    parser.add_argument("--gateway-in-flight", type=int, default=8)
+    parser.add_argument("--gateway-tpm", type=int, default=0)
+    parser.add_argument("--ttft-ms", type=float, default=100)
+    parser.add_argument("--token-ms", type=float, default=2)
+    parser.add_argument("--tokens", type=int, default=32, help="completion tokens per answer")
+    parser.add_argument("--stream", action="store_true", help="stream the answers")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.services.fake_llm import AsyncFakeGroq, FakeGroq, ProviderLimits
+    from app.services.llm_gateway import LLMGateway
+
+    conversations = prompts(args.requests, args.duplicates, args.seed)
+    params = {"model": "fake", "temperature": 0.7, "max_tokens": args.tokens}
+
+    def provider():
+        limits = ProviderLimits(args.provider_in_flight, args.provider_tpm)
+        return (FakeGroq(args.ttft_ms, args.token_ms, limits=limits),
+                AsyncFakeGroq(args.ttft_ms, args.token_ms, limits=limits), limits)
+
+    results = {"requests": args.requests, "duplicates": args.duplicates, "stream": args.stream,
+               "provider_in_flight": args.provider_in_flight, "provider_tpm": args.provider_tpm}
+
+    _, async_client, limits = provider()
+
+    async def direct(**request):
+        if args.stream:
+            async for _ in await async_client.chat.completions.create(**request, stream=True):
+                pass
+        else:
+            await async_client.chat.completions.create(**request)
+
+    results["direct"] = {**asyncio.run(burst(direct, conversations, params)),
+                         "provider_calls": limits.calls + limits.rejected, "provider_429s": limits.rejected}
+
+    client, async_client, limits = provider()
+    gateway = LLMGateway(client, async_client, max_in_flight=args.gateway_in_flight,
+                         tokens_per_minute=args.gateway_tpm)
+
+    async def through_gateway(**request):
+        if args.stream:
+            async for _ in gateway.astream(**request):
+                pass
+        else:
+            await gateway.acomplete(**request)
+
+    results["gateway"] = {**asyncio.run(burst(through_gateway, conversations, params)),
+                          "provider_calls": limits.calls + limits.rejected, "provider_429s": limits.rejected,
+                          "retried": gateway.counts["retried"], "coalesced": gateway.counts["coalesced"],
+                          "queue_wait_max_s": gateway.stats()["queue_wait_max_s"]}
+    emit("llm_gateway", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Query embedding throughput: one encoder call per request vs micro-batching.
+
+    python -m benchmarks.query_embedding --concurrency 1 32 --requests 2048
+    python -m benchmarks.query_embedding --encoder hashing --repeat 0.5
+
+--concurrency threads embed --requests queries between them, as the
+threadpool does for concurrent /chat requests. Modes:
+
+- direct: ``encoder.encode([query])`` per request, the path before QueryEmbedder
+- batched: QueryEmbedder with its LRU disabled
+- batched_cached: QueryEmbedder with the LRU on
+
+Queries are runs of words from the documents under --data-dir; a --repeat
+fraction of them is drawn again from a small set of popular queries, as users
+ask the same things. Reports queries/sec, p50 / p99 latency and, for the
+batched modes, the mean number of queries per encoder call.
+"""
+import argparse
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from ._common import HashingEncoder, emit
+
+WORD = re.compile(r"\w+")
+
+
+def make_queries(data_dir: Path, count: int, repeat: float, seed: int):
+    words = [w for path in sorted(data_dir.glob("*/*.md")) for w in WORD.findall(path.read_text(encoding='utf-8'))]
+    rng = random.Random(seed)
+
+    def fresh():
+        start = rng.randrange(len(words) - 8)
+        return "What does " + " ".join(words[start:start + rng.randint(4, 8)]) + " mean?"
+
+    popular = [fresh() for _ in range(32)]
+    return [rng.choice(popular) if rng.random() < repeat else fresh() for _ in range(count)]
+
+
+def run(embed, queries, concurrency: int):
+    def timed(query):
+        start = time.perf_counter()
+        embed(query)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        timings = np.array(list(pool.map(timed, queries)))
+    seconds = time.perf_counter() - start
+    return {"qps": round(len(queries) / seconds, 1),
+            "p50_ms": round(float(np.percentile(timings, 50)), 3),
+            "p99_ms": round(float(np.percentile(timings, 99)), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default="resources/data")
+    parser.add_argument("--encoder", choices=["model", "hashing"], default="model")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--requests", type=int, default=2048)
+    parser.add_argument("--repeat", type=float, default=0.3, help="fraction of queries repeating a popular one")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.services import faiss_index
+    from app.services.embeddings import get_encoder
+    from app.services.query_embedder import QueryEmbedder
+
+    encoder = HashingEncoder() if args.encoder == "hashing" else get_encoder()
+    encoder.encode(["warm up"])
+    queries = make_queries(Path(args.data_dir), args.requests, args.repeat, args.seed)
+
+    results = {"encoder": args.encoder, "requests": args.requests, "repeat": args.repeat,
+               "max_batch": args.max_batch, "max_wait_ms": args.max_wait_ms}
+    for concurrency in args.concurrency:
+        modes = {"direct": run(lambda q: faiss_index.normalize(encoder.encode([q])), queries, concurrency)}
+        for mode, cache_size in (("batched", 0), ("batched_cached", 4096)):
+            embedder = QueryEmbedder(lambda: encoder, args.max_batch, args.max_wait_ms, cache_size)
+            modes[mode] = run(embedder.embed, queries, concurrency)
+            stats = embedder.stats()
+            modes[mode].update(mean_batch=stats["mean_batch"], cache_hits=stats["cache_hits"])
+        for mode in ("batched", "batched_cached"):
+            modes[mode]["speedup"] = round(modes[mode]["qps"] / modes["direct"]["qps"], 2)
+        results[f"concurrency_{concurrency}"] = modes
+    emit("query_embedding", results)
+
+
+if __name__ == "__main__":
+    main()
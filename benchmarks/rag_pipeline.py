@@ -0,0 +1,131 @@
+"""Ingestion, index size, cold start and retrieval on a synthetic corpus of any size.
+
+    python -m benchmarks.rag_pipeline --scale 10 --k 4 --queries 200
+    python -m benchmarks.rag_pipeline --scale 12000 --encoder hashing   # ~1M chunks
+
+The corpus is benchmarks.corpus at --scale copies of resources/data, indexed
+from scratch into a temporary store with DocumentProcessor.load_documents().
+Reports:
+
+- ingestion: files, chunks, chunks/sec and MB/sec, time spent embedding
+- index size on disk by kind (FAISS, chunk store, BM25, tables)
+- cold start: a fresh interpreter opening the store, as in benchmarks.cold_start
+- retrieval: p50 / p99 latency, recall@k and MRR of the planted-fact queries,
+  searched with the fact's role, for dense, BM25 and hybrid retrieval
+
+``--encoder hashing`` swaps the model for benchmarks._common.HashingEncoder so
+large scales finish in minutes; its recall is only comparable with itself.
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ._common import HashingEncoder, emit
+from .cold_start import _CHILD
+from .corpus import load_facts, synthesize
+
+
+def index_size_mb(directory: Path):
+    kinds = {"faiss": 0, "chunks": 0, "bm25": 0, "tables": 0, "other": 0}
+    for path in directory.rglob("*"):
+        if not path.is_file():
+            continue
+        name = path.name
+        if path.parent.name == "tables":
+            kind = "tables"
+        elif name.endswith(".faiss"):
+            kind = "faiss"
+        elif "_chunks." in name:
+            kind = "chunks"
+        elif "_bm25." in name:
+            kind = "bm25"
+        else:
+            kind = "other"
+        kinds[kind] += path.stat().st_size
+    sizes = {kind: round(size / 2 ** 20, 2) for kind, size in kinds.items()}
+    sizes["total"] = round(sum(kinds.values()) / 2 ** 20, 2)
+    return sizes
+
+
+def evaluate(search, facts, k: int):
+    timings, hits, reciprocal = [], 0, 0.0
+    for fact in facts:
+        start = time.perf_counter()
+        results = search(fact["role"], fact["query"], k)
+        timings.append((time.perf_counter() - start) * 1000)
+        for rank, result in enumerate(results):
+            if fact["marker"] in result["document"]:
+                hits += 1
+                reciprocal += 1.0 / (rank + 1)
+                break
+    timings = np.array(timings)
+    return {"recall_at_k": round(hits / len(facts), 4), "mrr": round(reciprocal / len(facts), 4),
+            "p50_ms": round(float(np.percentile(timings, 50)), 3),
+            "p99_ms": round(float(np.percentile(timings, 99)), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=10, help="copies of resources/data")
+    parser.add_argument("--source-dir", default="resources/data")
+    parser.add_argument("--encoder", choices=["model", "hashing"], default="model")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.services.document_processor import DocumentProcessor
+    from app.services.vector_store import VectorStore
+
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir, store_dir = Path(directory) / "data", Path(directory) / "store"
+        start = time.perf_counter()
+        corpus = synthesize(data_dir, args.scale, Path(args.source_dir), args.seed)
+        corpus["generate_s"] = round(time.perf_counter() - start, 2)
+
+        encoder = HashingEncoder() if args.encoder == "hashing" else None
+        store = VectorStore(store_dir, encoder=encoder)
+        processor = DocumentProcessor(data_dir, vector_store=store)
+        stats = processor.load_documents()
+        ingestion = {"files": stats["added"], "failed": stats["failed"], "chunks": stats["chunks"],
+                     "seconds": stats["seconds"], "embed_seconds": stats["embed_seconds"],
+                     "chunks_per_sec": stats["chunks_per_sec"],
+                     "mb_per_sec": round(corpus["bytes"] / 1e6 / stats["seconds"], 2) if stats["seconds"] else None}
+
+        dimension = store.encoder.get_sentence_embedding_dimension()
+        child = subprocess.run([sys.executable, "-c", _CHILD, str(store_dir), str(dimension)],
+                               capture_output=True, text=True, check=True)
+        cold_start = json.loads(child.stdout.strip().splitlines()[-1])
+
+        facts = load_facts(data_dir)
+        facts = random.Random(args.seed).sample(facts, min(args.queries, len(facts)))
+        store.encoder.encode(["warm up"])
+
+        def dense_or_hybrid(mode):
+            def search(role, query, k):
+                processor.retrieval_mode = mode
+                return processor.get_relevant_documents(role, query, n_results=k)
+            return search
+
+        retrieval = {
+            "dense": evaluate(dense_or_hybrid("dense"), facts, args.k),
+            "bm25": evaluate(lambda role, q, k: store.lexical_search_roles(list(processor.scope(role)), q, k),
+                             facts, args.k),
+            "hybrid": evaluate(dense_or_hybrid("hybrid"), facts, args.k),
+        }
+
+        results = {"scale": args.scale, "encoder": args.encoder, "k": args.k, "queries": len(facts),
+                   "corpus": corpus, "ingestion": ingestion, "index_mb": index_size_mb(store_dir),
+                   "cold_start": cold_start, "retrieval": retrieval}
+    emit("rag_pipeline", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Prompt tokens and end-to-end /chat latency with and without reranking.
+
+    python -m benchmarks.rerank --requests 64
+    python -m benchmarks.rerank --backends off lexical cross-encoder --budget-ms 50 --scale 10
+
+For each --backends entry an API server is started on a free port with
+RERANK_BACKEND set to it, LLM_BACKEND=fake and the response cache off. The
+fake LLM's time to first token grows with the prompt (--prompt-token-ms per
+prompt token, FAKE_LLM_PROMPT_TOKEN_MS), as a provider's prefill does, so a
+shorter prompt shows up in latency as it would in production. --requests
+distinct messages are sent one at a time, then sent again, so the second pass
+finds their reranker scores cached. Reports prompt tokens per request (from
+the /chat response), p50 / p99 latency of each pass and the server's
+/rerank/stats. cross-encoder needs RERANK_MODEL available to load.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ._common import emit
+from .batch_chat import messages
+from .chat_load import api_server, free_port, wait_until_up
+from .corpus import synthesize
+
+
+def summary(values, digits: int = 1):
+    values = np.array(values, dtype=np.float64)
+    return {"mean": round(float(values.mean()), digits), "p50": round(float(np.percentile(values, 50)), digits),
+            "p99": round(float(np.percentile(values, 99)), digits)}
+
+
+async def one_pass(client, url: str, auth, batch):
+    latencies, prompt_tokens = [], []
+    for message in batch:
+        start = time.perf_counter()
+        response = await client.post(f"{url}/chat", json={"message": message}, headers=auth)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        prompt_tokens.append(response.json()["prompt_tokens"])
+    return latencies, prompt_tokens
+
+
+async def run(args, url: str):
+    import httpx
+
+    batch = messages(args.requests)
+    async with httpx.AsyncClient(timeout=600) as client:
+        auth = await wait_until_up(client, url, (args.username, args.password), args.startup_timeout)
+        await client.post(f"{url}/chat", json={"message": "warm up"}, headers=auth)
+        first, prompt_tokens = await one_pass(client, url, auth, batch)
+        repeat, _ = await one_pass(client, url, auth, batch)
+        stats = (await client.get(f"{url}/rerank/stats", headers=auth)).json()
+    return {"prompt_tokens": summary(prompt_tokens, 0), "latency_ms": summary(first),
+            "repeat_latency_ms": summary(repeat), "reranker": stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["off", "lexical"])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--top-n", type=int, default=4)
+    parser.add_argument("--budget-ms", type=float, default=50)
+    parser.add_argument("--llm-ttft-ms", type=float, default=100)
+    parser.add_argument("--prompt-token-ms", type=float, default=0.1, help="fake LLM prefill cost per prompt token")
+    parser.add_argument("--llm-token-ms", type=float, default=1)
+    parser.add_argument("--username", default="Tony")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--scale", type=int, default=0, help="serve a synthetic corpus of N copies of resources/data")
+    args = parser.parse_args()
+
+    results = {"requests": args.requests, "candidates": args.candidates, "top_n": args.top_n,
+               "budget_ms": args.budget_ms, "prompt_token_ms": args.prompt_token_ms, "scale": args.scale}
+    with tempfile.TemporaryDirectory() as directory:
+        env = {"LLM_BACKEND": "fake", "RESPONSE_CACHE_SIZE": "0", "FAKE_LLM_TTFT_MS": str(args.llm_ttft_ms),
+               "FAKE_LLM_TOKEN_MS": str(args.llm_token_ms), "FAKE_LLM_PROMPT_TOKEN_MS": str(args.prompt_token_ms),
+               "RERANK_CANDIDATES": str(args.candidates), "RERANK_TOP_N": str(args.top_n),
+               "RERANK_BUDGET_MS": str(args.budget_ms)}
+        if args.scale:
+            synthesize(Path(directory) / "data", args.scale)
+            # One index for every backend: the first server builds it, the others open it
+            env.update(DATA_DIR=f"{directory}/data", VECTOR_STORE_DIR=f"{directory}/store")
+        for backend in args.backends:
+            with api_server(free_port(), {**env, "RERANK_BACKEND": backend}) as url:
+                results[backend] = asyncio.run(run(args, url))
+    if "off" in results:
+        for backend in args.backends:
+            if backend != "off":
+                results[backend]["prompt_token_reduction"] = round(
+                    1 - results[backend]["prompt_tokens"]["mean"] / results["off"]["prompt_tokens"]["mean"], 3)
+                results[backend]["latency_speedup"] = round(
+                    results["off"]["latency_ms"]["p50"] / results[backend]["latency_ms"]["p50"], 2)
+    emit("rerank", results)
+
+
+if __name__ == "__main__":
+    main()
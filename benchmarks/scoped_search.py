@@ -0,0 +1,68 @@
+"""Scoped vs unscoped retrieval over a synthetic corpus.
+
+    python -m benchmarks.scoped_search --chunks 100000 --queries 200
+
+Random unit vectors stand in for embeddings, so no encoder is loaded; the
+numbers isolate the FAISS search and merge cost.
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from ._common import emit
+
+
+def build_store(directory: str, chunks: int, dimension: int, seed: int):
+    from app.services.vector_store import VectorStore
+
+    store = VectorStore(directory, dimension=dimension)
+    rng = np.random.default_rng(seed)
+    per_role = chunks // len(store.roles)
+    for role in store.roles:
+        vectors = rng.standard_normal((per_role, dimension), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [f"synthetic/{role}::chunk_{i}" for i in range(per_role)]
+        metadatas = [{"source": f"synthetic/{role}", "role": role, "chunk_index": i} for i in range(per_role)]
+        store.add_embeddings(role, vectors, ids, metadatas, ids, save=False)
+    return store
+
+
+def latency_ms(store, roles, queries, k):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        store.search_roles(list(roles), "", n_results=k, query_embedding=query[None, :])
+        timings.append((time.perf_counter() - start) * 1000)
+    timings = np.array(timings)
+    return {"p50_ms": round(float(np.percentile(timings, 50)), 3),
+            "p99_ms": round(float(np.percentile(timings, 99)), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from app.services.access_policy import AccessPolicy
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = build_store(directory, args.chunks, args.dimension, args.seed)
+        policy = AccessPolicy(collections=store.roles)
+        queries = np.random.default_rng(args.seed + 1).standard_normal(
+            (args.queries, args.dimension), dtype=np.float32)
+
+        results = {"chunks": args.chunks, "k": args.k, "unscoped": latency_ms(store, store.roles, queries, args.k)}
+        for role in ["engineering", "finance", "hr", "marketing", "general"]:
+            visible = policy.visible(role)
+            results[role] = {"collections": len(visible), **latency_ms(store, visible, queries, args.k)}
+        emit("scoped_search", results)
+
+
+if __name__ == "__main__":
+    main()
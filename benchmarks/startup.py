@@ -0,0 +1,49 @@
+"""Startup time and memory of the services built by app.main.
+
+    python -m benchmarks.startup              # shared encoder / vector store
+    python -m benchmarks.startup --isolated   # one encoder and store per service (pre-registry layout)
+"""
+import argparse
+import os
+
+from ._common import emit, peak_rss_mb, rss_mb, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--isolated", action="store_true",
+                        help="give every service a private VectorStore and encoder")
+    parser.add_argument("--services", type=int, default=2,
+                        help="number of services to build (app.main builds two)")
+    args = parser.parse_args()
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+    results = {"isolated": args.isolated, "services": args.services, "rss_mb_start": round(rss_mb(), 1)}
+    with timed(results, "import_s"):
+        from app.services.document_processor import DocumentProcessor
+        from app.services.vector_store import VectorStore
+
+    stores = []
+    with timed(results, "build_s"):
+        for _ in range(args.services):
+            if args.isolated:
+                from sentence_transformers import SentenceTransformer
+                from app.config import EMBEDDING_MODEL
+                store = VectorStore(encoder=SentenceTransformer(EMBEDDING_MODEL))
+            else:
+                store = None
+            stores.append(DocumentProcessor(vector_store=store).vector_store)
+
+    with timed(results, "warm_s"):
+        for store in stores:
+            store.warm()
+
+    results["distinct_stores"] = len({id(s) for s in stores})
+    results["distinct_encoders"] = len({id(s.encoder) for s in stores})
+    results["rss_mb"] = round(rss_mb(), 1)
+    results["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    emit("startup", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Run every benchmark and keep the results so runs can be compared over time.
+
+    python -m benchmarks.suite --profile quick                   # append a run to benchmarks/results.jsonl
+    python -m benchmarks.suite --only rag_pipeline chat_load
+    python -m benchmarks.suite --compare benchmarks/results.jsonl          # its last two runs
+    python -m benchmarks.suite --compare baseline.jsonl benchmarks/results.jsonl
+
+Each benchmark runs in its own interpreter with the profile's arguments. Their
+JSON lines are collected into one run record with the git commit, time,
+Python version and CPU count, which is printed and appended to --output.
+--compare prints every numeric field two runs share, with the relative change.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Benchmark module (or "module@label" to run one twice) -> arguments. "quick" finishes in minutes on a
+# laptop; "full" uses each benchmark's defaults plus larger corpora
+PROFILES = {
+    "quick": {
+        "startup": [],
+        "time_to_ready": ["--modes", "uvicorn", "serve"],
+        "auth": ["--requests", "5000", "--slow-requests", "16"],
+        "hr_query": ["--rows", "20000", "--repeats", "5"],
+        "hr_analytics": ["--rows", "100000", "--repeats", "5"],
+        "chunking": ["--scale", "10"],
+        "context_packing": ["--repeat", "5"],
+        "query_embedding": ["--requests", "512"],
+        "encoder_backends": ["--texts", "256"],
+        "hybrid_retrieval": ["--queries", "100"],
+        "live_reload": ["--scale", "10", "--changed", "1", "10"],
+        "scoped_search": ["--chunks", "20000"],
+        "ann_index": ["--vectors", "20000", "--queries", "200"],
+        "cold_start": ["--chunks", "10000"],
+        "rag_pipeline": ["--scale", "10"],
+        "chat_load": ["--concurrency", "1", "8", "--requests", "32"],
+        "batch_chat": ["--messages", "32"],
+        "llm_gateway": ["--requests", "128"],
+        "rerank": ["--requests", "24"],
+    },
+    "full": {
+        "startup": [],
+        "time_to_ready": [],
+        "auth": [],
+        "hr_query": [],
+        "hr_analytics": [],
+        "chunking": [],
+        "context_packing": [],
+        "query_embedding": [],
+        "encoder_backends": [],
+        "hybrid_retrieval": [],
+        "live_reload": [],
+        "scoped_search": [],
+        "ann_index": [],
+        "cold_start": [],
+        "rag_pipeline": ["--scale", "100"],
+        "rag_pipeline@1m": ["--scale", "12000", "--encoder", "hashing"],
+        "chat_load": ["--scale", "10"],
+        "batch_chat": ["--messages", "256", "--scale", "10"],
+        "llm_gateway": [],
+        "llm_gateway@stream": ["--stream", "--duplicates", "0.5"],
+        "rerank": ["--scale", "10"],
+        "rerank@cross-encoder": ["--backends", "off", "cross-encoder", "--scale", "10"],
+    },
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmark(name: str, arguments: List[str], timeout: float) -> Dict:
+    module = name.split("@")[0]
+    start = time.perf_counter()
+    try:
+        process = subprocess.run([sys.executable, "-m", f"benchmarks.{module}", *arguments],
+                                 capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"benchmark": name, "error": f"timed out after {timeout:.0f}s"}
+    seconds = round(time.perf_counter() - start, 2)
+    for line in reversed(process.stdout.splitlines()):
+        if line.startswith('{"benchmark"'):
+            return {**json.loads(line), "benchmark": name, "arguments": arguments, "wall_seconds": seconds}
+    return {"benchmark": name, "arguments": arguments, "wall_seconds": seconds,
+            "error": (process.stderr.strip().splitlines() or ["no result"])[-1]}
+
+
+def flatten(value, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of a nested result, keyed by their dotted path."""
+    if isinstance(value, dict):
+        return {k: v for key, item in value.items() for k, v in flatten(item, f"{prefix}{key}.").items()}
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix.rstrip("."): value}
+    return {}
+
+
+def load_runs(path: Path) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(baseline: Dict, current: Dict):
+    print(f"baseline {baseline['run']['commit']} ({baseline['run']['time']}) -> "
+          f"current {current['run']['commit']} ({current['run']['time']})")
+    old = {r["benchmark"]: flatten(r) for r in baseline["results"]}
+    for result in current["results"]:
+        before = old.get(result["benchmark"], {})
+        for key, value in flatten(result).items():
+            if key in before and key != "wall_seconds":
+                change = f"{(value - before[key]) / before[key] * 100:+.1f}%" if before[key] else "n/a"
+                print(f"{result['benchmark']}.{key}: {before[key]} -> {value} ({change})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--only", nargs="+", help="run just these benchmarks of the profile")
+    parser.add_argument("--output", default="benchmarks/results.jsonl")
+    parser.add_argument("--timeout", type=float, default=3600, help="seconds allowed per benchmark")
+    parser.add_argument("--compare", nargs="+", metavar="RESULTS",
+                        help="compare the last runs of one or two results files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        if len(args.compare) == 1:
+            runs = load_runs(Path(args.compare[0]))
+            if len(runs) < 2:
+                sys.exit(f"{args.compare[0]} holds fewer than two runs")
+            compare(runs[-2], runs[-1])
+        else:
+            compare(load_runs(Path(args.compare[0]))[-1], load_runs(Path(args.compare[1]))[-1])
+        return
+
+    benchmarks = {name: arguments for name, arguments in PROFILES[args.profile].items()
+                  if not args.only or name in args.only}
+    run = {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "profile": args.profile,
+           "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+    results = []
+    for name, arguments in benchmarks.items():
+        result = run_benchmark(name, arguments, args.timeout)
+        print(json.dumps(result), flush=True)
+        results.append(result)
+    record = {"run": run, "results": results}
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "a", encoding='utf-8') as f:
+        f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Time from launch until the API is live and ready, and its memory, per launch mode.
+
+    python -m benchmarks.time_to_ready --workers 2
+    python -m benchmarks.time_to_ready --modes uvicorn serve --cold
+
+Modes:
+
+- uvicorn: ``uvicorn app.main:app``, one process warming up in the background
+- uvicorn_workers: ``uvicorn --workers N``; each spawned worker imports and loads everything itself
+  (with WARMUP_INGEST=false, since concurrent ingests would race)
+- serve: ``python -m app.serve --workers N``, which indexes once, preloads and forks
+
+Reports live_s (first 200 from /healthz), ready_s (every worker's /readyz is
+200; before warm-up was moved off startup the two were the same), the warm-up
+breakdown one worker reports, and the proportional set size of the whole
+process tree, where pages shared copy-on-write count once. The vector store is
+a temporary copy of --store-dir, already indexed unless --cold.
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from ._common import emit
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get(url: str):
+    """(status, JSON body) of a GET, or (None, None) while nothing is listening."""
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+    except OSError:
+        return None, None
+
+
+def tree_pss_mb(root: int) -> float:
+    """Proportional set size of a process and all its descendants, in MiB (Linux)."""
+    children = {}
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(stat.parent.name))
+    total, pending = 0, [root]
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+                if line.startswith("Pss:"):
+                    total += int(line.split()[1])
+        except OSError:
+            pass
+    return round(total / 1024, 1)
+
+
+def launch(mode: str, port: int, workers: int, env):
+    if mode == "serve":
+        command = [sys.executable, "-m", "app.serve", "--workers", str(workers), "--port", str(port)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+        if mode == "uvicorn_workers":
+            command += ["--workers", str(workers)]
+            env = {**env, "WARMUP_INGEST": "false"}
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def measure(mode: str, workers: int, store_dir: Path, timeout: float):
+    port = free_port()
+    expected = 1 if mode == "uvicorn" else workers
+    start = time.perf_counter()
+    process = launch(mode, port, workers, {**os.environ, "VECTOR_STORE_DIR": str(store_dir)})
+    result = {"workers": expected}
+    ready_pids, status = set(), None
+    try:
+        while time.perf_counter() - start < timeout and len(ready_pids) < expected:
+            code, _ = get(f"http://127.0.0.1:{port}/healthz")
+            if code == 200 and "live_s" not in result:
+                result["live_s"] = round(time.perf_counter() - start, 3)
+            code, body = get(f"http://127.0.0.1:{port}/readyz")
+            if code == 200:
+                ready_pids.add(body["pid"])
+                status = body
+            elif body and body.get("state") == "failed":
+                result["error"] = body.get("error")
+                break
+            else:
+                time.sleep(0.05)
+        if len(ready_pids) >= expected:
+            result["ready_s"] = round(time.perf_counter() - start, 3)
+            result["warm_up"] = status["timings"]
+            time.sleep(1)  # let the other connections settle before sampling memory
+            result["pss_mb"] = tree_pss_mb(process.pid)
+        elif "error" not in result:
+            result["error"] = f"{len(ready_pids)} of {expected} workers ready after {timeout:.0f}s"
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["uvicorn", "uvicorn_workers", "serve"],
+                        choices=["uvicorn", "uvicorn_workers", "serve"])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--store-dir", default="resources/vector_store")
+    parser.add_argument("--cold", action="store_true", help="start from an empty vector store")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+    os.environ.setdefault("LLM_BACKEND", "fake")
+
+    results = {"cold": args.cold}
+    for mode in args.modes:
+        with tempfile.TemporaryDirectory() as directory:
+            store_dir = Path(directory) / "store"
+            if args.cold:
+                store_dir.mkdir()
+            else:
+                shutil.copytree(args.store_dir, store_dir)
+                # Bring the copy up to date first, so every mode starts from an indexed store
+                subprocess.run([sys.executable, "-m", "app.ingest", "--store-dir", str(store_dir)],
+                               check=True, capture_output=True)
+            results[mode] = measure(mode, args.workers, store_dir, args.timeout)
+    emit("time_to_ready", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,24 @@
+import argparse
 import subprocess
 import sys
 import os
 from pathlib import Path
 
 def main():
+    parser = argparse.ArgumentParser(description="Start the FinSolve Chatbot API.")
+    parser.add_argument("--prod", action="store_true",
+                        help="production mode: no reload, index once and fork preloaded workers (app.serve)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="API workers in --prod mode")
+    args = parser.parse_args()
+
+    if args.prod:
+        try:
+            subprocess.run([sys.executable, "-m", "app.serve", "--workers", str(args.workers),
+                            "--host", "0.0.0.0", "--port", "8000"])
+        except KeyboardInterrupt:
+            print("\nServer stopped.")
+        return
+
     print("Starting FinSolve Chatbot...")
     print("1. Installing dependencies...")
     
@@ -0,0 +1,35 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.services.chunk_store import ChunkStore
+
+
+class ChunkStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def generations(self):
+        return sorted({int(path.name.split(".")[1]) for path in self.directory.glob("docs_chunks.*.*")
+                       if path.name.split(".")[1].isdigit()})
+
+    def test_previous_generation_outlives_one_save(self):
+        writer = ChunkStore(self.directory, "docs")
+        writer.add([1], ["first"], [{"source": "a.md"}])
+        writer.save()
+        reader = ChunkStore(self.directory, "docs")
+        writer.add([2], ["second"], [{"source": "b.md"}])
+        writer.save()
+        self.assertEqual(self.generations(), [1, 2])
+        # A reader that read generation 1's header before the swap can still open its files
+        self.assertTrue(all(reader._file(1, suffix).exists() for suffix in ("text", "offsets.npy", "keys.npy")))
+        writer.remove([1])
+        writer.save()
+        self.assertEqual(self.generations(), [2, 3])
+        self.assertEqual(ChunkStore(self.directory, "docs").get(2), ("second", {"source": "b.md"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+
+from app.services import faiss_index
+
+
+class DeferredRemovalTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = faiss_index.normalize(rng.standard_normal((200, 16)))
+        self.index = faiss_index.new_index("hnsw", 16)
+        self.index.add_with_ids(self.vectors, np.arange(200, dtype='int64'))
+
+    def test_removals_are_applied_by_one_rebuild(self):
+        deferred = []
+        for keys in ([3, 4], [10], [150, 151]):
+            index = faiss_index.remove_ids(self.index, np.array(keys, dtype='int64'), deferred)
+            self.assertIs(index, self.index)
+        self.assertEqual(self.index.ntotal, 200)
+        # Re-added under a removed id: the new vector survives, the old one doesn't
+        replacement = faiss_index.normalize(-self.vectors[4])
+        self.index.add_with_ids(replacement, np.array([4], dtype='int64'))
+        compacted = faiss_index.compact(self.index, deferred)
+        self.assertEqual(deferred, [])
+        self.assertEqual(faiss_index.index_kind(compacted), "hnsw")
+        ids, vectors = faiss_index.stored_vectors(compacted)
+        self.assertEqual(sorted(ids.tolist()), sorted(set(range(200)) - {3, 10, 150, 151}))
+        np.testing.assert_allclose(vectors[ids.tolist().index(4)], replacement[0], rtol=1e-6)
+        _, found = compacted.search(self.vectors[10:11], 1)
+        self.assertNotEqual(found[0, 0], 10)
+
+    def test_flat_removal_is_immediate(self):
+        index = faiss_index.new_index("flat", 16)
+        index.add_with_ids(self.vectors, np.arange(200, dtype='int64'))
+        deferred = []
+        faiss_index.remove_ids(index, np.array([1, 2], dtype='int64'), deferred)
+        self.assertEqual((index.ntotal, deferred), (198, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from app.services.hr_analytics import HRAnalytics
+from app.services.hr_query import HRIndex, HRQueryEngine
+
+HR_DATA = Path(__file__).resolve().parent.parent / "resources" / "data" / "hr" / "hr_data.csv"
+
+
+class HRAnalyticsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.df = pd.read_csv(HR_DATA)
+        cls.analytics = HRAnalytics(cls.df)
+        cls.engine = HRQueryEngine(HRIndex(cls.df), cls.analytics)
+
+    def test_answers_aggregates(self):
+        self.assertEqual(self.analytics.answer("How many employees are in each department?").splitlines()[0],
+                         "Headcount by department:")
+        answer = self.analytics.answer("What's the average salary in the Sales department?")
+        self.assertIn(f"{self.df.loc[self.df['department'] == 'Sales', 'salary'].mean():,.2f}", answer)
+        rated = int((self.df["performance_rating"] > 4).sum())
+        self.assertEqual(self.analytics.answer("How many employees have performance rating above 4"),
+                         f"Headcount (performance rating > 4): {rated}")
+        self.assertTrue(self.analytics.answer("Top 10 salaries").startswith("Top 10 by salary"))
+
+    def test_unparsed_conditions_are_not_answered(self):
+        for question in ["How many employees report to Sara Sharma",
+                         "How many employees joined in 2023?",
+                         "How many employees are over 40 years old?",
+                         "How many employees are in Noida?",
+                         "average salary of employees in Gurgaon",
+                         "What is the maximum leave balance I can carry forward?",
+                         "How many leaves do I have left?"]:
+            with self.subTest(question=question):
+                self.assertIsNone(self.analytics.answer(question))
+
+    def test_lookups_win_over_analytics(self):
+        manager = self.df.loc[self.df["full_name"] == "Sara Sharma", "employee_id"].iloc[0]
+        reports = int((self.df["manager_id"] == manager).sum())
+        answer = self.engine.answer("How many employees report to Sara Sharma")
+        self.assertTrue(answer.startswith(f"Direct reports of Sara Sharma ({reports}):"))
+        self.assertEqual(len(answer.splitlines()), reports + 1)
+
+    def test_engine_does_not_guess(self):
+        total = f"{self.df['salary'].mean():,.2f}"
+        for question in ["How many employees joined in 2023?", "How many employees are over 40 years old?",
+                         "How many employees are in Noida?", "average salary of employees in Gurgaon",
+                         "What is the maximum leave balance I can carry forward?"]:
+            with self.subTest(question=question):
+                answer = self.engine.answer(question)
+                self.assertFalse(answer and (f"Headcount: {len(self.df)}" in answer or total in answer), answer)
+
+
+if __name__ == "__main__":
+    unittest.main()
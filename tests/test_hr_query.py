@@ -0,0 +1,40 @@
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from app.services.hr_query import HRIndex, HRQueryEngine
+
+HR_DATA = Path(__file__).resolve().parent.parent / "resources" / "data" / "hr" / "hr_data.csv"
+
+
+class HRQueryEngineTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.df = pd.read_csv(HR_DATA)
+        cls.engine = HRQueryEngine(HRIndex(cls.df))
+
+    def test_role_label_drops_filler_words(self):
+        names = self.df.loc[self.df["role"] == "Credit Officer", "full_name"].drop_duplicates().tolist()
+        for question in ["List employees with credit officer", "Employees with role credit officer",
+                         "Employees with the role of credit officer"]:
+            with self.subTest(question=question):
+                self.assertEqual(self.engine.answer(question),
+                                 "Employees with role 'credit officer':\n" + "\n".join(names))
+        self.assertEqual(self.engine.answer("Employees with roles astronaut"),
+                         "No employees found with role 'astronaut'.")
+
+    def test_listings_match_only_listing_questions(self):
+        for question, title in [("List all roles", "Roles:"), ("What are the departments?", "Departments:"),
+                                ("locations", "Locations:"), ("Show me all employee IDs", "Employee IDs:"),
+                                ("list employees", "All Employees:")]:
+            with self.subTest(question=question):
+                self.assertTrue(self.engine.answer(question).startswith(title + "\n"))
+        for question in ["What is the relocation policy?", "Which role does Aarav Sharma have?",
+                         "How are departments budgeted?", "What benefits are offered to employees?"]:
+            with self.subTest(question=question):
+                self.assertIsNone(self.engine.answer(question))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from app.services.hr_query import HRIndex, SEARCH_FIELDS
+from app.services.hr_table import HRTable
+from app.services.table_store import TableStore, read_csv_batches
+
+HR_DATA = Path(__file__).resolve().parent.parent / "resources" / "data" / "hr" / "hr_data.csv"
+
+
+class HRTableTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = self.directory / "hr_data.csv"
+        shutil.copyfile(HR_DATA, self.path)
+        self.store = TableStore(self.directory / "tables")
+        for _ in self.store.write(self.path.as_posix(), read_csv_batches(self.path)):
+            pass
+        self.lines = self.path.read_text(encoding="utf-8").splitlines(keepends=True)
+
+    def test_current_table_is_loaded_from_the_store(self):
+        stat = self.path.stat()
+        self.assertEqual(self.store.source_stamp(self.path.as_posix()), (stat.st_size, stat.st_mtime_ns))
+        table = HRTable(self.path, self.store)
+        self.assertEqual(len(table.df), len(self.lines) - 1)
+        self.assertIsNone(table.refresh())
+
+    def test_stale_table_is_not_used(self):
+        self.path.write_text("".join(self.lines[:51]), encoding="utf-8")
+        table = HRTable(self.path, self.store)
+        self.assertEqual(len(table.df), 50)
+        self.assertEqual(len(table.engine.analytics), 50)
+        self.assertIsNone(table.refresh())
+
+    def test_appended_rows_are_folded_in(self):
+        table = HRTable(self.path, self.store)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(self.lines[1].replace("FINEMP1000", "FINEMP9000"))
+        result = table.refresh()
+        self.assertEqual((result["mode"], result["rows_added"], result["rows"]), ("append", 1, len(self.lines)))
+        self.assertIsNotNone(table.engine.index.employee("FINEMP9000"))
+
+    def test_failed_reload_is_not_retried_until_the_file_changes(self):
+        table = HRTable(self.path, self.store)
+        engine = table.engine
+        self.path.write_text("name,value\nx,1\n", encoding="utf-8")
+        with self.assertLogs("app.services.hr_table", "ERROR"):
+            self.assertEqual(table.refresh()["mode"], "failed")
+        self.assertIs(table.engine, engine)
+        table.check()
+        self.assertIsNone(table._thread)
+        self.path.write_text("".join(self.lines[:11]), encoding="utf-8")
+        table.check()
+        table._thread.join()
+        self.assertEqual((table.last["mode"], len(table.df)), ("reload", 10))
+
+    def test_extended_index_matches_rebuilt(self):
+        table = HRTable(self.path)
+        df = table.df
+        extended, rebuilt = HRIndex(df.iloc[:60]).extended(df.iloc[60:]), HRIndex(df)
+        self.assertEqual((extended.rows, extended.records, extended.by_id, extended.distinct),
+                         (rebuilt.rows, rebuilt.records, rebuilt.by_id, rebuilt.distinct))
+        for field in SEARCH_FIELDS:
+            self.assertEqual(extended.postings[field].keys(), rebuilt.postings[field].keys())
+            for token, rows in rebuilt.postings[field].items():
+                np.testing.assert_array_equal(extended.postings[field][token], rows)
+        self.assertEqual(extended.reports.keys(), rebuilt.reports.keys())
+        for manager, rows in rebuilt.reports.items():
+            np.testing.assert_array_equal(extended.reports[manager], rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
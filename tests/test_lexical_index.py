@@ -0,0 +1,28 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.services.lexical_index import LexicalIndex
+
+
+class LexicalIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def generations(self):
+        return sorted({int(path.name.split(".")[1]) for path in self.directory.glob("docs_bm25.*.*.npy")})
+
+    def test_previous_generation_outlives_one_save(self):
+        index = LexicalIndex(self.directory, "docs")
+        for key, text in enumerate(["quarterly revenue", "employee handbook", "marketing budget"], 1):
+            index.add([key], [text])
+            index.save()
+        self.assertEqual(self.generations(), [2, 3])
+        keys, _ = LexicalIndex(self.directory, "docs").search("revenue", 1)
+        self.assertEqual(keys.tolist(), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+import numpy as np
+
+from app.services.response_cache import ResponseCache
+
+SCOPE = ("finance", "general")
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.version = 1
+        self.cache = ResponseCache(lambda scope: (self.version,), max_entries=10, ttl_seconds=60, similarity=0.9)
+
+    def test_answer_keeps_the_versions_it_was_retrieved_at(self):
+        retrieved_at = self.cache.versions(SCOPE)
+        self.version = 2  # a reload publishes during the LLM call
+        self.cache.put(SCOPE, "revenue in q3", "old answer", versions=retrieved_at)
+        self.assertIsNone(self.cache.get_exact(SCOPE, "revenue in q3"))
+        self.assertEqual(self.cache.counters["invalidated"], 1)
+
+    def test_stale_best_match_falls_back_to_the_next(self):
+        query = np.array([1.0, 0.0], dtype=np.float32)
+        self.cache.put(SCOPE, "second best", "fresh", embedding=np.array([0.95, np.sqrt(1 - 0.95 ** 2)]))
+        self.cache.put(SCOPE, "best", "stale", embedding=query, versions=(0,))
+        self.assertEqual(self.cache.get_similar(SCOPE, query), "fresh")
+        self.assertEqual(self.cache.counters["semantic_hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
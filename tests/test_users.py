@@ -0,0 +1,26 @@
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+class UsersCommandTest(unittest.TestCase):
+    def run_users(self, store: Path, *args):
+        return subprocess.run([sys.executable, "-m", "app.users", "--store", str(store), *args],
+                              capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent)
+
+    def test_add_rejects_unknown_roles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = Path(directory) / "users.json"
+            result = self.run_users(store, "add", "eve", "all", "--password", "secret")
+            self.assertNotEqual(result.returncode, 0)
+            self.assertIn("Unknown role 'all'", result.stderr)
+            self.assertFalse(store.exists() and "eve" in json.loads(store.read_text())["users"])
+            self.assertEqual(self.run_users(store, "add", "eve", "c-level", "--password", "secret").returncode, 0)
+            self.assertEqual(json.loads(store.read_text())["users"]["eve"]["role"], "c-level")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_store import VectorStore
+
+
+class _Snapshot:
+    def __init__(self, lexical: LexicalIndex):
+        self.lexical = lexical
+
+
+class LexicalHitsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def lexical(self, role, texts):
+        index = LexicalIndex(self.directory, role)
+        index.add(list(range(1, len(texts) + 1)), texts)
+        return _Snapshot(index)
+
+    def test_roles_are_merged_by_rank_not_raw_bm25(self):
+        # "revenue" is rare among finance's many chunks, so its idf there dwarfs general's
+        finance = ["quarterly revenue report", "revenue by region"] + [f"budget line {i}" for i in range(50)]
+        view = {"finance": self.lexical("finance", finance),
+                "general": self.lexical("general", ["revenue targets for staff", "holiday calendar"])}
+        store = object.__new__(VectorStore)
+        hits = store.lexical_hits(["finance", "general"], "revenue", 2, view=view)
+        self.assertEqual({role for role, _, _ in hits}, {"finance", "general"})
+        self.assertEqual(hits[0][2], hits[1][2])
+
+
+if __name__ == "__main__":
+    unittest.main()